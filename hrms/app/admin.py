@@ -1,10 +1,11 @@
 from django.contrib import admin
 
-from .models import Department,Employee,LearningPlan, PerformanceReview
+from .models import Department,Employee,LearningPlan, PerformanceReview, OutboxEmail
 
 # Register your models here.
 
 admin.site.register(Department)
 admin.site.register(Employee)
 admin.site.register(LearningPlan)
-admin.site.register(PerformanceReview)
\ No newline at end of file
+admin.site.register(PerformanceReview)
+admin.site.register(OutboxEmail)
\ No newline at end of file
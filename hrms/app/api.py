@@ -0,0 +1,154 @@
+import hashlib
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import Count, Max, Q
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.views.generic import View
+
+from . import archive, autocomplete, exports
+from .filters import employee_filter, learning_plan_filter, performance_filter
+from .models import Employee, LearningPlan, PerformanceReview
+from .views import ArchivedRowsMixin, SubordinateScopeMixin
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# the export columns, seen from the employee instead of from a plan or review
+EMPLOYEE_FIELDS = [
+    ('id', 'pk') if lookup == 'employee_id' else (name, lookup.removeprefix('employee__'))
+    for name, lookup in exports.EMPLOYEE_COLUMNS
+] + [('reporting_to', 'reporting_to_id'), ('updated_at', 'updated_at')]
+LEARNING_PLAN_FIELDS = exports.LEARNING_PLAN_COLUMNS + [('updated_at', 'updated_at')]
+PERFORMANCE_FIELDS = exports.PERFORMANCE_COLUMNS + [('updated_at', 'updated_at')]
+
+
+class CollectionAPIView(LoginRequiredMixin, SubordinateScopeMixin, ArchivedRowsMixin, View):
+    """
+    Read-only JSON list with the same visibility as the HTML pages: CEO/HR see
+    every row, everyone else their own and their reports' (``?scope=all`` for
+    the whole subtree). The list filters apply, ``?archived=include`` adds the
+    archived plans or reviews, and ``after``/``limit`` page through the rows
+    by id.
+
+    Each response carries an ETag taken from the row count and the newest
+    ``updated_at`` of the filtered collection, one aggregate query. A poller
+    that sends it back gets a 304 before any row is read. There is no
+    Last-Modified: deleting a row leaves the newest ``updated_at`` where it
+    was, or moves it back, so only the count in the ETag sees it. Changes to
+    related rows (a user's name, say) don't move the ETag.
+    """
+    model = None
+    filterset_class = None
+    fields = None
+    # how the model reaches the employee who owns a row
+    owner_lookup = 'employee'
+
+    def handle_no_permission(self):
+        return JsonResponse({'detail': 'Authentication required.'}, status=401)
+
+    def rows(self, model):
+        principal = self.request.principal
+        queryset = model.objects.all()
+        if principal.is_ceo_or_hr:
+            return queryset
+        if principal.employee is None:
+            return queryset.none()
+        return queryset.filter(Q(**{self.owner_lookup: principal.pk}) |
+                               Q(**{f'{self.owner_lookup}__in': self.get_subordinates()}))
+
+    def get(self, request, *args, **kwargs):
+        filterset = self.filterset_class(request.GET, queryset=self.rows(self.model))
+        if not filterset.is_valid():
+            return JsonResponse({'errors': filterset.errors.get_json_data()}, status=400)
+        queryset = filterset.qs
+        if self.include_archived():
+            archived = self.filterset_class(request.GET, queryset=self.rows(archive.ARCHIVES[self.model])).qs
+            queryset = archive.WithArchived(queryset, archived)
+        state = queryset.order_by().aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+        etag = self.etag(state)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = JsonResponse(self.page(queryset, state))
+        response['ETag'] = etag
+        # per user, and always revalidated; the 304 is what keeps that cheap
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ['Cookie'])
+        return response
+
+    def etag(self, state):
+        last_modified = state['last_modified'].isoformat() if state['last_modified'] else ''
+        key = f'{self.model._meta.label}:{self.request.principal.pk}:{self.request.GET.urlencode()}:{state["count"]}:{last_modified}'
+        return f'"{hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()}"'
+
+    def page(self, queryset, state):
+        after = self.int_param('after', 0)
+        limit = min(self.int_param('limit', PAGE_SIZE), MAX_PAGE_SIZE) or PAGE_SIZE
+        names = [name for name, _ in self.fields]
+        rows = list(queryset.filter(pk__gt=after).order_by('pk')
+                    .values_list(*[lookup for _, lookup in self.fields])[:limit + 1])
+        results = [dict(zip(names, row)) for row in rows[:limit]]
+        return {
+            'count': state['count'],
+            'last_modified': state['last_modified'],
+            'next': results[-1]['id'] if len(rows) > limit else None,
+            'results': results,
+        }
+
+    def int_param(self, name, default):
+        # anything but a non-negative integer (including digits int() rejects, like '²') means the default
+        try:
+            value = int(self.request.GET[name])
+        except (KeyError, ValueError):
+            return default
+        return value if value >= 0 else default
+
+
+class EmployeeAPI(CollectionAPIView):
+    model = Employee
+    filterset_class = employee_filter
+    fields = EMPLOYEE_FIELDS
+    owner_lookup = 'pk'
+
+
+class LearningPlanAPI(CollectionAPIView):
+    model = LearningPlan
+    filterset_class = learning_plan_filter
+    fields = LEARNING_PLAN_FIELDS
+
+
+class PerformanceReviewAPI(CollectionAPIView):
+    model = PerformanceReview
+    filterset_class = performance_filter
+    fields = PERFORMANCE_FIELDS
+
+
+class AutocompleteAPIView(LoginRequiredMixin, View):
+    """
+    Matches for an AutocompleteInput as ``{"results": [{"id", "label"}]}``,
+    labelled as the form field labels its selection. The fields using it are
+    on the CEO/HR employee forms, so only they may search.
+    """
+    match = None
+    label = staticmethod(str)
+
+    def handle_no_permission(self):
+        return JsonResponse({'detail': 'Authentication required.'}, status=401)
+
+    def get(self, request, *args, **kwargs):
+        if not request.principal.is_ceo_or_hr:
+            return JsonResponse({'detail': 'Only CEO and HR can search here.'}, status=403)
+        rows = self.match(request.GET.get('q', ''))
+        response = JsonResponse({'results': [{'id': row.pk, 'label': self.label(row)} for row in rows]})
+        response['Cache-Control'] = 'private, max-age=60'
+        return response
+
+
+class EmployeeAutocompleteAPI(AutocompleteAPIView):
+    match = staticmethod(autocomplete.match_employees)
+    label = staticmethod(autocomplete.employee_label)
+
+
+class DepartmentAutocompleteAPI(AutocompleteAPIView):
+    match = staticmethod(autocomplete.match_departments)
@@ -0,0 +1,178 @@
+"""
+Quarter-based archival of closed learning plans and graded reviews.
+
+The lists and the dashboard read the current and recent quarters. Approved or
+rejected plans and graded reviews from quarters older than
+``ARCHIVE_AFTER_QUARTERS`` are moved, a chunk per transaction, into
+ArchivedLearningPlan and ArchivedPerformanceReview with their ids and values
+unchanged, so the hot tables and their indexes stay the size of a few quarters.
+Plans still open and reviews still pending stay where they are, however old.
+
+QuarterlyRollup keeps counting archived rows: the move bypasses the delete
+signals and ``rollups.rebuild()`` counts both tables. Every list, export and
+API collection of plans or reviews takes ``?archived=include`` to show the
+archived rows along with the live ones, and the detail pages look in the
+archive for an id the hot table no longer has.
+"""
+import datetime
+from functools import cmp_to_key, partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from .models import ArchivedLearningPlan, ArchivedPerformanceReview, LearningPlan, PerformanceReview
+from .rollups import quarter_start
+
+ARCHIVE_AFTER_QUARTERS = getattr(settings, 'ARCHIVE_AFTER_QUARTERS', 4)
+CHUNK_SIZE = getattr(settings, 'ARCHIVE_CHUNK_SIZE', 1000)
+
+# each hot model and the table its old rows move to
+ARCHIVES = {
+    LearningPlan: ArchivedLearningPlan,
+    PerformanceReview: ArchivedPerformanceReview,
+}
+
+
+def cutoff(quarters=ARCHIVE_AFTER_QUARTERS, today=None):
+    """First day of the oldest quarter kept hot; ``quarters`` full quarters before the current one."""
+    start = quarter_start(today or timezone.localdate())
+    months = start.year * 12 + start.month - 1 - 3 * quarters
+    return datetime.date(months // 12, months % 12 + 1, 1)
+
+
+def archivable(model, before):
+    """Rows of ``model`` from quarters before ``before`` that are finished with."""
+    if model is LearningPlan:
+        return LearningPlan.objects.filter(status__in=['APPROVED', 'REJECTED'], quarter_date__lt=before)
+    return PerformanceReview.objects.filter(graded='GRADED', quarter_date__lt=before)
+
+
+def archive_chunk(model, before, chunk_size=CHUNK_SIZE):
+    """Move up to ``chunk_size`` of the oldest archivable rows in one transaction; returns how many moved."""
+    archive_model = ARCHIVES[model]
+    fields = [field.attname for field in archive_model._meta.concrete_fields if field.name != 'archived_at']
+    with transaction.atomic():
+        rows = list(archivable(model, before).select_for_update().order_by('pk').values(*fields)[:chunk_size])
+        if not rows:
+            return 0
+        archive_model.objects.bulk_create([archive_model(**row) for row in rows])
+        # no post_delete signals: the rollups go on counting these rows, from the archive now.
+        # Nothing references plans or reviews, so there is nothing to cascade to.
+        moved = model.objects.filter(pk__in=[row['id'] for row in rows])
+        moved._raw_delete(moved.db)
+    return len(rows)
+
+
+def archive(before, chunk_size=CHUNK_SIZE):
+    """Archive everything before ``before``, chunk by chunk; yields ``(model, rows moved)`` after each chunk."""
+    for model in ARCHIVES:
+        while moved := archive_chunk(model, before, chunk_size):
+            yield model, moved
+
+
+class WithArchived:
+    """
+    A hot-table queryset and the same query over its archive, read as one
+    list. filter(), exclude(), order_by() and values_list() apply to both
+    sides; iterating or slicing fetches from each and merges the rows by the
+    ordering, so KeysetPaginator pages through it as it is. Without an
+    ordering the archived rows come first, being the older ones. count(),
+    exists() and Count/Sum/Min/Max aggregates combine both sides.
+    """
+
+    def __init__(self, live, archived):
+        self.live = live
+        self.archived = archived
+        self.model = live.model
+        self._rows = None
+
+    def _both(self, method, *args, **kwargs):
+        return WithArchived(getattr(self.live, method)(*args, **kwargs), getattr(self.archived, method)(*args, **kwargs))
+
+    def all(self):
+        return self._both('all')
+
+    def filter(self, *args, **kwargs):
+        return self._both('filter', *args, **kwargs)
+
+    def exclude(self, *args, **kwargs):
+        return self._both('exclude', *args, **kwargs)
+
+    def order_by(self, *fields):
+        return self._both('order_by', *fields)
+
+    def values_list(self, *fields):
+        return self._both('values_list', *fields)
+
+    def count(self):
+        return self.live.count() + self.archived.count()
+
+    def exists(self):
+        return self.live.exists() or self.archived.exists()
+
+    def aggregate(self, **aggregates):
+        live, archived = self.live.aggregate(**aggregates), self.archived.aggregate(**aggregates)
+        return {name: _combine(aggregate, live[name], archived[name]) for name, aggregate in aggregates.items()}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) and index.stop is not None and index.stop >= 0:
+            # the first ``stop`` merged rows are among the first ``stop`` of each side
+            return self._merge(self.live[:index.stop], self.archived[:index.stop])[index]
+        return self._fetch()[index]
+
+    def _fetch(self):
+        if self._rows is None:
+            self._rows = self._merge(self.live, self.archived)
+        return self._rows
+
+    def __iter__(self):
+        return iter(self._fetch())
+
+    def __len__(self):
+        return len(self._fetch())
+
+    def __bool__(self):
+        return bool(len(self))
+
+    def _merge(self, live, archived):
+        rows = [*archived, *live]
+        keys = []
+        for field in self.live.query.order_by:
+            if isinstance(field, str):
+                keys.append((field.lstrip('-'), field.startswith('-'), None))
+            else:
+                # F('...').asc() / .desc(), with nulls_first or nulls_last
+                nulls = 'first' if field.nulls_first else 'last' if field.nulls_last else None
+                keys.append((field.expression.name, field.descending, nulls))
+        if keys:
+            fields = getattr(self.live, '_fields', None)
+            value = (lambda row, name: row[fields.index(name)]) if fields else getattr
+            rows.sort(key=cmp_to_key(partial(_compare, keys, value)))
+        return rows
+
+
+def _compare(keys, value, a, b):
+    for name, descending, nulls in keys:
+        x, y = value(a, name), value(b, name)
+        if x == y:
+            continue
+        if x is None or y is None:
+            # unless told otherwise NULL sorts as the smallest value, as in SQLite
+            nulls_first = nulls == 'first' if nulls else not descending
+            return -1 if (x is None) == nulls_first else 1
+        return (x < y) - (x > y) if descending else (x > y) - (x < y)
+    return 0
+
+
+def _combine(aggregate, live, archived):
+    if live is None or archived is None:
+        return archived if live is None else live
+    if isinstance(aggregate, (Count, Sum)):
+        return live + archived
+    if isinstance(aggregate, Max):
+        return max(live, archived)
+    if isinstance(aggregate, Min):
+        return min(live, archived)
+    raise TypeError(f'{type(aggregate).__name__} does not combine across the archive')
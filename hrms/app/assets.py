@@ -0,0 +1,168 @@
+"""
+The static asset pipeline: fingerprinted, precompressed, served with far-future caching.
+
+``collectstatic`` writes every file under a content-hashed name next to the
+original and records the mapping in ``staticfiles.json``; ``{% static %}``
+then links the hashed name. A gzip variant (and a brotli one when the
+optional ``brotli`` package is installed) is written beside each text asset
+that compresses. ``StaticAssetMiddleware`` answers requests for those files
+before the rest of the stack runs, picks the variant the client accepts, and
+marks hashed names immutable for a year, since their content can never change
+under the same URL. A browser holding a page's assets makes no static
+requests on the next load.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE = {'.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.html', '.xml', '.ico'}
+# below this, the headers cost more than compression saves
+MIN_SIZE = 256
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, no-cache'
+
+
+def encoders():
+    yield 'gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield 'br', '.br', lambda data: brotli.compress(data, quality=11)
+
+
+def compress(path):
+    """Write the compressed variants of ``path`` that come out at least 5% smaller."""
+    data = Path(path).read_bytes()
+    if len(data) < MIN_SIZE:
+        return
+    for _, suffix, encode in encoders():
+        compressed = encode(data)
+        if len(compressed) < len(data) * 0.95:
+            Path(path + suffix).write_bytes(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also precompresses what it collects."""
+
+    def stored_name(self, name):
+        # nothing collected yet (development, the test suite): link the source
+        # names, as plain STATIC_URL did
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE and self.exists(name):
+                compress(self.path(name))
+
+
+class Asset:
+    def __init__(self, path, immutable):
+        self.path = path
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'image/svg+xml'):
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        self.cache_control = IMMUTABLE if immutable else REVALIDATE
+        # most preferred first
+        self.variants = [(encoding, path + suffix) for encoding, suffix, _ in reversed(list(encoders()))
+                         if os.path.exists(path + suffix)]
+        self.etags = {encoding: self.etag(variant, encoding) for encoding, variant in [(None, path), *self.variants]}
+
+    @staticmethod
+    def etag(path, encoding):
+        digest = hashlib.md5(Path(path).read_bytes(), usedforsecurity=False).hexdigest()[:16]
+        return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+    def pick(self, accept_encoding):
+        for encoding, path in self.variants:
+            if accepts(accept_encoding, encoding):
+                return encoding, path
+        return None, self.path
+
+    def respond(self, request):
+        encoding, path = self.pick(request.headers.get('Accept-Encoding', ''))
+        etag = self.etags[encoding]
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            data = Path(path).read_bytes()
+            response = HttpResponse(b'' if request.method == 'HEAD' else data, content_type=self.content_type)
+            response['Content-Length'] = len(data)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Cache-Control'] = self.cache_control
+        if self.variants:
+            response['Vary'] = 'Accept-Encoding'
+        return response
+
+
+def accepts(accept_encoding, coding):
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        if name.strip().lower() == coding:
+            quality = params.replace(' ', '').removeprefix('q=') or '1'
+            try:
+                return float(quality) > 0
+            except ValueError:
+                return True
+    return False
+
+
+def load_assets(root, base_url, manifest_name):
+    """``{url path: Asset}`` for everything collectstatic wrote under ``root``."""
+    root = Path(root)
+    try:
+        manifest = json.loads((root / manifest_name).read_text())
+    except (OSError, ValueError):
+        return {}
+    hashed = set(manifest.get('paths', {}).values())
+    assets = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.gz', '.br')) or filename == manifest_name:
+                continue
+            path = os.path.join(dirpath, filename)
+            name = Path(path).relative_to(root).as_posix()
+            assets[base_url + name] = Asset(path, immutable=name in hashed)
+    return assets
+
+
+class StaticAssetMiddleware:
+    """
+    Serves the collected static files ahead of sessions, auth and the
+    database. Stands aside under DEBUG, where runserver serves the source
+    files, and until collectstatic has written a manifest.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if settings.DEBUG or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.assets = load_assets(settings.STATIC_ROOT, staticfiles_storage.base_url,
+                                  getattr(staticfiles_storage, 'manifest_name', 'staticfiles.json'))
+        if not self.assets:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        asset = self.assets.get(request.path_info)
+        if asset is None or request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        return asset.respond(request)
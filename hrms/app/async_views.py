@@ -0,0 +1,116 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.views import redirect_to_login
+
+from .concurrency import gather_queries
+from .models import Department, Employee
+from .pagination import KeysetPaginator
+from .stats import adashboard_stats, plan_status_counts
+from .views import AllLearningView, DashboardView, PerformanceList, SubordinateView
+
+
+class AsyncListMixin:
+    """
+    Serves a list view from the event loop when the site runs under ASGI. The
+    sync view's queryset, filters and template are reused as they are; the
+    rows and every count the page shows are fetched together with
+    ``gather_queries`` and handed to the template ready-made.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        # LoginRequiredMixin.dispatch reads the lazy request.user, a sync query
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), self.get_login_url(), self.get_redirect_field_name())
+        # otherwise the first template that touches request.user looks it up again
+        request.user = user
+        await request.principal.aload(user)
+        return await super(LoginRequiredMixin, self).dispatch(request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        await self.prepare()
+        # building the queryset may validate filter choices against the database
+        self.object_list = await sync_to_async(self.get_queryset)()
+        context = await self.get_async_context_data()
+        return self.render_to_response(context)
+
+    async def prepare(self):
+        pass
+
+    def load_nav(self):
+        # the nav's "has reports" check, so rendering doesn't have to query for it
+        return self.request.principal.direct_report_ids
+
+    def page_query(self):
+        paginator = KeysetPaginator(self.object_list, self.paginate_by, ordering=self.paginate_ordering)
+        return lambda: paginator.page(after=self._cursor_param('after'), before=self._cursor_param('before'))
+
+    def list_context(self, rows, page=None, **extra):
+        """What ListView.get_context_data would build, from rows already fetched."""
+        context = {
+            'view': self,
+            'paginator': page.paginator if page is not None else None,
+            'page_obj': page,
+            'is_paginated': page is not None and page.has_other_pages(),
+            'object_list': rows,
+        }
+        name = self.get_context_object_name(self.object_list)
+        if name:
+            context[name] = rows
+        context.update(extra)
+        return context
+
+
+class AsyncSubordinateScopeMixin:
+    async def prepare(self):
+        await self.request.principal.areport_ids(self.show_all_levels())
+
+
+class AsyncDashboardView(AsyncListMixin, DashboardView):
+    async def get_async_context_data(self):
+        principal = self.request.principal
+        is_ceo_or_hr = principal.is_ceo_or_hr
+        queries = [self.page_query(), lambda: self.get_meeting(principal.employee), self.load_nav]
+        if is_ceo_or_hr:
+            queries.append(lambda: list(Department.objects.all()))
+        (page, meeting, _, *departments), stats = await asyncio.gather(
+            gather_queries(*queries),
+            adashboard_stats(principal.employee, self.object_list if is_ceo_or_hr else None),
+        )
+        context = self.list_context(page.object_list, page, is_ceo_or_hr=is_ceo_or_hr, stats=stats, meeting=meeting)
+        if is_ceo_or_hr:
+            context.update(filter=self.filter, departments=departments[0], role_choices=Employee.ROLE_CHOICES)
+        return context
+
+
+class AsyncSubordinateView(AsyncSubordinateScopeMixin, AsyncListMixin, SubordinateView):
+    async def get_async_context_data(self):
+        plans, counts, _ = await gather_queries(
+            lambda: list(self.object_list),
+            lambda: plan_status_counts(self.object_list),
+            self.load_nav,
+        )
+        return self.list_context(plans, **counts, scope_all=self.show_all_levels(),
+                                 subordinate_count=len(self.subordinate_ids()),
+                                 include_archived=self.include_archived())
+
+
+class AsyncAllLearningView(AsyncListMixin, AllLearningView):
+    async def get_async_context_data(self):
+        page, _ = await gather_queries(self.page_query(), self.load_nav)
+        return self.list_context(page.object_list, page, is_ceo_or_hr=self.request.principal.is_ceo_or_hr,
+                                 include_archived=self.include_archived())
+
+
+class AsyncPerformanceList(AsyncSubordinateScopeMixin, AsyncListMixin, PerformanceList):
+    async def get_async_context_data(self):
+        performances, pending, _ = await gather_queries(
+            lambda: list(self.object_list),
+            self.pending_grading,
+            self.load_nav,
+        )
+        return self.list_context(performances, scope_all=self.show_all_levels(),
+                                 subordinate_count=len(self.subordinate_ids()), pending_grading=pending,
+                                 sort=self.request.GET.get('sort', ''), include_archived=self.include_archived())
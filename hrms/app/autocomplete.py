@@ -0,0 +1,72 @@
+"""
+Type-ahead choices for foreign keys with too many rows to render as a <select>.
+
+``AutocompleteChoiceField`` is a ModelChoiceField whose widget renders the
+selected row's label and nothing else: one query for an edit form, none for a
+blank one, however many rows the table holds. The browser asks a JSON
+endpoint for matches as the user types. On submit, ModelChoiceField looks up
+just the submitted id, so validation is a single indexed get().
+"""
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+from . import search
+from .models import Department, Employee
+
+LIMIT = 10
+
+
+def employee_label(employee):
+    # the email tells two people with the same name apart
+    return f'{employee.user.get_full_name()} ({employee.user.email})'
+
+
+def match_employees(term, limit=LIMIT):
+    """Employees for ``term``: name and email prefixes first, from the search index."""
+    ids = search.search_employee_ids(term, limit)
+    employees = Employee.objects.select_related('user').in_bulk(ids)
+    return [employees[pk] for pk in ids if pk in employees]
+
+
+def match_departments(term, limit=LIMIT):
+    return list(Department.objects.filter(department__istartswith=term.strip()).order_by('department')[:limit])
+
+
+class AutocompleteInput(forms.Widget):
+    template_name = 'app/widgets/autocomplete.html'
+
+    class Media:
+        js = ['app/autocomplete.js']
+
+    def __init__(self, url, label=str, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+        self.label = label
+        # set by AutocompleteChoiceField
+        self.queryset = None
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget'].update(url=reverse(self.url), label=self.selected_label(value))
+        return context
+
+    def selected_label(self, value):
+        if value in (None, '') or self.queryset is None:
+            return ''
+        try:
+            selected = self.queryset.filter(pk=value).first()
+        except (TypeError, ValueError, ValidationError):
+            # whatever was typed into a form that failed validation
+            return ''
+        return self.label(selected) if selected else ''
+
+
+class AutocompleteChoiceField(forms.ModelChoiceField):
+    def __init__(self, queryset, url, label=str, **kwargs):
+        kwargs.setdefault('widget', AutocompleteInput(url, label))
+        super().__init__(queryset, **kwargs)
+        self.widget.queryset = self.queryset
+
+    def label_from_instance(self, obj):
+        return self.widget.label(obj)
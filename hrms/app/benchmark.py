@@ -0,0 +1,301 @@
+import asyncio
+import math
+import statistics
+import subprocess
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlencode
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Employee
+
+
+@dataclass(frozen=True)
+class Route:
+    """A named URL from app/urls.py, requested as one persona of the generated org."""
+    label: str
+    name: str
+    persona: str
+    arg: str = None
+    params: dict = field(default_factory=dict)
+
+
+ROUTES = [
+    Route('dashboard', 'app:dashboard', 'ceo'),
+    Route('dashboard-search', 'app:dashboard', 'hr', params={'search': 'pat'}),
+    Route('dashboard-self', 'app:dashboard', 'developer'),
+    Route('learnplan', 'app:learnplan', 'developer'),
+    Route('allPlans', 'app:allPlans', 'hr'),
+    Route('subordinates', 'app:subordinates', 'manager'),
+    Route('subordinates-all', 'app:subordinates', 'lead', params={'scope': 'all'}),
+    Route('perflist', 'app:perflist', 'manager'),
+    Route('detailperf', 'app:detailperf', 'manager', arg='review'),
+    Route('gradeperf', 'app:gradeperf', 'lead', arg='review'),
+    Route('learnplandeep', 'app:learnplandeep', 'lead', arg='plan'),
+    Route('reviewlp', 'app:reviewlp', 'lead', arg='plan'),
+    Route('empupdate', 'app:empupdate1', 'developer'),
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(samples):
+    return {
+        'p50': round(percentile(samples, 50), 3),
+        'p90': round(percentile(samples, 90), 3),
+        'p95': round(percentile(samples, 95), 3),
+        'p99': round(percentile(samples, 99), 3),
+        'max': round(max(samples), 3),
+        'mean': round(statistics.fmean(samples), 3),
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_route(client, route, url, iterations, warmup):
+    for _ in range(warmup):
+        client.get(url, route.params)
+    latencies, sql_times, query_counts, status = [], [], [], None
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(url, route.params)
+            # streamed bodies are produced while they're read, so read them inside the timing
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            latencies.append((time.perf_counter() - started) * 1000)
+        status = response.status_code
+        query_counts.append(len(queries))
+        sql_times.append(sum(float(query['time']) for query in queries.captured_queries) * 1000)
+    return {
+        'url': url,
+        'persona': route.persona,
+        'params': route.params,
+        'status': status,
+        'latency_ms': summarize(latencies),
+        'sql_ms': summarize(sql_times),
+        'queries': {'min': min(query_counts), 'max': max(query_counts)},
+    }
+
+
+def run_routes(org, routes=ROUTES, iterations=20, warmup=2):
+    """Request every route ``iterations`` times and report latency percentiles and query counts."""
+    client = Client(HTTP_HOST='localhost')
+    users = {}
+    results = {}
+    for route in routes:
+        if route.persona not in users:
+            users[route.persona] = Employee.objects.select_related('user').get(pk=getattr(org, route.persona)).user
+        client.force_login(users[route.persona])
+        url = reverse(route.name, args=[getattr(org, route.arg)] if route.arg else None)
+        results[route.label] = bench_route(client, route, url, iterations, warmup)
+    return results
+
+
+def compare(previous, current, threshold=1.2):
+    """
+    Pair runs of the same size and yield ``(employees, label, old, new, regressed)``
+    for every route present in both. A route regresses when its p95 grows past
+    ``threshold`` times the old value or it issues more queries.
+    """
+    before = {run['employees']: run['routes'] for run in previous['runs']}
+    for run in current['runs']:
+        for label, new in run['routes'].items():
+            old = before.get(run['employees'], {}).get(label)
+            if old is None:
+                continue
+            regressed = (new['latency_ms']['p95'] > old['latency_ms']['p95'] * threshold or
+                         new['queries']['max'] > old['queries']['max'])
+            yield run['employees'], label, old, new, regressed
+
+
+# the list pages with an async twin (named ``<name>_async`` in app/urls.py)
+LOAD_ROUTES = [
+    Route('dashboard', 'app:dashboard', 'ceo'),
+    Route('allPlans', 'app:allPlans', 'hr'),
+    Route('subordinates', 'app:subordinates', 'manager'),
+    Route('perflist', 'app:perflist', 'manager'),
+]
+
+
+def load_result(latencies, statuses, elapsed):
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'statuses': dict(statuses),
+        'latency_ms': summarize(latencies),
+    }
+
+
+def load_wsgi(path, params, cookie, requests, concurrency, threads):
+    """
+    ``concurrency`` clients issue ``requests`` between them, each waiting for
+    its response before sending the next, against a WSGI server with
+    ``threads`` worker threads. Latency includes waiting for a free worker.
+    """
+    handler = WSGIHandler()
+    factory = RequestFactory(HTTP_HOST='localhost')
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def serve():
+        status = []
+        environ = factory.get(path, params, HTTP_COOKIE=cookie).environ
+        response = handler(environ, lambda line, headers, exc_info=None: status.append(int(line.split()[0])))
+        try:
+            for _ in response:
+                pass
+        finally:
+            # fires request_finished, as a server would
+            response.close()
+        return status[0]
+
+    def client(server):
+        while True:
+            with lock:
+                if not remaining[0]:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            status = server.submit(serve).result()
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[status] += 1
+
+    with ThreadPoolExecutor(threads) as server:
+        clients = [threading.Thread(target=client, args=(server,)) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    return load_result(latencies, statuses, elapsed)
+
+
+async def _load_asgi(path, params, cookie, requests, concurrency):
+    handler = ASGIHandler()
+    latencies, statuses = [], Counter()
+    remaining = [requests]
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'query_string': urlencode(params).encode(),
+        'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+    }
+
+    async def serve():
+        status, done, sent = [], asyncio.Event(), []
+
+        async def receive():
+            if not sent:
+                sent.append(True)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # the client stays connected until the whole body has arrived
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif not message.get('more_body'):
+                done.set()
+
+        await handler(dict(scope), receive, send)
+        return status[0]
+
+    async def client():
+        while remaining[0]:
+            remaining[0] -= 1
+            started = time.perf_counter()
+            status = await serve()
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return load_result(latencies, statuses, time.perf_counter() - started)
+
+
+def load_asgi(path, params, cookie, requests, concurrency):
+    """The same client load against Django's ASGI handler on one event loop."""
+    return asyncio.run(_load_asgi(path, params, cookie, requests, concurrency))
+
+
+def session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    return '; '.join(f'{name}={morsel.value}' for name, morsel in client.cookies.items())
+
+
+def login_burst(users, password, concurrency, pages):
+    """
+    ``concurrency`` clients sign in as ``users`` all at once, each opening the
+    dashboard ``pages`` times after its login. Returns the login and page
+    latencies and, per login and per page, the SQL statements run and how
+    many of them read or wrote the session table.
+    """
+    login_url, page_url = reverse('app:login'), reverse('app:dashboard')
+    lock = threading.Lock()
+    latencies = {'login': [], 'page': []}
+    statements = {phase: Counter() for phase in latencies}
+    statuses = Counter()
+
+    def counting(phase):
+        def wrapper(execute, sql, params, many, context):
+            kind = 'queries'
+            if 'django_session' in sql:
+                kind = 'session_reads' if sql.lstrip().upper().startswith('SELECT') else 'session_writes'
+            with lock:
+                statements[phase]['queries'] += 1
+                if kind != 'queries':
+                    statements[phase][kind] += 1
+            return execute(sql, params, many, context)
+        return wrapper
+
+    def timed(phase, request):
+        with connection.execute_wrapper(counting(phase)):
+            started = time.perf_counter()
+            response = request()
+            elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies[phase].append(elapsed)
+            statuses[f'{phase} {response.status_code}'] += 1
+
+    def sign_in(user):
+        client = Client(HTTP_HOST='localhost')
+        timed('login', lambda: client.post(login_url, {'username': user.username, 'password': password}))
+        for _ in range(pages):
+            timed('page', lambda: client.get(page_url))
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        started = time.perf_counter()
+        list(pool.map(sign_in, users))
+        elapsed = time.perf_counter() - started
+    result = {'logins': len(users), 'logins_per_s': round(len(users) / elapsed, 1), 'statuses': dict(statuses)}
+    for phase, samples in latencies.items():
+        if samples:
+            result[f'{phase}_ms'] = summarize(samples)
+            result[f'per_{phase}'] = {kind: round(count / len(samples), 2) for kind, count in statements[phase].items()}
+    return result
@@ -0,0 +1,38 @@
+"""
+Run a view's independent read queries at the same time.
+
+Django's async ORM (``aget``, ``acount``, ``aaggregate``...) hands every call
+to the request's one sync thread, so ``asyncio.gather`` over them still runs
+the SQL one statement after another. ``gather_queries`` runs each callable on
+a worker thread of its own, with that thread's own database connection, and
+awaits them together: the request waits for the slowest query instead of the
+sum of all of them.
+
+Reads only. The worker connections are outside the request's transaction and
+see committed rows, which is all the list pages need.
+"""
+import asyncio
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from .middleware import current_metrics
+
+
+def _run(query):
+    metrics = current_metrics.get()
+    try:
+        with ExitStack() as stack:
+            if metrics is not None:
+                metrics.wrap(stack)
+            return query()
+    finally:
+        # what request_finished does on a request's own thread: release the
+        # connection unless the database profile keeps it open
+        close_old_connections()
+
+
+async def gather_queries(*queries):
+    """Call each zero-argument callable on its own thread; results come back in order."""
+    return await asyncio.gather(*(sync_to_async(_run, thread_sensitive=False)(query) for query in queries))
@@ -0,0 +1,89 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# rows are pulled from the cursor this many at a time, so memory stays flat
+# however large the table is
+CHUNK_SIZE = 2000
+
+EMPLOYEE_COLUMNS = [
+    ('employee_id', 'employee_id'),
+    ('username', 'employee__user__username'),
+    ('first_name', 'employee__user__first_name'),
+    ('last_name', 'employee__user__last_name'),
+    ('email', 'employee__user__email'),
+    ('role', 'employee__role'),
+    ('department', 'employee__department__department'),
+]
+
+LEARNING_PLAN_COLUMNS = [('id', 'pk'), *EMPLOYEE_COLUMNS] + [
+    ('quarter_date', 'quarter_date'),
+    ('status', 'status'),
+    ('completed_learning', 'completed_learning'),
+    ('planned_learning', 'planned_learning'),
+    ('review_note', 'review_note'),
+    ('approved_by', 'approved_by__user__username'),
+    ('schedule_meeting', 'schedule_meeting'),
+    ('submitted_at', 'submitted_at'),
+    ('end_date', 'end_date'),
+]
+
+PERFORMANCE_COLUMNS = [('id', 'pk'), *EMPLOYEE_COLUMNS] + [
+    ('graded', 'graded'),
+    ('responsibility_rating', 'responsibility_rating'),
+    ('communication_rating', 'communication_rating'),
+    ('quality_rating', 'quality_rating'),
+    ('accountability_rating', 'accountability_rating'),
+    ('overall_score', 'overall_score'),
+    ('comments', 'comments'),
+    ('commented_by', 'commented_by__user__username'),
+]
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+
+
+class _Echo:
+    """File-like sink that hands csv.writer's output straight back."""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, columns, chunk_size=CHUNK_SIZE, archived=None):
+    # values_list joins the related columns in the one query and skips model instances
+    lookups = [lookup for _, lookup in columns]
+    if archived is not None:
+        # archived rows are the older ones, so archive first keeps roughly id order
+        yield from archived.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+    yield from queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def iter_csv(queryset, columns, chunk_size=CHUNK_SIZE, archived=None):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in columns])
+    for row in iter_rows(queryset, columns, chunk_size, archived):
+        yield writer.writerow(row)
+
+
+def iter_jsonl(queryset, columns, chunk_size=CHUNK_SIZE, archived=None):
+    headers = [header for header, _ in columns]
+    for row in iter_rows(queryset, columns, chunk_size, archived):
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_response(queryset, columns, name, fmt='csv', archived=None):
+    """
+    Stream ``queryset`` as CSV or JSON Lines without materializing it, after
+    the same rows from the ``archived`` queryset if one is given.
+    """
+    content_type, extension = FORMATS[fmt]
+    iter_format = iter_csv if fmt == 'csv' else iter_jsonl
+    rows = iter_format(queryset, columns, archived=archived)
+    response = StreamingHttpResponse(rows, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{name}.{extension}"'
+    return response
@@ -1,6 +1,7 @@
+import datetime
 import django_filters
-from .models import Department, Employee
-from django.db.models import Q
+from .models import Department, Employee, LearningPlan, PerformanceReview
+from .search import filter_employees, rank_employees
 
 class employee_filter(django_filters.FilterSet):
     search = django_filters.CharFilter(method='filter_search', label='Search')
@@ -20,7 +21,60 @@ class employee_filter(django_filters.FilterSet):
         fields = ['department','role']
 
     def filter_search(self, queryset, name, value):
-        return queryset.filter(
-            Q(user__first_name__icontains = value) |
-            Q(user__last_name__icontains = value) |
-            Q(user__email__icontains = value))
\ No newline at end of file
+        return filter_employees(queryset, value)
+
+
+class ranked_employee_filter(employee_filter):
+    """The dashboard's directory filter: ``search`` orders its matches best first."""
+
+    def filter_search(self, queryset, name, value):
+        return rank_employees(queryset, value)
+
+def quarter_range(value):
+    """``2025-Q3`` -> (first day, first day of the next quarter), or None if malformed."""
+    year, _, quarter = value.upper().partition('-Q')
+    if not (year.isdigit() and quarter in ('1', '2', '3', '4')):
+        return None
+    try:
+        start = datetime.date(int(year), 3 * int(quarter) - 2, 1)
+        end = datetime.date(start.year + 1, 1, 1) if quarter == '4' else datetime.date(start.year, start.month + 3, 1)
+    except ValueError:
+        # outside date's years 1-9999 (0-Q1, 9999-Q4), or digits int() rejects
+        return None
+    return start, end
+
+
+def filter_quarter(queryset, name, value):
+    """``?quarter=2025-Q3`` for anything with a ``quarter_date``; a malformed quarter matches nothing."""
+    bounds = quarter_range(value)
+    if bounds is None:
+        return queryset.none()
+    return queryset.filter(quarter_date__gte=bounds[0], quarter_date__lt=bounds[1])
+
+
+class learning_plan_filter(django_filters.FilterSet):
+    status = django_filters.ChoiceFilter(choices=LearningPlan.Options)
+    department = django_filters.ModelChoiceFilter(
+        field_name='employee__department',
+        queryset=Department.objects.all()
+    )
+    quarter = django_filters.CharFilter(method=filter_quarter)
+
+    class Meta:
+        model = LearningPlan
+        fields = ['status']
+
+
+class performance_filter(django_filters.FilterSet):
+    graded = django_filters.ChoiceFilter(choices=PerformanceReview.options)
+    department = django_filters.ModelChoiceFilter(
+        field_name='employee__department',
+        queryset=Department.objects.all()
+    )
+    min_score = django_filters.NumberFilter(field_name='overall_score', lookup_expr='gte')
+    max_score = django_filters.NumberFilter(field_name='overall_score', lookup_expr='lte')
+    quarter = django_filters.CharFilter(method=filter_quarter)
+
+    class Meta:
+        model = PerformanceReview
+        fields = ['graded']
@@ -1,7 +1,18 @@
 from django import forms
-from .models import Employee,LearningPlan,PerformanceReview
+from .models import Employee,LearningPlan,PerformanceReview,ReportingPath,RATING_FIELDS
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
+from django.db import transaction
+from .autocomplete import AutocompleteChoiceField, employee_label
+from .models import Department
+
+# the whole org is too many rows for a <select>; both are searched as you type
+def department_field():
+    return AutocompleteChoiceField(Department.objects.all(), url='app:autocomplete_departments')
+
+def reporting_to_field():
+    return AutocompleteChoiceField(Employee.objects.select_related('user'), url='app:autocomplete_employees',
+                                   label=employee_label, required=False)
 
 class EmployeeCreateForm(forms.ModelForm):
     username = forms.CharField(max_length=30,required=True)
@@ -10,14 +21,14 @@ class EmployeeCreateForm(forms.ModelForm):
     email = forms.EmailField(required=True)
     first_name = forms.CharField(max_length=20,required=True)
     last_name = forms.CharField(max_length=20,required=True)
+    department = department_field()
+    reporting_to = reporting_to_field()
 
     class Meta:
         model = Employee
         fields = ['department','role','reporting_to',]
         widgets = {
-            'department': forms.Select(),
             'role':forms.Select(),
-            'reporting_to':forms.Select(),
         }
 
     def clean_role(self):
@@ -40,21 +51,34 @@ class EmployeeCreateForm(forms.ModelForm):
         return cleaned_data
     
     def save(self,commit=True):
-        user = User.objects.create_user(
-            username=self.cleaned_data['username'],
-            password=self.cleaned_data['password'],
-            email=self.cleaned_data['email'],
-            first_name=self.cleaned_data['first_name'],
-            last_name = self.cleaned_data['last_name']
-        )
-        user.save()
-        employee = super().save(commit=False)
-        employee.user = user
-        if commit:
-            employee.save()
+        # the single_ceo constraint can still reject the employee row under a race;
+        # don't leave its user behind
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=self.cleaned_data['username'],
+                password=self.cleaned_data['password'],
+                email=self.cleaned_data['email'],
+                first_name=self.cleaned_data['first_name'],
+                last_name = self.cleaned_data['last_name']
+            )
+            user.save()
+            employee = super().save(commit=False)
+            employee.user = user
+            if commit:
+                employee.save()
         return employee
 
 
+class EmployeeImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV with a header row, a JSON array of objects, or JSON Lines (one object per line)')
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith(('.csv', '.json', '.jsonl')):
+            raise ValidationError('Upload a .csv, .json or .jsonl file')
+        return upload
+
+
 class EmployeeUpdateForm(forms.ModelForm):
     class Meta:
         model = Employee
@@ -64,13 +88,14 @@ class EmployeeUpdateForm(forms.ModelForm):
         }
 
 class EmployeeAdminUpdateForm(forms.ModelForm):
+    department = department_field()
+    reporting_to = reporting_to_field()
+
     class Meta:
         model = Employee
         fields = ['department', 'role', 'reporting_to']
         widgets = {
-            'department': forms.Select(),
             'role': forms.Select(),
-            'reporting_to': forms.Select(),
         }
 
     def clean_role(self):
@@ -88,6 +113,8 @@ class EmployeeAdminUpdateForm(forms.ModelForm):
         role = self.cleaned_data.get('role')
         if role == 'CEO' and reporting_to:
             raise ValidationError('CEO cannot report to anyone')
+        if reporting_to and self.instance.pk and ReportingPath.objects.filter(ancestor=self.instance, descendant=reporting_to).exists():
+            raise ValidationError('Cannot report to someone in their own reporting line')
         return reporting_to
 
 class LearningForm(forms.ModelForm):
@@ -120,6 +147,21 @@ class LearningReviewForm(forms.ModelForm):
             'schedule_meeting':forms.DateInput(attrs={'type':'date'}),
         }
 
+class BulkLearningReviewForm(forms.Form):
+    """One status, note and meeting date for several plans of the manager's direct reports."""
+    plans = forms.ModelMultipleChoiceField(queryset=LearningPlan.objects.none(),widget=forms.CheckboxSelectMultiple)
+    status = forms.ChoiceField(choices=[('APPROVED','APPROVED'),('REVIEW','REVIEW'),('REJECTED','REJECTED')])
+    review_note = forms.CharField(max_length=50,required=False)
+    schedule_meeting = forms.DateField(required=False,widget=forms.DateInput(attrs={'type':'date'}))
+
+    def __init__(self, *args, manager=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # the permission check: a selected plan outside this queryset fails validation,
+        # and the field resolves every selected id in one query against it. No
+        # manager (a user without an Employee) means no plans, not the unmanaged ones
+        self.fields['plans'].queryset = LearningPlan.objects.gradable_by(manager).select_related('employee').filter(
+            status__in=['SUBMITTED','REVIEW'])
+
 class PerformanceReviewForm(forms.ModelForm):
     class Meta:
         model = PerformanceReview
@@ -192,4 +234,29 @@ class PerformanceReviewAdminUpdateForm(forms.ModelForm):
                 instance.save(
                     update_fields = ['graded','comments','responsibility_rating','communication_rating','quality_rating','accountability_rating']
                 )
-            return instance
\ No newline at end of file
+            return instance
+class BulkGradeForm(forms.Form):
+    """One row of the bulk grading page: a pending review and its four ratings."""
+    review = forms.IntegerField(widget=forms.HiddenInput)
+    responsibility_rating = forms.DecimalField(max_digits=3,decimal_places=1,min_value=0,max_value=5,required=False,
+                                               widget=forms.NumberInput(attrs={'step':0.1,'min':0,'max':5}))
+    communication_rating = forms.DecimalField(max_digits=3,decimal_places=1,min_value=0,max_value=5,required=False,
+                                              widget=forms.NumberInput(attrs={'step':0.1,'min':0,'max':5}))
+    quality_rating = forms.DecimalField(max_digits=3,decimal_places=1,min_value=0,max_value=5,required=False,
+                                       widget=forms.NumberInput(attrs={'step':0.1,'min':0,'max':5}))
+    accountability_rating = forms.DecimalField(max_digits=3,decimal_places=1,min_value=0,max_value=5,required=False,
+                                               widget=forms.NumberInput(attrs={'step':0.1,'min':0,'max':5}))
+    comments = forms.CharField(max_length=100,required=False,widget=forms.Textarea(attrs={'rows':1}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        given = [field for field in RATING_FIELDS if cleaned_data.get(field) is not None]
+        # a row left blank is skipped; a half-rated one is a mistake
+        if given and len(given) < len(RATING_FIELDS):
+            raise ValidationError('Give all four ratings, or leave the row blank to grade it later.')
+        return cleaned_data
+
+    def is_rated(self):
+        return all(self.cleaned_data.get(field) is not None for field in RATING_FIELDS)
+
+BulkGradeFormSet = forms.formset_factory(BulkGradeForm, extra=0)
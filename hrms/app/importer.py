@@ -0,0 +1,251 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from . import search
+from .signals import welcome_message
+from .models import Department, Employee, OutboxEmail, ReportingPath
+
+COLUMNS = ['username', 'email', 'first_name', 'last_name', 'department', 'role', 'reporting_to', 'password']
+REQUIRED = ['username', 'email', 'first_name', 'last_name', 'department', 'role']
+ROLES = {value for value, _ in Employee.ROLE_CHOICES}
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    errors: list = field(default_factory=list)
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+
+
+@dataclass
+class InvalidRow:
+    """Stands in for a row that couldn't be parsed; validation reports ``message`` for its line."""
+    message: str
+
+
+def read_rows(stream, fmt):
+    """
+    Yield ``(line, row)`` pairs from a CSV, JSON array or JSON Lines text
+    stream. CSV and JSON Lines are read without loading the file whole; a JSON
+    array has to be parsed in one go, and its "lines" are item numbers.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'json':
+        try:
+            items = json.load(stream)
+        except ValueError as e:
+            yield getattr(e, 'lineno', 1), InvalidRow(f'invalid JSON: {e}')
+            return
+        if not isinstance(items, list):
+            yield 1, InvalidRow('expected a JSON array of objects')
+            return
+        yield from enumerate(items, start=1)
+    elif fmt == 'jsonl':
+        for line, text in enumerate(stream, start=1):
+            if text.strip():
+                try:
+                    yield line, json.loads(text)
+                except ValueError as e:
+                    yield line, InvalidRow(f'invalid JSON: {e}')
+    else:
+        raise ValueError(f'Unsupported import format: {fmt}')
+
+
+def format_for(filename):
+    filename = filename.lower()
+    if filename.endswith('.csv'):
+        return 'csv'
+    return 'json' if filename.endswith('.json') else 'jsonl'
+
+
+def _init_worker():
+    # spawned workers (Windows, macOS) start without configured settings
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hrms.settings')
+    django.setup()
+
+
+class EmployeeImporter:
+    """
+    Streams rows in chunks: each chunk is validated against the database in a
+    couple of set-based queries, its passwords are hashed (across a process
+    pool when ``workers`` > 1, as the import_employees command does), and Users
+    and Employees go in with bulk_create. ``reporting_to`` names are resolved
+    once every row exists, so managers may appear after their reports.
+    """
+
+    def __init__(self, chunk_size=1000, workers=1):
+        self.chunk_size = chunk_size
+        # a web request hashes in-process; forking a pool per upload costs more than it saves
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.pool = None
+        self.departments = {}
+        for department in Department.objects.all():
+            self.departments[str(department.pk)] = department.pk
+            self.departments.setdefault(department.department.lower(), department.pk)
+        self.has_ceo = Employee.objects.filter(role='CEO').exists()
+
+    def run(self, rows):
+        result = ImportResult()
+        created = {}      # username -> employee id
+        managers = {}     # username -> (line, manager username)
+        rows = iter(rows)
+        try:
+            with transaction.atomic():
+                while chunk := list(islice(rows, self.chunk_size)):
+                    valid = self.validate(chunk, created, result)
+                    if valid:
+                        self.create(valid, created, managers)
+                links = self.link_managers(created, managers, result)
+                # only the new employees need paths; nobody existing reports to them
+                ReportingPath.objects.attach_many({pk: links.get(pk) for pk in created.values()})
+                search.index_employee_ids(created.values())
+                self.queue_welcome_emails(created.values())
+        finally:
+            if self.pool:
+                self.pool.shutdown()
+        result.created = len(created)
+        return result
+
+    def hash_passwords(self, passwords):
+        # PBKDF2 dominates an import; unset passwords are unusable and cost nothing
+        if self.workers <= 1 or not any(passwords):
+            return [make_password(password) for password in passwords]
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+        return list(self.pool.map(make_password, passwords, chunksize=max(1, len(passwords) // self.workers)))
+
+    def validate(self, chunk, created, result):
+        cleaned = []
+        usernames = set()
+        for line, row in chunk:
+            if isinstance(row, InvalidRow):
+                result.error(line, row.message)
+                continue
+            if not isinstance(row, dict):
+                result.error(line, 'expected a JSON object')
+                continue
+            row = {key: (str(row.get(key) or '')).strip() for key in COLUMNS}
+            missing = [key for key in REQUIRED if not row[key]]
+            if missing:
+                result.error(line, f'missing {", ".join(missing)}')
+                continue
+            try:
+                validate_email(row['email'])
+            except ValidationError:
+                result.error(line, f'invalid email {row["email"]}')
+                continue
+            row['role'] = row['role'].upper()
+            if row['role'] not in ROLES:
+                result.error(line, f'unknown role {row["role"]}')
+                continue
+            department = self.departments.get(row['department'].lower())
+            if department is None:
+                result.error(line, f'unknown department {row["department"]}')
+                continue
+            row['department'] = department
+            if row['username'] in created or row['username'] in usernames:
+                result.error(line, f'duplicate username {row["username"]}')
+                continue
+            if row['role'] == 'CEO':
+                if self.has_ceo:
+                    result.error(line, 'There can only be one CEO in the system.')
+                    continue
+                if row['reporting_to']:
+                    result.error(line, 'CEO cannot report to anyone')
+                    continue
+                self.has_ceo = True
+            usernames.add(row['username'])
+            cleaned.append((line, row))
+
+        taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        for line, row in cleaned:
+            if row['username'] in taken:
+                result.error(line, f'username {row["username"]} already exists')
+                if row['role'] == 'CEO':
+                    self.has_ceo = False
+        return [(line, row) for line, row in cleaned if row['username'] not in taken]
+
+    def create(self, valid, created, managers):
+        hashes = self.hash_passwords([row['password'] or None for _, row in valid])
+        users = User.objects.bulk_create([
+            User(username=row['username'], email=row['email'], first_name=row['first_name'],
+                 last_name=row['last_name'], password=password)
+            for (_, row), password in zip(valid, hashes)
+        ])
+        employees = Employee.objects.bulk_create([
+            Employee(user=user, department_id=row['department'], role=row['role'])
+            for user, (_, row) in zip(users, valid)
+        ])
+        for employee, (line, row) in zip(employees, valid):
+            created[row['username']] = employee.pk
+            if row['reporting_to']:
+                managers[row['username']] = (line, row['reporting_to'])
+
+    def link_managers(self, created, managers, result):
+        wanted = {manager for _, manager in managers.values()} - created.keys()
+        existing = dict(Employee.objects.filter(user__username__in=wanted).values_list('user__username', 'pk'))
+        lookup = {**existing, **created}
+
+        parent = {}
+        for username, (line, manager) in managers.items():
+            if manager not in lookup:
+                result.error(line, f'unknown reporting_to {manager}; imported without a manager')
+            else:
+                parent[username] = manager
+        # only imported rows can form a cycle: existing employees never point at them
+        done, visiting = set(), set()
+        for start in list(parent):
+            path, node = [], start
+            while node in parent and node not in done and node not in visiting:
+                visiting.add(node)
+                path.append(node)
+                node = parent[node]
+            if node in visiting:
+                for username in path[path.index(node):]:
+                    result.error(managers[username][0], f'reporting cycle through {username}; imported without a manager')
+                    del parent[username]
+            visiting.clear()
+            done.update(path)
+
+        links = {created[username]: lookup[manager] for username, manager in parent.items()}
+        Employee.objects.bulk_update(
+            [Employee(pk=pk, reporting_to_id=manager_id) for pk, manager_id in links.items()],
+            ['reporting_to'], batch_size=self.chunk_size)
+        return links
+
+    def queue_welcome_emails(self, employee_ids):
+        employee_ids = list(employee_ids)
+        for start in range(0, len(employee_ids), self.chunk_size):
+            chunk = Employee.objects.filter(pk__in=employee_ids[start:start + self.chunk_size]).select_related('user', 'department')
+            OutboxEmail.objects.bulk_create([
+                OutboxEmail(
+                    dedup_key=f'welcome:{employee.pk}',
+                    subject='Happy Onboarding',
+                    body=welcome_message(employee),
+                    from_email='hr@enkefalos.com',
+                    recipient=employee.user.email)
+                for employee in chunk
+            ], ignore_conflicts=True)
+
+
+def import_file(fileobj, filename, **kwargs):
+    """Import from a binary file object (an upload or an opened path)."""
+    stream = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    return EmployeeImporter(**kwargs).run(read_rows(stream, format_for(filename)))
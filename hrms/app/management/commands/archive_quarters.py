@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import archive
+
+
+class Command(BaseCommand):
+    help = ('Move approved/rejected learning plans and graded performance reviews from old quarters into the '
+            'archive tables, one bounded transaction per chunk')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quarters', type=int, default=archive.ARCHIVE_AFTER_QUARTERS,
+                            help='full quarters before the current one to keep in the hot tables')
+        parser.add_argument('--chunk-size', type=int, default=archive.CHUNK_SIZE, help='rows per transaction')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='seconds to wait between chunks, to leave room for other writers')
+        parser.add_argument('--dry-run', action='store_true', help='only count what would be archived')
+
+    def handle(self, *args, **options):
+        before = archive.cutoff(options['quarters'])
+        self.stdout.write(f'archiving rows from quarters before {before}')
+        if options['dry_run']:
+            for model in archive.ARCHIVES:
+                self.stdout.write(f'{model._meta.verbose_name_plural}: {archive.archivable(model, before).count()}')
+            return
+
+        totals = dict.fromkeys(archive.ARCHIVES, 0)
+        for model, moved in archive.archive(before, options['chunk_size']):
+            totals[model] += moved
+            if options['pause']:
+                time.sleep(options['pause'])
+        for model, total in totals.items():
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {total} archived')
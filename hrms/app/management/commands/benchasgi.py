@@ -0,0 +1,76 @@
+import datetime
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from app.benchmark import LOAD_ROUTES, current_commit, load_asgi, load_wsgi, session_cookie
+from app.models import Employee
+
+
+class Command(BaseCommand):
+    help = ('Drive the list pages at high concurrency three ways, in process: the sync views through the '
+            'WSGI handler with a fixed pool of worker threads, the same views through the ASGI handler, '
+            'and their async twins through the ASGI handler. Runs against the org already in the database '
+            '(create one with generate_org)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=64, help='clients with a request in flight')
+        parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads')
+        parser.add_argument('--requests', type=int, default=500, help='requests per route and mode')
+        parser.add_argument('--routes', nargs='+', help=f'labels to run (default: all of {", ".join(r.label for r in LOAD_ROUTES)})')
+        parser.add_argument('--output', default='bench_asgi.json')
+
+    def handle(self, *args, **options):
+        routes = LOAD_ROUTES
+        if options['routes']:
+            unknown = set(options['routes']) - {route.label for route in LOAD_ROUTES}
+            if unknown:
+                raise CommandError(f'Unknown routes: {", ".join(sorted(unknown))}')
+            routes = [route for route in LOAD_ROUTES if route.label in options['routes']]
+
+        personas = self.personas()
+        results = {
+            'commit': current_commit(),
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'employees': Employee.objects.count(),
+            'concurrency': options['concurrency'],
+            'threads': options['threads'],
+            'routes': {},
+        }
+        requests, concurrency = options['requests'], options['concurrency']
+        for route in routes:
+            cookie = session_cookie(personas[route.persona])
+            sync_path, async_path = reverse(route.name), reverse(f'{route.name}_async')
+            modes = {
+                'wsgi': load_wsgi(sync_path, route.params, cookie, requests, concurrency, options['threads']),
+                'asgi-sync-view': load_asgi(sync_path, route.params, cookie, requests, concurrency),
+                'asgi-async-view': load_asgi(async_path, route.params, cookie, requests, concurrency),
+            }
+            results['routes'][route.label] = modes
+            self.report(route.label, modes)
+
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(f'results written to {options["output"]}')
+
+    def personas(self):
+        employees = Employee.objects.select_related('user')
+        ceo = employees.filter(role='CEO').first()
+        hr = employees.filter(role='HR').first()
+        # a department head: the deepest subtree, and direct reports of their own
+        manager = employees.filter(role='MANAGER', reporting_to=ceo).first() if ceo else None
+        if not (ceo and hr and manager):
+            raise CommandError('Needs a CEO, an HR employee and a manager reporting to the CEO; run generate_org first')
+        return {'ceo': ceo.user, 'hr': hr.user, 'manager': manager.user}
+
+    def report(self, label, modes):
+        self.stdout.write(label)
+        for mode, result in modes.items():
+            latency = result['latency_ms']
+            errors = sum(count for status, count in result['statuses'].items() if status != 200)
+            self.stdout.write(
+                f'  {mode:<16} {result["rps"]:>8.1f} req/s p50={latency["p50"]:.1f}ms '
+                f'p95={latency["p95"]:.1f}ms p99={latency["p99"]:.1f}ms non-200={errors}')
@@ -0,0 +1,68 @@
+import datetime
+import json
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from app.benchmark import current_commit, login_burst
+from app.orggen import GENERATED_USERNAMES
+
+
+class Command(BaseCommand):
+    help = ('Sign in a burst of users from the generated org at the same moment, each then opening the '
+            'dashboard a few times, under the AUTH_PROFILE and PASSWORD_HASH_ITERATIONS in effect. '
+            'Their passwords are swapped for --password while it runs and put back afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='users signing in')
+        parser.add_argument('--concurrency', type=int, default=32, help='clients signing in at once')
+        parser.add_argument('--pages', type=int, default=5, help='dashboard views per user after signing in')
+        parser.add_argument('--password', default='bench-login-password')
+        parser.add_argument('--output', default='bench_login.json')
+        parser.add_argument('--force', action='store_true',
+                            help='sign in as any employee, not only the ones generate_org created')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(employee__isnull=False)
+        if not options['force']:
+            users = users.filter(username__regex=GENERATED_USERNAMES)
+        users = list(users.order_by('pk')[:options['users']])
+        if not users:
+            raise CommandError('No generated employees to sign in as; run generate_org first, or pass --force')
+        saved = dict(User.objects.filter(pk__in=[user.pk for user in users]).values_list('pk', 'password'))
+        # one hash shared by all of them, with the hasher and work factor being measured
+        User.objects.filter(pk__in=saved).update(password=make_password(options['password']))
+        try:
+            burst = login_burst(users, options['password'], options['concurrency'], options['pages'])
+        finally:
+            User.objects.bulk_update([User(pk=pk, password=password) for pk, password in saved.items()],
+                                     ['password'], batch_size=500)
+
+        result = {
+            'commit': current_commit(),
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'auth_profile': settings.AUTH_PROFILE,
+            'session_engine': settings.SESSION_ENGINE,
+            'hash_iterations': get_hasher().iterations,
+            'concurrency': options['concurrency'],
+            'pages': options['pages'],
+            **burst,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(result, f, indent=2)
+
+        self.stdout.write(f'{settings.AUTH_PROFILE} profile, {result["hash_iterations"]} PBKDF2 iterations: '
+                          f'{result["logins_per_s"]} logins/s')
+        for phase in ('login', 'page'):
+            if f'{phase}_ms' not in result:
+                continue
+            latency, per = result[f'{phase}_ms'], result[f'per_{phase}']
+            self.stdout.write(
+                f'  {phase:<6} p50={latency["p50"]:.1f}ms p95={latency["p95"]:.1f}ms  '
+                f'{per.get("queries", 0)} queries, {per.get("session_reads", 0)} session reads, '
+                f'{per.get("session_writes", 0)} session writes each')
+        self.stdout.write(f'results written to {options["output"]}')
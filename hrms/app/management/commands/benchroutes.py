@@ -0,0 +1,70 @@
+import datetime
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from app.benchmark import ROUTES, compare, current_commit, run_routes
+from app.orggen import generate_org
+
+
+class Command(BaseCommand):
+    help = 'Time the named routes against synthetic orgs of each size (rolled back afterwards) and save the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, nargs='+', default=[1000, 10_000, 100_000])
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--fanout', type=int, default=8)
+        parser.add_argument('--quarters', type=int, default=4)
+        parser.add_argument('--routes', nargs='+', help=f'labels to run (default: all of {", ".join(r.label for r in ROUTES)})')
+        parser.add_argument('--output', default='bench_routes.json')
+        parser.add_argument('--compare', help='earlier results file to diff against')
+
+    def handle(self, *args, **options):
+        routes = ROUTES
+        if options['routes']:
+            unknown = set(options['routes']) - {route.label for route in ROUTES}
+            if unknown:
+                raise CommandError(f'Unknown routes: {", ".join(sorted(unknown))}')
+            routes = [route for route in ROUTES if route.label in options['routes']]
+
+        results = {
+            'commit': current_commit(),
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'runs': [],
+        }
+        for size in options['employees']:
+            with transaction.atomic():
+                started = time.perf_counter()
+                org = generate_org(size, fanout=options['fanout'], quarters=options['quarters'])
+                generated = time.perf_counter() - started
+                run = {'employees': size, 'generate_s': round(generated, 2),
+                       'routes': run_routes(org, routes, options['iterations'], options['warmup'])}
+                transaction.set_rollback(True)
+            results['runs'].append(run)
+            self.report(run)
+
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(f'results written to {options["output"]}')
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f)
+            for size, label, old, new, regressed in compare(previous, results):
+                self.stdout.write(
+                    f'{size:>7} {label:<18} p95 {old["latency_ms"]["p95"]:>8.2f} -> {new["latency_ms"]["p95"]:>8.2f}ms '
+                    f'queries {old["queries"]["max"]:>3} -> {new["queries"]["max"]:>3}'
+                    + ('  REGRESSED' if regressed else ''))
+
+    def report(self, run):
+        self.stdout.write(f'{run["employees"]} employees (generated in {run["generate_s"]}s)')
+        for label, result in run['routes'].items():
+            latency = result['latency_ms']
+            self.stdout.write(
+                f'  {label:<18} {result["status"]} p50={latency["p50"]:.2f}ms p95={latency["p95"]:.2f}ms '
+                f'p99={latency["p99"]:.2f}ms queries={result["queries"]["max"]}')
@@ -0,0 +1,77 @@
+import random
+import statistics
+import string
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.models import Department, Employee
+from app.search import filter_employees, rebuild_index, search_employee_ids
+
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda',
+               'David', 'Elizabeth', 'Priya', 'Arjun', 'Darshan', 'Ananya', 'Wei', 'Yuki']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+              'Sharma', 'Patel', 'Kumar', 'Chen', 'Tanaka', 'Nair', 'Rao', 'Iyer']
+
+
+class Command(BaseCommand):
+    help = 'Time employee search lookups against a synthetic directory (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        with transaction.atomic():
+            self.populate(options['employees'], rng)
+            terms = [self.term(rng) for _ in range(options['queries'])]
+            typos = [self.typo(rng) for _ in range(options['queries'])]
+
+            self.report('ranked search', self.time(search_employee_ids, terms))
+            self.report('fuzzy search', self.time(search_employee_ids, typos))
+            self.report('dashboard filter', self.time(
+                lambda term: list(filter_employees(Employee.objects.all(), term)[:25]), terms))
+            transaction.set_rollback(True)
+
+    def populate(self, count, rng):
+        department = Department.objects.create(department='Bench')
+        suffix = ''.join(rng.choices(string.ascii_lowercase, k=6))
+        users = User.objects.bulk_create([
+            User(username=f'bench-{suffix}-{i}',
+                 first_name=f'{rng.choice(FIRST_NAMES)}{i % 997}',
+                 last_name=rng.choice(LAST_NAMES),
+                 email=f'bench{i}@{suffix}.example.com')
+            for i in range(count)
+        ], batch_size=5000)
+        Employee.objects.bulk_create(
+            [Employee(user=user, department=department, role='DEVELOPER') for user in users],
+            batch_size=5000)
+        rebuild_index()
+
+    def term(self, rng):
+        name = rng.choice(FIRST_NAMES + LAST_NAMES).lower()
+        start = rng.randrange(0, max(1, len(name) - 3))
+        return name[start:start + rng.randint(3, 5)]
+
+    def typo(self, rng):
+        name = list(rng.choice(FIRST_NAMES + LAST_NAMES).lower() + 'x')
+        i = rng.randrange(len(name) - 2)
+        name[i], name[i + 1] = name[i + 1], name[i]
+        return ''.join(name)
+
+    def time(self, lookup, terms):
+        samples = []
+        for term in terms:
+            started = time.perf_counter()
+            lookup(term)
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+
+    def report(self, label, samples):
+        samples = sorted(samples)
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        self.stdout.write(f'{label}: p50={statistics.median(samples):.2f}ms p95={p95:.2f}ms max={samples[-1]:.2f}ms')
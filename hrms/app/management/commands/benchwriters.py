@@ -0,0 +1,108 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, transaction
+
+from hrms import dbprofiles
+
+
+PROFILES = ['sqlite-plain', 'sqlite']
+
+
+class Command(BaseCommand):
+    help = ('Hammer a scratch database with concurrent read-then-write transactions under each '
+            'database profile and compare commits per second, lock errors and latency')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', default=PROFILES, help='sqlite-plain, sqlite and/or postgres')
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        for profile in options['profiles']:
+            with tempfile.TemporaryDirectory() as scratch:
+                alias = f'bench_{profile.replace("-", "_")}'
+                settings = dbprofiles.database(profile, None, env={**os.environ, 'SQLITE_PATH': os.path.join(scratch, 'bench.sqlite3')})
+                configured = connections.configure_settings({'default': connections.settings['default'], alias: settings})
+                connections.settings[alias] = configured[alias]
+                try:
+                    self.setup(alias)
+                    result = self.run(alias, options['writers'], options['readers'], options['seconds'])
+                    self.teardown(alias)
+                except DatabaseError as e:
+                    raise CommandError(f'{profile}: {e}')
+                finally:
+                    connections[alias].close()
+                    if getattr(connections[alias], 'pool', None):
+                        connections[alias].close_pool()
+                    del connections.settings[alias]
+            self.report(profile, result, options['seconds'])
+
+    def setup(self, alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute('CREATE TABLE bench_counter (id integer PRIMARY KEY, hits integer NOT NULL)')
+            cursor.execute('CREATE TABLE bench_event (worker integer NOT NULL, hits integer NOT NULL, note varchar(100))')
+            cursor.executemany('INSERT INTO bench_counter (id, hits) VALUES (%s, 0)', [(i,) for i in range(100)])
+
+    def teardown(self, alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute('DROP TABLE bench_event')
+            cursor.execute('DROP TABLE bench_counter')
+
+    def run(self, alias, writers, readers, seconds):
+        deadline = time.perf_counter() + seconds
+        result = {'commits': 0, 'reads': 0, 'errors': 0, 'latencies': []}
+        lock = threading.Lock()
+
+        def write(worker):
+            # the shape of grading a review: read the row, then write it and an audit row
+            row = worker % 100
+            with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                cursor.execute('SELECT hits FROM bench_counter WHERE id = %s', [row])
+                hits = cursor.fetchone()[0]
+                cursor.execute('UPDATE bench_counter SET hits = %s WHERE id = %s', [hits + 1, row])
+                cursor.execute('INSERT INTO bench_event (worker, hits, note) VALUES (%s, %s, %s)', [worker, hits, 'graded'])
+
+        def read(worker):
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT COUNT(*), MAX(hits) FROM bench_event')
+                cursor.fetchone()
+
+        def loop(worker, operation, counter):
+            commits, errors, latencies = 0, 0, []
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    operation(worker)
+                    commits += 1
+                    latencies.append((time.perf_counter() - started) * 1000)
+                except DatabaseError:
+                    errors += 1
+                # what request_finished does: drop the connection unless the profile keeps it
+                connections[alias].close_if_unusable_or_obsolete()
+            connections[alias].close()
+            with lock:
+                result[counter] += commits
+                result['errors'] += errors
+                if counter == 'commits':
+                    result['latencies'] += latencies
+
+        threads = [threading.Thread(target=loop, args=(i, write, 'commits')) for i in range(writers)]
+        threads += [threading.Thread(target=loop, args=(i, read, 'reads')) for i in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return result
+
+    def report(self, profile, result, seconds):
+        latencies = sorted(result['latencies']) or [0]
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+        self.stdout.write(
+            f'{profile:<13} {result["commits"] / seconds:>8.0f} commits/s {result["reads"] / seconds:>8.0f} reads/s '
+            f'{result["errors"]:>6} errors  write p50={statistics.median(latencies):.1f}ms p95={p95:.1f}ms')
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.orggen import generate_org
+
+
+class Command(BaseCommand):
+    help = 'Create a synthetic organization: reporting tree, quarterly learning plans and performance reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=1000)
+        parser.add_argument('--fanout', type=int, default=8, help='direct reports per manager')
+        parser.add_argument('--quarters', type=int, default=4, help='learning plans per employee, one per quarter')
+        parser.add_argument('--seed', type=int, default=42, help='also the username prefix, so use a new one per org; later orgs report to the existing CEO')
+        parser.add_argument('--password', default=None, help='shared password for every generated user (default: unusable)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            org = generate_org(options['employees'], fanout=options['fanout'], quarters=options['quarters'],
+                               seed=options['seed'], password=options['password'])
+        self.stdout.write(f'{org.employees} employees in {time.perf_counter() - started:.1f}s, levels {org.levels}')
+        self.stdout.write(f'ceo={org.ceo} hr={org.hr} manager={org.manager} lead={org.lead} developer={org.developer}')
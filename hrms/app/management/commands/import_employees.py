@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.importer import import_file
+
+
+class Command(BaseCommand):
+    help = 'Bulk import employees from a CSV, JSON array or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='.csv or .json (an array) file, anything else is read as JSON Lines')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=None, help='password hashing processes (default: CPU count)')
+
+    def handle(self, *args, **options):
+        try:
+            fileobj = open(options['path'], 'rb')
+        except OSError as e:
+            raise CommandError(e)
+        with fileobj:
+            result = import_file(fileobj, options['path'], chunk_size=options['chunk_size'], workers=options['workers'])
+        for line, message in result.errors:
+            self.stderr.write(f'line {line}: {message}')
+        self.stdout.write(f'{result.created} employees imported, {len(result.errors)} problems')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.models import ReportingPath
+
+
+class Command(BaseCommand):
+    help = 'Recompute the reporting-line closure table from Employee.reporting_to'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            ReportingPath.objects.rebuild()
+        self.stdout.write(f'{ReportingPath.objects.count()} reporting paths')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from app import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the quarterly rollup table from every performance review and learning plan'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{rollups.rebuild()} rollup rows')
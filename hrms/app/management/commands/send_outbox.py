@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox mail in batches over one connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='keep polling instead of exiting once the queue is empty')
+        parser.add_argument('--interval', type=float, default=5.0, help='seconds to sleep between polls with --loop')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            handled = outbox.drain(batch_size=options['batch_size'])
+            total += handled
+            if handled:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'{total} outbox messages processed')
@@ -0,0 +1,87 @@
+"""
+Upcoming learning plan meetings and the iCalendar feed built from them.
+
+``upcoming()`` is a date range on ``schedule_meeting``, which the partial
+``learningplan_meeting`` index covers: only plans with a meeting are in it,
+and only the next ``MEETING_WINDOW_DAYS`` of it are read, however many past
+meetings pile up.
+"""
+import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import LearningPlan
+
+MEETING_WINDOW_DAYS = getattr(settings, 'MEETING_WINDOW_DAYS', 60)
+FEED_SALT = 'app.meetings.feed'
+
+
+def upcoming(employee, include_reports=False, days=MEETING_WINDOW_DAYS, today=None):
+    """Plans of ``employee`` (and their direct reports) with a meeting from today through the next ``days`` days."""
+    today = today or timezone.localdate()
+    people = Q(employee=employee)
+    if include_reports:
+        people |= Q(employee__reporting_to=employee)
+    return (LearningPlan.objects.filter(people, schedule_meeting__gte=today,
+                                        schedule_meeting__lt=today + datetime.timedelta(days=days))
+            .order_by('schedule_meeting', 'pk'))
+
+
+def feed_token(employee):
+    """The secret part of an employee's feed URL; calendar clients can't send a session cookie."""
+    return signing.dumps(employee.pk, salt=FEED_SALT)
+
+
+def feed_employee_id(token):
+    try:
+        return signing.loads(token, salt=FEED_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def escape(text):
+    # RFC 5545 TEXT values
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def fold(line):
+    """Content lines longer than 75 octets continue on the next line after a space."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, start = [], 0
+    while start < len(encoded):
+        end = min(start + (75 if not parts else 74), len(encoded))
+        # don't split a multi-byte character
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start = end
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def iter_calendar(rows, name, host):
+    """
+    Stream a VCALENDAR, one all-day VEVENT per ``(pk, meeting date, first
+    name, last name, status, review note, updated_at)`` row.
+    """
+    yield 'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Enkefalos//HRMS//EN\r\nCALSCALE:GREGORIAN\r\n'
+    yield fold(f'X-WR-CALNAME:{escape(name)}')
+    for pk, meeting, first_name, last_name, status, note, updated_at in rows:
+        description = f'Plan status: {status}' + (f'\n{note}' if note else '')
+        stamp = updated_at.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        yield ''.join([
+            'BEGIN:VEVENT\r\n',
+            f'UID:learningplan-{pk}@{host}\r\n',
+            f'DTSTAMP:{stamp}\r\n',
+            f'LAST-MODIFIED:{stamp}\r\n',
+            f'DTSTART;VALUE=DATE:{meeting:%Y%m%d}\r\n',
+            f'DTEND;VALUE=DATE:{meeting + datetime.timedelta(days=1):%Y%m%d}\r\n',
+            fold(f'SUMMARY:{escape(f"Learning plan meeting: {first_name} {last_name}")}'),
+            fold(f'DESCRIPTION:{escape(description)}'),
+            'END:VEVENT\r\n',
+        ])
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,169 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .principal import Principal
+
+logger = logging.getLogger('app.requests')
+
+# the current request's metrics, for queries run on worker threads (see app.concurrency)
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class PrincipalMiddleware:
+    """Attach ``request.principal``; nothing is queried until a view or template reads it."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # under ASGI get_response returns the coroutine for the handler to await
+        request.principal = Principal(request.user)
+        return self.get_response(request)
+
+
+class RequestMetrics:
+    """
+    Installed as a database execute wrapper for one request: counts and times
+    every query and tallies repeats of the same SQL, the signature of an N+1.
+    Only a counter increment and two clock reads per query, so it can stay on.
+    Async views may run queries for one request on several threads at once,
+    hence the lock.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.statements = Counter()
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.sql_time += elapsed
+                self.queries += 1
+                self.statements[sql] += 1
+
+    def wrap(self, stack):
+        """Install on this thread's connections until ``stack`` closes."""
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def most_repeated(self):
+        sql, count = self.statements.most_common(1)[0] if self.statements else (None, 0)
+        return (sql, count) if count > 1 else (None, 0)
+
+
+class RequestMetricsMiddleware:
+    """
+    Reports query count, SQL time, duplicate queries and template render time in
+    a ``Server-Timing`` header, and logs a sample of requests (plus every slow
+    one) as a JSON line on the ``app.requests`` logger keyed by URL name.
+
+    Render time covers TemplateResponses, which is how the class-based views
+    render; it includes any queries the template triggers. Rows a streaming
+    response reads after the view returns are not counted.
+
+    Under ASGI the wrapper goes on the connections of the request's sync
+    thread, which is where Django's async ORM and template rendering run.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = request.metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                metrics.wrap(stack)
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        metrics = request.metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        stack = ExitStack()
+        try:
+            await sync_to_async(metrics.wrap)(stack)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - started)
+
+    def finish(self, request, response, metrics, total):
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={metrics.sql_time * 1000:.1f};desc="{metrics.queries} queries"',
+            f'dup;desc="{metrics.duplicates} duplicate queries"',
+            f'tpl;dur={metrics.render_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+        if self.should_log(total):
+            self.log(request, response, metrics, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # this middleware sits near the top, so its hook runs last, right before rendering
+        started = time.perf_counter()
+
+        def rendered(response):
+            request.metrics.render_time += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def should_log(self, total):
+        if total * 1000 >= getattr(settings, 'REQUEST_METRICS_SLOW_MS', 500):
+            return True
+        return random.random() < getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 0)
+
+    def log(self, request, response, metrics, total):
+        match = request.resolver_match
+        repeated_sql, repeated = metrics.most_repeated()
+        logger.info(json.dumps({
+            'url_name': match.view_name if match else None,
+            'method': request.method,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'sql_ms': round(metrics.sql_time * 1000, 1),
+            'queries': metrics.queries,
+            'duplicate_queries': metrics.duplicates,
+            'most_repeated_sql': repeated_sql[:200] if repeated_sql else None,
+            'most_repeated_count': repeated,
+            'template_ms': round(metrics.render_time * 1000, 1),
+        }))
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Department',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(max_length=20)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Employee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('CEO', 'CEO'), ('HR', 'HR'), ('MANAGER', 'MANAGER'), ('TEAM LEAD', 'TEAM LEAD'), ('DEVELOPER', 'DEVELOPER'), ('TESTER', 'TESTER'), ('INTERN', 'INTERN')])),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.department')),
+                ('reporting_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.employee')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LearningPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_learning', models.TextField(max_length=250)),
+                ('planned_learning', models.TextField(max_length=250)),
+                ('status', models.CharField(choices=[('APPROVED', 'APPROVED'), ('REVIEW', 'REVIEW'), ('REJECTED', 'REJECTED'), ('SUBMITTED', 'SUBMITTED'), ('PENDING', 'PENDING')], default='SUBMITTED')),
+                ('review_note', models.TextField(blank=True, max_length=50, null=True)),
+                ('schedule_meeting', models.DateField(blank=True, null=True)),
+                ('submitted_at', models.DateField(auto_now=True)),
+                ('approved_at', models.DateField(auto_now_add=True, null=True)),
+                ('end_date', models.DateField(blank=True, editable=False, null=True)),
+                ('quarter_date', models.DateField(default=django.utils.timezone.now)),
+                ('approved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='approved_plans', to='app.employee')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='learning_plans', to='app.employee')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PerformanceReview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('responsibilities', models.TextField(max_length=100)),
+                ('responsibility_self_review', models.TextField(max_length=100)),
+                ('communication', models.TextField(max_length=100)),
+                ('communication_self_review', models.TextField(max_length=100)),
+                ('quality', models.TextField(max_length=100)),
+                ('quality_self_review', models.TextField(max_length=100)),
+                ('accountability', models.TextField(max_length=100)),
+                ('accountability_self_review', models.TextField(max_length=100)),
+                ('comments', models.TextField(blank=True, max_length=100, null=True)),
+                ('responsibility_rating', models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True)),
+                ('communication_rating', models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True)),
+                ('quality_rating', models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True)),
+                ('accountability_rating', models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True)),
+                ('graded', models.CharField(choices=[('PENDING', 'PENDING'), ('GRADED', 'GRADED')], default='PENDING')),
+                ('commented_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='performance_grader', to='app.employee')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance_review', to='app.employee')),
+            ],
+        ),
+    ]
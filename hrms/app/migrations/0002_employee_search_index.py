@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:10
+
+from django.db import migrations
+
+
+# frozen copies of app.search's table layout and backfill, so this migration
+# doesn't change when that module does
+SEARCH_TABLE = 'app_employee_search'
+TRIGRAM_COLUMNS = ['first_name', 'last_name', 'email']
+
+
+def backfill_search_index(connection, batch_size=5000):
+    with connection.cursor() as cursor, connection.cursor() as writer:
+        cursor.execute(
+            'SELECT e.id, u.first_name, u.last_name, u.email '
+            'FROM app_employee e JOIN auth_user u ON u.id = e.user_id')
+        while rows := cursor.fetchmany(batch_size):
+            batch = []
+            for pk, first_name, last_name, email in rows:
+                name = f'{first_name} {last_name}'.strip()
+                prefixes = ' '.join('^' + word for word in name.split() + [email] if word)
+                batch.append((pk, name, email, prefixes))
+            writer.executemany(
+                f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, name, email, prefixes) VALUES (%s, %s, %s, %s)',
+                batch)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            f"USING fts5(name, email, prefixes, tokenize='trigram')")
+        backfill_search_index(connection)
+    elif connection.vendor == 'postgresql':
+        # icontains compiles to UPPER(col) LIKE UPPER(%s), which pg_trgm can serve
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in TRIGRAM_COLUMNS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS auth_user_{column}_trgm '
+                f'ON auth_user USING gin (UPPER({column}) gin_trgm_ops)')
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+    elif connection.vendor == 'postgresql':
+        for column in TRIGRAM_COLUMNS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS auth_user_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
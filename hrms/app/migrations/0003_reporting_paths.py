@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:03
+
+import app.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_paths(apps, schema_editor):
+    apps.get_model('app', 'ReportingPath').objects.rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_employee_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportingPath',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_paths', to='app.employee')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_paths', to='app.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='reporting_path_descendant')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_reporting_path')],
+            },
+            managers=[
+                ('objects', app.models.ReportingPathManager()),
+            ],
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:05
+
+from django.db import migrations, models
+from django.db.models.functions import Cast
+
+RATING_FIELDS = ['responsibility_rating', 'communication_rating', 'quality_rating', 'accountability_rating']
+
+
+def backfill_scores(apps, schema_editor):
+    # a frozen copy of models.overall_score_expression() as of this migration
+    total = sum((models.F(field) for field in RATING_FIELDS[1:]), models.F(RATING_FIELDS[0]))
+    expression = models.Case(
+        models.When(models.Q(**{f'{field}__isnull': False for field in RATING_FIELDS}),
+                    then=Cast(total, models.FloatField()) / len(RATING_FIELDS)),
+        default=None,
+        output_field=models.DecimalField(max_digits=4, decimal_places=3),
+    )
+    PerformanceReview = apps.get_model('app', 'PerformanceReview')
+    PerformanceReview.objects.update(overall_score=expression)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_reporting_paths'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='performancereview',
+            name='overall_score',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=3, editable=False, max_digits=4, null=True),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_outboxemail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='learningplan',
+            name='employee',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='learning_plans', to='app.employee'),
+        ),
+        migrations.AlterField(
+            model_name='performancereview',
+            name='employee',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='performance_review', to='app.employee'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['role'], name='employee_role'),
+        ),
+        migrations.AddIndex(
+            model_name='learningplan',
+            index=models.Index(fields=['employee', 'status'], name='learningplan_employee_status'),
+        ),
+        migrations.AddIndex(
+            model_name='learningplan',
+            index=models.Index(condition=models.Q(('schedule_meeting__isnull', False)), fields=['schedule_meeting'], name='learningplan_meeting'),
+        ),
+        migrations.AddIndex(
+            model_name='performancereview',
+            index=models.Index(fields=['employee', 'graded'], name='review_employee_graded'),
+        ),
+        migrations.AddConstraint(
+            model_name='employee',
+            constraint=models.UniqueConstraint(condition=models.Q(('role', 'CEO')), fields=('role',), name='single_ceo', violation_error_message='There can only be one CEO in the system.'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncQuarter
+
+
+def build_rollups(apps, schema_editor):
+    # a frozen copy of app.rollups.rebuild() as it stood here, before the archive tables
+    QuarterlyRollup = apps.get_model('app', 'QuarterlyRollup')
+    sources = [
+        (apps.get_model('app', 'PerformanceReview'),
+         {'review_count': Count('pk'),
+          'graded_count': Count('pk', filter=Q(graded='GRADED')),
+          'rating_sum': Sum('overall_score', filter=Q(graded='GRADED'))}),
+        (apps.get_model('app', 'LearningPlan'),
+         {'plan_count': Count('pk'),
+          'approved_count': Count('pk', filter=Q(status='APPROVED')),
+          'rejected_count': Count('pk', filter=Q(status='REJECTED'))}),
+    ]
+    totals = {}
+    for model, counts in sources:
+        rows = (model.objects.annotate(quarter=TruncQuarter('quarter_date'))
+                .values('employee__department', 'employee__role', 'quarter').order_by()
+                .annotate(**counts))
+        for row in rows:
+            key = (row.pop('employee__department'), row.pop('employee__role'), row.pop('quarter'))
+            totals.setdefault(key, {}).update({field: value or 0 for field, value in row.items()})
+    QuarterlyRollup.objects.bulk_create([
+        QuarterlyRollup(department_id=department_id, role=role, quarter=quarter, **counts)
+        for (department_id, role, quarter), counts in totals.items()
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='performancereview',
+            name='quarter_date',
+            field=models.DateField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='QuarterlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('CEO', 'CEO'), ('HR', 'HR'), ('MANAGER', 'MANAGER'), ('TEAM LEAD', 'TEAM LEAD'), ('DEVELOPER', 'DEVELOPER'), ('TESTER', 'TESTER'), ('INTERN', 'INTERN')])),
+                ('quarter', models.DateField()),
+                ('review_count', models.IntegerField(default=0)),
+                ('graded_count', models.IntegerField(default=0)),
+                ('rating_sum', models.DecimalField(decimal_places=3, default=0, max_digits=16)),
+                ('plan_count', models.IntegerField(default=0)),
+                ('approved_count', models.IntegerField(default=0)),
+                ('rejected_count', models.IntegerField(default=0)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='app.department')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('department', 'role', 'quarter'), name='unique_quarterly_rollup')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
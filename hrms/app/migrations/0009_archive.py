@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_quarterly_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedLearningPlan',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('completed_learning', models.TextField(max_length=250)),
+                ('planned_learning', models.TextField(max_length=250)),
+                ('status', models.CharField(choices=[('APPROVED', 'APPROVED'), ('REVIEW', 'REVIEW'), ('REJECTED', 'REJECTED'), ('SUBMITTED', 'SUBMITTED'), ('PENDING', 'PENDING')])),
+                ('review_note', models.TextField(blank=True, max_length=50, null=True)),
+                ('schedule_meeting', models.DateField(blank=True, null=True)),
+                ('submitted_at', models.DateField()),
+                ('approved_at', models.DateField(blank=True, null=True)),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('quarter_date', models.DateField(db_index=True)),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('approved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.employee')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_learning_plans', to='app.employee')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedPerformanceReview',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('responsibilities', models.TextField(max_length=100)),
+                ('responsibility_self_review', models.TextField(max_length=100)),
+                ('communication', models.TextField(max_length=100)),
+                ('communication_self_review', models.TextField(max_length=100)),
+                ('quality', models.TextField(max_length=100)),
+                ('quality_self_review', models.TextField(max_length=100)),
+                ('accountability', models.TextField(max_length=100)),
+                ('accountability_self_review', models.TextField(max_length=100)),
+                ('comments', models.TextField(blank=True, max_length=100, null=True)),
+                ('responsibility_rating', models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True)),
+                ('communication_rating', models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True)),
+                ('quality_rating', models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True)),
+                ('accountability_rating', models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True)),
+                ('graded', models.CharField(choices=[('PENDING', 'PENDING'), ('GRADED', 'GRADED')])),
+                ('overall_score', models.DecimalField(blank=True, decimal_places=3, max_digits=4, null=True)),
+                ('quarter_date', models.DateField(db_index=True)),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('commented_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.employee')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_performance_reviews', to='app.employee')),
+            ],
+        ),
+    ]
@@ -1,24 +1,56 @@
-from django.db import models
+from django.db import models, connection, transaction
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 import datetime
+from decimal import Decimal
 from django.utils import timezone
+from django.db.models.functions import Cast
 
 # Create your models here.
+
+# roles that see every employee's plans and reviews
+CEO_HR = ('CEO', 'HR')
+
+
 class Department(models.Model):
     department = models.CharField(max_length=20)
     def __str__(self):
         return self.department
 
-class SingleCEO(models.Manager):
-    def create_ceo(self, **kwargs):
-        if self.filter(role='CEO').exists():
-            raise ValidationError("CEO already exists")
-        else:
-            return self.create(role='CEO', **kwargs)
+class StampedQuerySet(models.QuerySet):
+    """
+    auto_now only runs in save(); stamp ``updated_at`` on queryset updates and
+    bulk_update too, since the API's ETags are built from it.
+    """
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        return super().bulk_update(objs, list(dict.fromkeys([*fields, 'updated_at'])), *args, **kwargs)
+
+class EmployeeQuerySet(StampedQuerySet):
+    def with_related(self):
+        # everything the employee rows in dashboard.html read
+        return self.select_related('user', 'department', 'reporting_to__user')
+
+    def subordinates_of(self, employee, max_depth=None):
+        # one join against the closure table instead of walking reporting_to
+        lookups = {'ancestor_paths__ancestor': employee, 'ancestor_paths__depth__gt': 0}
+        if max_depth is not None:
+            lookups['ancestor_paths__depth__lte'] = max_depth
+        return self.filter(**lookups)
+
+    def managers_of(self, employee):
+        return self.filter(descendant_paths__descendant=employee, descendant_paths__depth__gt=0)
 
 class Employee(models.Model):
-    objects=SingleCEO()
+    objects = EmployeeQuerySet.as_manager()
     ROLE_CHOICES = [
         ('CEO', 'CEO'),
         ('HR', 'HR'),
@@ -32,6 +64,39 @@ class Employee(models.Model):
     department = models.ForeignKey(Department, on_delete=models.CASCADE)
     role = models.CharField(choices=ROLE_CHOICES)
     reporting_to = models.ForeignKey('self',null=True,blank=True,on_delete=models.SET_NULL)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            # enforced by the database, so two concurrent hires can't both become CEO
+            models.UniqueConstraint(
+                fields=['role'], condition=models.Q(role='CEO'), name='single_ceo',
+                violation_error_message='There can only be one CEO in the system.'),
+        ]
+        indexes = [
+            models.Index(fields=['role'], name='employee_role'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_reporting_to_id = instance.__dict__.get('reporting_to_id')
+        # where the employee's reviews and plans are counted in QuarterlyRollup
+        instance._saved_rollup_key = (instance.__dict__.get('department_id'), instance.__dict__.get('role'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        moved = not adding and getattr(self, '_saved_reporting_to_id', object()) != self.reporting_to_id
+        if moved and self.reporting_to_id and ReportingPath.objects.filter(ancestor_id=self.pk, descendant_id=self.reporting_to_id).exists():
+            raise ValidationError('An employee cannot report to someone in their own reporting line')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                ReportingPath.objects.attach(self)
+            elif moved:
+                ReportingPath.objects.move(self)
+        self._saved_reporting_to_id = self.reporting_to_id
 
     def get_id(self):
         return self.user.id
@@ -39,7 +104,131 @@ class Employee(models.Model):
     def __str__(self):
         return self.user.get_full_name()
     
-    
+
+class ReportingPathManager(models.Manager):
+    use_in_migrations = True
+
+    def _link(self, employee_id, parent_id):
+        # every ancestor of the new parent (itself included) gains every node of the subtree
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (ancestor_id, descendant_id, depth) '
+                f'SELECT a.ancestor_id, d.descendant_id, a.depth + d.depth + 1 '
+                f'FROM {table} a, {table} d WHERE a.descendant_id = %s AND d.ancestor_id = %s',
+                [parent_id, employee_id])
+
+    def attach(self, employee):
+        self.create(ancestor_id=employee.pk, descendant_id=employee.pk, depth=0)
+        if employee.reporting_to_id:
+            self._link(employee.pk, employee.reporting_to_id)
+
+    def detach(self, employee):
+        """Cut the subtree rooted at ``employee`` loose from its current managers."""
+        subtree = self.filter(ancestor_id=employee.pk).values('descendant_id')
+        self.filter(descendant_id__in=subtree).exclude(ancestor_id__in=subtree).delete()
+
+    def move(self, employee):
+        # only the paths crossing into the moved subtree change: |ancestors| x |subtree| rows
+        self.detach(employee)
+        if employee.reporting_to_id:
+            self._link(employee.pk, employee.reporting_to_id)
+
+    def attach_many(self, parents):
+        """
+        Paths for freshly bulk-created employees, ``{employee_id: reporting_to_id
+        or None}``, none of whom has existing reports yet. Managers are linked
+        before their reports, one INSERT per level of the new rows.
+        """
+        table = self.model._meta.db_table
+        employees = self.model._meta.get_field('ancestor').related_model._meta.db_table
+        self.bulk_create([self.model(ancestor_id=pk, descendant_id=pk, depth=0) for pk in parents], batch_size=1000)
+        pending = {pk: parent for pk, parent in parents.items() if parent is not None}
+        with connection.cursor() as cursor:
+            while pending:
+                ready = [pk for pk, parent in pending.items() if parent not in pending]
+                if not ready:
+                    raise ValueError('reporting cycle among the new employees')
+                for start in range(0, len(ready), 500):
+                    chunk = ready[start:start + 500]
+                    cursor.execute(
+                        f'INSERT INTO {table} (ancestor_id, descendant_id, depth) '
+                        f'SELECT p.ancestor_id, e.id, p.depth + 1 FROM {table} p '
+                        f'JOIN {employees} e ON e.reporting_to_id = p.descendant_id '
+                        f'WHERE e.id IN ({", ".join(["%s"] * len(chunk))})', chunk)
+                for pk in ready:
+                    del pending[pk]
+
+    def rebuild(self):
+        """Recompute every path level by level; for bulk loads that bypass Employee.save()."""
+        table = self.model._meta.db_table
+        employees = self.model._meta.get_field('ancestor').related_model._meta.db_table
+        self.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (ancestor_id, descendant_id, depth) SELECT id, id, 0 FROM {employees}')
+            depth = 0
+            while True:
+                cursor.execute(
+                    f'INSERT INTO {table} (ancestor_id, descendant_id, depth) '
+                    f'SELECT p.ancestor_id, e.id, p.depth + 1 FROM {table} p '
+                    f'JOIN {employees} e ON e.reporting_to_id = p.descendant_id WHERE p.depth = %s',
+                    [depth])
+                if not cursor.rowcount:
+                    break
+                depth += 1
+
+
+class ReportingPath(models.Model):
+    """Closure table over Employee.reporting_to: one row per (manager, report) pair at any depth."""
+    ancestor = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='descendant_paths')
+    descendant = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='ancestor_paths')
+    depth = models.PositiveSmallIntegerField()
+
+    objects = ReportingPathManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_reporting_path'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='reporting_path_descendant'),
+        ]
+
+
+def rollup_snapshot(instance):
+    # what a loaded review or plan counted for in QuarterlyRollup, to take back out when it changes
+    values = instance.__dict__
+    if all(field in values for field in instance.ROLLUP_FIELDS):
+        instance._rollup_loaded = {field: values[field] for field in instance.ROLLUP_FIELDS}
+
+
+class OwnedQuerySet(StampedQuerySet):
+    """
+    Plans and reviews scoped to who may see or act on them. The check is a
+    WHERE clause on the lookup, so a detail or edit view fetches and
+    authorizes a row in one query.
+    """
+
+    def visible_to(self, employee):
+        # CEO/HR see every row; everyone else their own (the depth-0 path) and
+        # their reports' at any depth, one closure-table join
+        if employee is None:
+            return self.none()
+        if employee.role in CEO_HR:
+            return self.all()
+        return self.filter(employee__ancestor_paths__ancestor=employee)
+
+    def gradable_by(self, employee):
+        # grading stays with the direct manager
+        if employee is None:
+            return self.none()
+        return self.filter(employee__reporting_to=employee)
+
+class LearningPlanQuerySet(OwnedQuerySet):
+    def with_employee(self):
+        return self.select_related('employee__user', 'employee__department')
+
 class LearningPlan(models.Model):
     Options = [
         ('APPROVED','APPROVED'),
@@ -48,7 +237,8 @@ class LearningPlan(models.Model):
         ('SUBMITTED','SUBMITTED'),
         ('PENDING','PENDING')
     ]
-    employee = models.ForeignKey(Employee,on_delete=models.CASCADE,related_name='learning_plans')
+    # indexed through learningplan_employee_status, which leads with employee
+    employee = models.ForeignKey(Employee,on_delete=models.CASCADE,related_name='learning_plans',db_index=False)
     completed_learning = models.TextField(max_length=250)
     planned_learning = models.TextField(max_length=250)
     status = models.CharField(choices=Options,default='SUBMITTED')
@@ -59,26 +249,92 @@ class LearningPlan(models.Model):
     approved_at = models.DateField(auto_now_add=True,blank=True,null=True)
     end_date = models.DateField(null=True,blank=True,editable=False)
     quarter_date = models.DateField(default=timezone.now)
-    
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = LearningPlanQuerySet.as_manager()
+    ROLLUP_FIELDS = ('employee_id', 'quarter_date', 'status')
+    is_archived = False
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'status'], name='learningplan_employee_status'),
+            # most plans never get a meeting; only the scheduled ones are worth indexing
+            models.Index(fields=['schedule_meeting'], condition=models.Q(schedule_meeting__isnull=False),
+                         name='learningplan_meeting'),
+        ]
+
     def get_end_date(self):
         if self.end_date:
             return self.end_date.strftime("%d %b %Y")
         return "Not set"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        rollup_snapshot(instance)
+        return instance
+
     def save(self, *args, **kwargs):
         if self.quarter_date:
             self.end_date = self.quarter_date + datetime.timedelta(days=90)
-        super().save(*args, **kwargs)
+        # post_save moves the quarterly rollup; it must commit or roll back with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.employee.user.get_full_name(), self.schedule_meeting
 
+RATING_FIELDS = ['responsibility_rating', 'communication_rating', 'quality_rating', 'accountability_rating']
+RATING_VALIDATORS = [MinValueValidator(0), MaxValueValidator(5)]
+
+def fully_rated():
+    return models.Q(**{f'{field}__isnull': False for field in RATING_FIELDS})
+
+def overall_score_expression():
+    # summed as a float so SQLite doesn't integer-divide whole ratings
+    total = sum((models.F(field) for field in RATING_FIELDS[1:]), models.F(RATING_FIELDS[0]))
+    return models.Case(
+        models.When(fully_rated(), then=Cast(total, models.FloatField()) / len(RATING_FIELDS)),
+        default=None,
+        output_field=models.DecimalField(max_digits=4, decimal_places=3),
+    )
+
+class PerformanceReviewQuerySet(OwnedQuerySet):
+    def with_employee(self):
+        return self.select_related('employee__user', 'employee__department')
+
+    def score_between(self, low=None, high=None):
+        queryset = self.exclude(overall_score=None)
+        if low is not None:
+            queryset = queryset.filter(overall_score__gte=low)
+        if high is not None:
+            queryset = queryset.filter(overall_score__lte=high)
+        return queryset
+
+    def top_scored(self, limit):
+        return self.exclude(overall_score=None).order_by('-overall_score', 'pk')[:limit]
+
+    def refresh_scores(self):
+        """Recompute graded/overall_score in SQL after a queryset.update() of ratings."""
+        return self.update(
+            overall_score=overall_score_expression(),
+            graded=models.Case(models.When(fully_rated(), then=models.Value('GRADED')), default=models.Value('PENDING')),
+        )
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if set(fields) & set(RATING_FIELDS):
+            for obj in objs:
+                obj.set_score()
+            fields = list(dict.fromkeys([*fields, 'graded', 'overall_score']))
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
 class PerformanceReview(models.Model):
     options =[
         ('PENDING','PENDING'),
         ('GRADED','GRADED'),
     ]
-    employee = models.ForeignKey(Employee, on_delete=models.CASCADE,related_name='performance_review')
+    # indexed through review_employee_graded, which leads with employee
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE,related_name='performance_review',db_index=False)
     responsibilities = models.TextField(max_length=100)
     responsibility_self_review= models.TextField(max_length=100)
     communication= models.TextField(max_length=100)
@@ -89,11 +345,25 @@ class PerformanceReview(models.Model):
     accountability_self_review = models.TextField(max_length=100)
     comments = models.TextField(max_length=100,blank=True,null=True)
     commented_by = models.ForeignKey(Employee,on_delete=models.CASCADE,blank=True,null=True,related_name='performance_grader')
-    responsibility_rating = models.DecimalField(max_digits=3,decimal_places=1,blank=True,null=True)
-    communication_rating = models.DecimalField(max_digits=3,decimal_places=1,blank=True,null=True)
-    quality_rating = models.DecimalField(max_digits=3,decimal_places=1,blank=True,null=True)
-    accountability_rating = models.DecimalField(max_digits=3,decimal_places=1,blank=True,null=True)
+    # 0-5, as the forms offer; overall_score's column has no room for more
+    responsibility_rating = models.DecimalField(max_digits=3,decimal_places=1,blank=True,null=True,validators=RATING_VALIDATORS)
+    communication_rating = models.DecimalField(max_digits=3,decimal_places=1,blank=True,null=True,validators=RATING_VALIDATORS)
+    quality_rating = models.DecimalField(max_digits=3,decimal_places=1,blank=True,null=True,validators=RATING_VALIDATORS)
+    accountability_rating = models.DecimalField(max_digits=3,decimal_places=1,blank=True,null=True,validators=RATING_VALIDATORS)
     graded = models.CharField(choices=options,default='PENDING')
+    # mean of the four ratings once all are set; stored so lists can sort and filter on it
+    overall_score = models.DecimalField(max_digits=4,decimal_places=3,blank=True,null=True,editable=False,db_index=True)
+    quarter_date = models.DateField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = PerformanceReviewQuerySet.as_manager()
+    ROLLUP_FIELDS = ('employee_id', 'quarter_date', 'graded', 'overall_score')
+    is_archived = False
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'graded'], name='review_employee_graded'),
+        ]
 
     @property
     def average_score(self):
@@ -109,17 +379,172 @@ class PerformanceReview(models.Model):
             return sum(valid_ratings) / len(valid_ratings)
         return None
 
-    def save(self, *args, **kwargs):
-        if (self.responsibility_rating is not None and 
-            self.communication_rating is not None and 
-            self.quality_rating is not None and 
-            self.accountability_rating is not None):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        rollup_snapshot(instance)
+        return instance
+
+    def set_score(self):
+        ratings = [getattr(self, field) for field in RATING_FIELDS]
+        if all(rating is not None for rating in ratings):
             self.graded = 'GRADED'
+            self.overall_score = (sum(Decimal(rating) for rating in ratings) / len(ratings)).quantize(Decimal('0.001'))
         else:
             self.graded = 'PENDING'
+            self.overall_score = None
+
+    def save(self, *args, **kwargs):
+        self.set_score()
         if self.comments and self.comments.strip() and not self.commented_by:
             pass
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(RATING_FIELDS):
+            kwargs['update_fields'] = list(dict.fromkeys([*update_fields, 'graded', 'overall_score']))
+        # post_save queues the grade email; it must commit or roll back with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.employee.user.get_full_name(), self.graded
+
+class OutboxEmail(models.Model):
+    """
+    Mail queued in the same transaction as the change that caused it and
+    delivered later by ``manage.py send_outbox``.
+    """
+    PENDING = 'PENDING'
+    SENT = 'SENT'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (PENDING, 'PENDING'),
+        (SENT, 'SENT'),
+        (FAILED, 'FAILED'),
+    ]
+    dedup_key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    from_email = models.CharField(max_length=200)
+    recipient = models.CharField(max_length=254)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due'),
+        ]
 
     def __str__(self):
-        return self.employee.user.get_full_name(), self.graded
\ No newline at end of file
+        return f'{self.subject} -> {self.recipient} ({self.status})'
+
+
+class QuarterlyRollup(models.Model):
+    """
+    Running totals per (department, role, quarter) behind the quarterly report,
+    moved by app.rollups on every review and plan save or delete, so the report
+    reads a few hundred rows however many reviews there are. Bulk writes skip
+    that; ``manage.py rebuild_rollups`` recomputes everything.
+    """
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='rollups')
+    role = models.CharField(choices=Employee.ROLE_CHOICES)
+    # the first day of the quarter
+    quarter = models.DateField()
+    review_count = models.IntegerField(default=0)
+    graded_count = models.IntegerField(default=0)
+    # of overall_score over the graded reviews
+    rating_sum = models.DecimalField(max_digits=16, decimal_places=3, default=0)
+    plan_count = models.IntegerField(default=0)
+    approved_count = models.IntegerField(default=0)
+    rejected_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['department', 'role', 'quarter'], name='unique_quarterly_rollup'),
+        ]
+
+
+class ArchivedQuerySet(models.QuerySet):
+    """
+    The archive tables are only read, so their rows get the lookups the lists
+    share with the hot tables and none of the write side: no ``updated_at``
+    stamping, no score recomputation in bulk_update().
+    """
+    visible_to = OwnedQuerySet.visible_to
+    gradable_by = OwnedQuerySet.gradable_by
+    with_employee = LearningPlanQuerySet.with_employee
+    score_between = PerformanceReviewQuerySet.score_between
+
+
+class ArchivedLearningPlan(models.Model):
+    """
+    A LearningPlan moved out of the hot table by ``manage.py archive_quarters``,
+    with its original id and column values. Read-only: lists and exports reach
+    it with ``?archived=include``, and detail pages find it by its old id.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    employee = models.ForeignKey(Employee,on_delete=models.CASCADE,related_name='archived_learning_plans')
+    completed_learning = models.TextField(max_length=250)
+    planned_learning = models.TextField(max_length=250)
+    status = models.CharField(choices=LearningPlan.Options)
+    approved_by = models.ForeignKey(Employee,blank=True,null=True,on_delete=models.SET_NULL,related_name='+')
+    review_note = models.TextField(max_length=50,blank=True,null=True)
+    schedule_meeting = models.DateField(null=True,blank=True)
+    submitted_at = models.DateField()
+    approved_at = models.DateField(blank=True,null=True)
+    end_date = models.DateField(null=True,blank=True)
+    quarter_date = models.DateField(db_index=True)
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ArchivedQuerySet.as_manager()
+    ROLLUP_FIELDS = LearningPlan.ROLLUP_FIELDS
+    # templates hide the edit and review links on these
+    is_archived = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        rollup_snapshot(instance)
+        return instance
+
+    def get_end_date(self):
+        return LearningPlan.get_end_date(self)
+
+
+class ArchivedPerformanceReview(models.Model):
+    """A graded PerformanceReview moved out of the hot table; see ArchivedLearningPlan."""
+    id = models.BigIntegerField(primary_key=True)
+    employee = models.ForeignKey(Employee,on_delete=models.CASCADE,related_name='archived_performance_reviews')
+    responsibilities = models.TextField(max_length=100)
+    responsibility_self_review= models.TextField(max_length=100)
+    communication= models.TextField(max_length=100)
+    communication_self_review = models.TextField(max_length=100)
+    quality = models.TextField(max_length=100)
+    quality_self_review = models.TextField(max_length=100)
+    accountability = models.TextField(max_length=100)
+    accountability_self_review = models.TextField(max_length=100)
+    comments = models.TextField(max_length=100,blank=True,null=True)
+    commented_by = models.ForeignKey(Employee,on_delete=models.SET_NULL,blank=True,null=True,related_name='+')
+    responsibility_rating = models.DecimalField(max_digits=3,decimal_places=1,blank=True,null=True)
+    communication_rating = models.DecimalField(max_digits=3,decimal_places=1,blank=True,null=True)
+    quality_rating = models.DecimalField(max_digits=3,decimal_places=1,blank=True,null=True)
+    accountability_rating = models.DecimalField(max_digits=3,decimal_places=1,blank=True,null=True)
+    graded = models.CharField(choices=PerformanceReview.options)
+    overall_score = models.DecimalField(max_digits=4,decimal_places=3,blank=True,null=True)
+    quarter_date = models.DateField(db_index=True)
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ArchivedQuerySet.as_manager()
+    ROLLUP_FIELDS = PerformanceReview.ROLLUP_FIELDS
+    is_archived = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        rollup_snapshot(instance)
+        return instance
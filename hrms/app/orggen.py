@@ -0,0 +1,215 @@
+import datetime
+import random
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from . import rollups, search
+from .models import Department, Employee, LearningPlan, PerformanceReview, ReportingPath
+
+DEPARTMENTS = ['Development', 'Testing', 'Operations', 'Sales', 'Marketing', 'Finance', 'Support', 'Research']
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda',
+               'David', 'Elizabeth', 'Priya', 'Arjun', 'Darshan', 'Ananya', 'Wei', 'Yuki']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+              'Sharma', 'Patel', 'Kumar', 'Chen', 'Tanaka', 'Nair', 'Rao', 'Iyer']
+LEAF_ROLES = ['DEVELOPER'] * 6 + ['TESTER'] * 3 + ['INTERN']
+PLAN_STATUSES = ['APPROVED'] * 4 + ['SUBMITTED'] * 3 + ['PENDING', 'REVIEW', 'REJECTED']
+RATINGS = [Decimal(n) / 2 for n in range(2, 11)]
+BATCH_SIZE = 5000
+# usernames OrgGenerator gives its rows, ``org<seed>-<n>`` and ``org<seed>-hr<n>``
+GENERATED_USERNAMES = r'^org[0-9]+-'
+
+
+@dataclass
+class Org:
+    """Who to sign in as when exercising the generated organization."""
+    employees: int = 0
+    ceo: int = None
+    hr: int = None
+    # the developer, their direct manager and the department head above both
+    manager: int = None
+    lead: int = None
+    developer: int = None
+    plan: int = None
+    review: int = None
+    levels: list = field(default_factory=list)
+
+
+def quarter_starts(count, today=None):
+    """The first day of the current quarter and the ``count - 1`` before it, oldest first."""
+    today = today or datetime.date.today()
+    year, quarter = today.year, (today.month - 1) // 3
+    starts = []
+    for _ in range(count):
+        starts.append(datetime.date(year, quarter * 3 + 1, 1))
+        year, quarter = (year - 1, 3) if quarter == 0 else (year, quarter - 1)
+    return starts[::-1]
+
+
+class OrgGenerator:
+    """
+    Builds a complete ``fanout``-ary reporting tree under a single CEO: the
+    CEO's direct reports are managers heading one department each, nodes whose
+    reports are all leaves are team leads, and the leaves are developers,
+    testers and interns. A few HR staff report to the CEO. Every employee below
+    the CEO gets a learning plan per quarter and one performance review, about
+    half of them graded by their manager.
+
+    If the database already has a CEO (there can only be one), the tree goes
+    under them instead, so several seeds can share a database; ``employees``
+    then counts only the new rows.
+
+    Rows go in with bulk_create, level by level so each manager already has a
+    primary key; closure paths and search entries for the new rows are added
+    once at the end.
+    """
+
+    def __init__(self, employees, fanout=8, quarters=4, seed=42, password=None):
+        self.size = employees
+        self.fanout = fanout
+        self.quarters = quarters
+        self.rng = random.Random(seed)
+        self.password = make_password(password)
+        self.prefix = f'org{seed}'
+
+    def run(self):
+        org = Org(employees=self.size)
+        departments = [Department.objects.get_or_create(department=name)[0] for name in DEPARTMENTS]
+        hr_count = max(1, self.size // 500)
+        existing_ceo = Employee.objects.filter(role='CEO').values_list('pk', flat=True).first()
+        # an existing CEO stands in for node 0 and isn't one of the new rows
+        tree_size = self.size - hr_count + (existing_ceo is not None)
+
+        # node i reports to (i - 1) // fanout; node 0 is the CEO
+        ids, levels, start = {}, [], 0
+        while start < tree_size:
+            end = min(tree_size, start * self.fanout + 1) if start else 1
+            levels.append(range(start, end))
+            start = end
+        for depth, level in enumerate(levels):
+            if depth == 0 and existing_ceo is not None:
+                ids[0] = existing_ceo
+                continue
+            rows = [self.employee_row(i, depth, tree_size, departments) for i in level]
+            for i, employee in zip(level, self.create(rows, ids)):
+                ids[i] = employee.pk
+        org.levels = [len(level) for level in levels]
+
+        hr_rows = [(f'{self.prefix}-hr{n}', 'HR', departments[n % len(departments)], 0) for n in range(hr_count)]
+        hr_ids = [employee.pk for employee in self.create(hr_rows, ids)]
+
+        managers = dict(Employee.objects.filter(user__username__startswith=f'{self.prefix}-')
+                        .values_list('pk', 'reporting_to_id'))
+        # the rest of the org, if any, keeps its paths
+        ReportingPath.objects.attach_many(managers)
+        search.index_employee_ids(managers)
+
+        org.ceo, org.hr = ids[0], hr_ids[0]
+        if tree_size > 1:
+            developer = tree_size - 1
+            org.developer = ids[developer]
+            org.lead = ids[(developer - 1) // self.fanout]
+            org.manager = ids[self.department_head(developer)]
+
+        self.create_plans(managers)
+        self.create_reviews(managers, org.developer)
+        # bulk_create skips the signals that keep the rollups current
+        rollups.rebuild()
+        org.plan = LearningPlan.objects.filter(employee_id=org.developer).values_list('pk', flat=True).last()
+        org.review = PerformanceReview.objects.filter(employee_id=org.developer).values_list('pk', flat=True).first()
+        return org
+
+    def department_head(self, i):
+        while i > self.fanout:
+            i = (i - 1) // self.fanout
+        return i
+
+    def role(self, i, depth, tree_size):
+        if i == 0:
+            return 'CEO'
+        first_child = i * self.fanout + 1
+        if first_child >= tree_size:
+            return self.rng.choice(LEAF_ROLES)
+        if depth == 1:
+            return 'MANAGER'
+        # a node whose reports have no reports of their own leads a team
+        return 'TEAM LEAD' if first_child * self.fanout + 1 >= tree_size else 'MANAGER'
+
+    def employee_row(self, i, depth, tree_size, departments):
+        # each of the CEO's reports heads one department, inherited by their whole subtree
+        department = departments[(self.department_head(i) - 1) % len(departments)] if i else departments[0]
+        return (f'{self.prefix}-{i}', self.role(i, depth, tree_size), department, (i - 1) // self.fanout if i else None)
+
+    def create(self, rows, ids):
+        users = User.objects.bulk_create([
+            User(username=username,
+                 first_name=f'{self.rng.choice(FIRST_NAMES)}{n % 997}',
+                 last_name=self.rng.choice(LAST_NAMES),
+                 email=f'{username}@example.com',
+                 password=self.password)
+            for n, (username, _, _, _) in enumerate(rows)
+        ], batch_size=BATCH_SIZE)
+        return Employee.objects.bulk_create([
+            Employee(user=user, role=role, department=department,
+                     reporting_to_id=None if parent is None else ids[parent])
+            for user, (_, role, department, parent) in zip(users, rows)
+        ], batch_size=BATCH_SIZE)
+
+    def create_plans(self, managers):
+        starts = quarter_starts(self.quarters)
+        plans = []
+        for employee_id, manager_id in managers.items():
+            if manager_id is None:
+                continue
+            for quarter_date in starts:
+                status = self.rng.choice(PLAN_STATUSES)
+                meeting = quarter_date + datetime.timedelta(days=self.rng.randrange(90)) if status == 'APPROVED' and self.rng.random() < 0.3 else None
+                plans.append(LearningPlan(
+                    employee_id=employee_id,
+                    completed_learning='Completed course work for the quarter',
+                    planned_learning='Next quarter training plan',
+                    status=status,
+                    approved_by_id=manager_id if status == 'APPROVED' else None,
+                    review_note='Looks good' if status in ('APPROVED', 'REVIEW') else None,
+                    schedule_meeting=meeting,
+                    quarter_date=quarter_date,
+                    # bulk_create skips save(), which normally derives this
+                    end_date=quarter_date + datetime.timedelta(days=90),
+                ))
+            if len(plans) >= BATCH_SIZE:
+                LearningPlan.objects.bulk_create(plans, batch_size=BATCH_SIZE)
+                plans = []
+        LearningPlan.objects.bulk_create(plans, batch_size=BATCH_SIZE)
+
+    def create_reviews(self, managers, developer):
+        quarter_date = quarter_starts(1)[0]
+        reviews = []
+        for employee_id, manager_id in managers.items():
+            if manager_id is None:
+                continue
+            review = PerformanceReview(
+                employee_id=employee_id,
+                responsibilities='Owns the team backlog', responsibility_self_review='Delivered on time',
+                communication='Weekly updates', communication_self_review='Clear and regular',
+                quality='Code review', quality_self_review='Few regressions',
+                accountability='On call', accountability_self_review='Handled incidents',
+                quarter_date=quarter_date,
+            )
+            if self.rng.random() < 0.5 or employee_id == developer:
+                for rating in ('responsibility_rating', 'communication_rating', 'quality_rating', 'accountability_rating'):
+                    setattr(review, rating, self.rng.choice(RATINGS))
+                review.comments = 'Solid quarter'
+                review.commented_by_id = manager_id
+            # bulk_create skips save(), which normally keeps these in step with the ratings
+            review.set_score()
+            reviews.append(review)
+            if len(reviews) >= BATCH_SIZE:
+                PerformanceReview.objects.bulk_create(reviews, batch_size=BATCH_SIZE)
+                reviews = []
+        PerformanceReview.objects.bulk_create(reviews, batch_size=BATCH_SIZE)
+
+
+def generate_org(employees, **kwargs):
+    return OrgGenerator(employees, **kwargs).run()
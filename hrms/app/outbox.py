@@ -0,0 +1,103 @@
+import datetime
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+BATCH_SIZE = getattr(settings, 'OUTBOX_BATCH_SIZE', 100)
+MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+# first retry after a minute, doubling up to a day
+RETRY_BASE = datetime.timedelta(minutes=1)
+RETRY_CAP = datetime.timedelta(days=1)
+# how long a claimed batch stays invisible to other workers before it is retried
+LEASE = datetime.timedelta(minutes=5)
+
+
+def enqueue(subject, body, recipient, from_email='hr@enkefalos.com', dedup_key=None):
+    """Queue one message. A repeated ``dedup_key`` is ignored, so retries of the caller never double-send."""
+    fields = dict(subject=subject, body=body, recipient=recipient, from_email=from_email)
+    if dedup_key is None:
+        return OutboxEmail.objects.create(**fields)
+    email, _ = OutboxEmail.objects.get_or_create(dedup_key=dedup_key, defaults=fields)
+    return email
+
+
+def enqueue_many(messages, from_email='hr@enkefalos.com'):
+    """
+    Queue several ``dict(subject=..., body=..., recipient=..., dedup_key=...)``
+    messages with one INSERT. Keys already queued are skipped, as in enqueue().
+    """
+    rows = [OutboxEmail(from_email=from_email, **message) for message in messages]
+    return OutboxEmail.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE * 2 ** (attempts - 1), RETRY_CAP)
+
+
+def claim(batch_size=BATCH_SIZE):
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'pk')[:batch_size])
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(next_attempt_at=now + LEASE)
+    return batch
+
+
+SETTLED_FIELDS = ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+
+
+def fail(email, error, now):
+    email.attempts += 1
+    email.last_error = repr(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = OutboxEmail.FAILED
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+
+def drain(batch_size=BATCH_SIZE, connection=None):
+    """
+    Send one batch of due mail over a single backend connection. Each message is
+    settled as soon as it is handled: delivered rows become SENT, failures are
+    rescheduled with exponential backoff until MAX_ATTEMPTS. A worker dying
+    mid-batch leaves only the unsent rows to come back when the lease runs out.
+    If the connection can't be opened the whole batch counts a failed attempt.
+    Returns the number of rows handled.
+    """
+    batch = claim(batch_size)
+    if not batch:
+        return 0
+
+    connection = connection or get_connection()
+    now = timezone.now()
+    try:
+        connection.open()
+    except Exception as e:
+        for email in batch:
+            fail(email, e, now)
+        OutboxEmail.objects.bulk_update(batch, SETTLED_FIELDS)
+        return len(batch)
+
+    try:
+        for email in batch:
+            message = EmailMessage(email.subject, email.body, email.from_email, [email.recipient], connection=connection)
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                fail(email, e, now)
+            else:
+                email.attempts += 1
+                email.status = OutboxEmail.SENT
+                email.sent_at = now
+                email.last_error = ''
+            email.save(update_fields=SETTLED_FIELDS)
+    finally:
+        connection.close()
+    return len(batch)
@@ -0,0 +1,155 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import cached_property
+
+from .models import CEO_HR, Employee
+
+MISSING = object()
+
+
+def cache_timeout():
+    return getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', 0)
+
+
+def forget(user_id):
+    """Drop a user's cached Employee from this process; signals call it when the row changes."""
+    if cache_timeout():
+        caches['principal'].delete(f'employee:{user_id}')
+
+
+def forget_all():
+    if cache_timeout():
+        caches['principal'].clear()
+
+
+class Principal:
+    """
+    The signed-in user's Employee and what it may reach, resolved at most once
+    per request. Views and templates read ``request.principal`` instead of going
+    back to ``request.user.employee`` and re-querying the reporting line.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def _lookup(self):
+        return Employee.objects.select_related('department', 'reporting_to__user').filter(user=self.user)
+
+    def _cached(self):
+        """
+        The Employee cached for this user by an earlier request in this process
+        (None for a user without one), or MISSING. Other processes' changes
+        show up once PRINCIPAL_CACHE_TIMEOUT runs out; that includes the
+        manager's details carried along in ``reporting_to``. So the instance is
+        for reading only: saving it could write those stale values back.
+        """
+        if not cache_timeout():
+            return MISSING
+        entry = caches['principal'].get(f'employee:{self.user.pk}')
+        # a recreated user reusing the id has another date_joined
+        if entry is None or entry[0] != self.user.date_joined:
+            return MISSING
+        return entry[1]
+
+    def _remember(self, employee):
+        # stored before _share, so the user row isn't pickled along
+        if cache_timeout():
+            caches['principal'].set(f'employee:{self.user.pk}', (self.user.date_joined, employee), cache_timeout())
+        return employee
+
+    def _share(self, employee):
+        # share the instance both ways so request.user.employee and employee.user don't query again
+        user_field = Employee._meta.get_field('user')
+        user_field.set_cached_value(employee, self.user)
+        user_field.remote_field.set_cached_value(self.user, employee)
+        return employee
+
+    @cached_property
+    def employee(self):
+        if not self.user.is_authenticated:
+            return None
+        employee = self._cached()
+        if employee is MISSING:
+            try:
+                employee = self._lookup().get()
+            except Employee.DoesNotExist:
+                employee = None
+            self._remember(employee)
+        return self._share(employee) if employee else None
+
+    async def aload(self, user):
+        """
+        The async views' way in: resolve ``employee`` for the user from
+        ``request.auser()`` with the async ORM. The sync properties then read
+        the cache, so templates rendered afterwards don't query again.
+        """
+        self.user = user
+        if 'employee' in self.__dict__:
+            return self.employee
+        employee = None
+        if user.is_authenticated:
+            employee = self._cached()
+            if employee is MISSING:
+                try:
+                    employee = await self._lookup().aget()
+                except Employee.DoesNotExist:
+                    employee = None
+                self._remember(employee)
+            if employee:
+                self._share(employee)
+        self.__dict__['employee'] = employee
+        return employee
+
+    @property
+    def pk(self):
+        return self.employee.pk if self.employee else None
+
+    @property
+    def role(self):
+        return self.employee.role if self.employee else None
+
+    @property
+    def is_ceo(self):
+        return self.role == 'CEO'
+
+    @property
+    def is_ceo_or_hr(self):
+        return self.role in CEO_HR
+
+    def _reports(self, all_levels):
+        if all_levels:
+            return Employee.objects.subordinates_of(self.employee).values_list('pk', flat=True)
+        return Employee.objects.filter(reporting_to=self.employee).values_list('pk', flat=True)
+
+    @cached_property
+    def direct_report_ids(self):
+        if self.employee is None:
+            return frozenset()
+        return frozenset(self._reports(all_levels=False))
+
+    @cached_property
+    def subordinate_ids(self):
+        """Everyone below this employee at any depth, from the closure table."""
+        if self.employee is None:
+            return frozenset()
+        return frozenset(self._reports(all_levels=True))
+
+    @property
+    def is_manager(self):
+        return bool(self.direct_report_ids)
+
+    def report_ids(self, all_levels=False):
+        return self.subordinate_ids if all_levels else self.direct_report_ids
+
+    async def areport_ids(self, all_levels=False):
+        """``report_ids`` for async views; call ``aload`` first."""
+        name = 'subordinate_ids' if all_levels else 'direct_report_ids'
+        if name not in self.__dict__:
+            ids = frozenset()
+            if self.employee is not None:
+                ids = frozenset([pk async for pk in self._reports(all_levels)])
+            self.__dict__[name] = ids
+        return self.__dict__[name]
+
+    def manages(self, employee_id, all_levels=False):
+        return employee_id in self.report_ids(all_levels)
@@ -0,0 +1,205 @@
+"""
+Incremental upkeep of QuarterlyRollup.
+
+Each review and plan counts once in the row for its employee's department and
+role and the quarter of its ``quarter_date``. A save takes back what the row
+counted for when it was loaded and adds what it counts for now, with
+``F()`` increments so concurrent saves don't lose updates; a delete only takes
+back. An employee changing department or role carries their counts across.
+queryset.update(), bulk_create() and bulk_update() bypass the signals: pass
+bulk-updated instances to ``record_many()``, or run ``rebuild()``
+(``manage.py rebuild_rollups``) after anything else.
+"""
+import datetime
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncQuarter
+
+from .models import (ArchivedLearningPlan, ArchivedPerformanceReview, Employee, LearningPlan, PerformanceReview,
+                     QuarterlyRollup)
+
+COUNT_FIELDS = ['review_count', 'graded_count', 'rating_sum', 'plan_count', 'approved_count', 'rejected_count']
+
+
+def quarter_start(value):
+    """First day of the quarter ``value`` falls in; accepts the datetime a DateField default leaves unsaved."""
+    if isinstance(value, datetime.datetime):
+        value = PerformanceReview._meta.get_field('quarter_date').to_python(value)
+    return datetime.date(value.year, (value.month - 1) // 3 * 3 + 1, 1)
+
+
+def review_counts(graded, overall_score):
+    is_graded = graded == 'GRADED'
+    return {'review_count': 1, 'graded_count': int(is_graded),
+            'rating_sum': overall_score if is_graded and overall_score is not None else Decimal(0)}
+
+
+def plan_counts(status):
+    return {'plan_count': 1, 'approved_count': int(status == 'APPROVED'), 'rejected_count': int(status == 'REJECTED')}
+
+
+def contribution(model, values):
+    """``(employee_id, quarter, counts)`` for one review or plan, from its ROLLUP_FIELDS."""
+    if model in (PerformanceReview, ArchivedPerformanceReview):
+        counts = review_counts(values['graded'], values['overall_score'])
+    else:
+        counts = plan_counts(values['status'])
+    return values['employee_id'], quarter_start(values['quarter_date']), counts
+
+
+def current_values(instance):
+    return {field: getattr(instance, field) for field in instance.ROLLUP_FIELDS}
+
+
+def remember(instance):
+    """pre_save: make sure an existing row's old contribution is known before it changes."""
+    if instance._state.adding:
+        instance._rollup_loaded = None
+    elif not hasattr(instance, '_rollup_loaded'):
+        # loaded with some fields deferred, or built by hand with a pk
+        instance._rollup_loaded = type(instance).objects.filter(pk=instance.pk).values(*instance.ROLLUP_FIELDS).first()
+
+
+def record(instance, deleted=False):
+    """post_save / post_delete: apply the change to the rollup rows."""
+    record_many([instance], deleted)
+
+
+def record_many(instances, deleted=False):
+    """
+    Apply the changes in ``instances`` (all of one model) since they were
+    loaded: for bulk_update() callers, which the signals don't see. Changes
+    landing on the same rollup row are summed first, so grading a whole team
+    is one update per row touched rather than per review.
+    """
+    changes = {}
+    for instance in instances:
+        old = getattr(instance, '_rollup_loaded', None)
+        new = None if deleted else current_values(instance)
+        for sign, values in ((-1, old), (1, new)):
+            if values is None:
+                continue
+            employee_id, quarter, counts = contribution(type(instance), values)
+            totals = changes.setdefault((employee_id, quarter), {})
+            for field, value in counts.items():
+                totals[field] = totals.get(field, 0) + sign * value
+        instance._rollup_loaded = new
+    if not changes:
+        return
+    keys = employee_keys(instances, {employee_id for employee_id, _ in changes})
+    by_row = {}
+    for (employee_id, quarter), counts in changes.items():
+        if employee_id not in keys:
+            continue
+        totals = by_row.setdefault((*keys[employee_id], quarter), {})
+        for field, value in counts.items():
+            totals[field] = totals.get(field, 0) + value
+    for (department_id, role, quarter), counts in by_row.items():
+        add(department_id, role, quarter, counts)
+
+
+def employee_keys(instances, employee_ids):
+    """``{employee_id: (department_id, role)}``, without a query when the instances hold their employees."""
+    cached = {instance.employee_id: instance.employee for instance in instances
+              if type(instance).employee.is_cached(instance)}
+    if employee_ids <= cached.keys():
+        return {pk: (employee.department_id, employee.role) for pk, employee in cached.items()}
+    return {pk: (department_id, role) for pk, department_id, role in
+            Employee.objects.filter(pk__in=employee_ids).values_list('pk', 'department_id', 'role')}
+
+
+def add(department_id, role, quarter, counts):
+    counts = {field: value for field, value in counts.items() if value}
+    if not counts:
+        return
+    rows = QuarterlyRollup.objects.filter(department_id=department_id, role=role, quarter=quarter)
+    increments = {field: F(field) + value for field, value in counts.items()}
+    if rows.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            QuarterlyRollup.objects.create(department_id=department_id, role=role, quarter=quarter, **counts)
+    except IntegrityError:
+        # another transaction created the row first
+        rows.update(**increments)
+
+
+def move_employee(employee):
+    """post_save for Employee: carry their reviews and plans to the new department/role row."""
+    old = getattr(employee, '_saved_rollup_key', None)
+    employee._saved_rollup_key = (employee.department_id, employee.role)
+    if old is None or old == employee._saved_rollup_key:
+        return
+    for quarter, counts in employee_totals(employee.pk).items():
+        add(*old, quarter, {field: -value for field, value in counts.items()})
+        add(employee.department_id, employee.role, quarter, counts)
+
+
+def employee_totals(employee_id):
+    return dict(grouped(*source_models(), filter=Q(employee_id=employee_id), key='quarter'))
+
+
+def source_models():
+    """
+    The review and the plan models the rollups count, each hot and archived.
+    Archived rows keep counting: archiving moves a row, it doesn't change history.
+    """
+    return [PerformanceReview, ArchivedPerformanceReview], [LearningPlan, ArchivedLearningPlan]
+
+
+def grouped(review_models, plan_models, filter=Q(), key=None):
+    """Recount from the source tables: yields ``(group, counts)`` by department, role and quarter."""
+    group = ['employee__department', 'employee__role', 'quarter'] if key is None else [key]
+    rows = []
+    for review_model in review_models:
+        rows += (review_model.objects.filter(filter).annotate(quarter=TruncQuarter('quarter_date'))
+                 .values(*group).order_by()
+                 .annotate(review_count=Count('pk'),
+                           graded_count=Count('pk', filter=Q(graded='GRADED')),
+                           rating_sum=Sum('overall_score', filter=Q(graded='GRADED'))))
+    for plan_model in plan_models:
+        rows += (plan_model.objects.filter(filter).annotate(quarter=TruncQuarter('quarter_date'))
+                 .values(*group).order_by()
+                 .annotate(plan_count=Count('pk'),
+                           approved_count=Count('pk', filter=Q(status='APPROVED')),
+                           rejected_count=Count('pk', filter=Q(status='REJECTED'))))
+    totals = {}
+    for row in rows:
+        counts = totals.setdefault(tuple(row.pop(field) for field in group), dict.fromkeys(COUNT_FIELDS, 0))
+        for field, value in row.items():
+            counts[field] += value or 0
+    if key is not None:
+        return [(group_key[0], counts) for group_key, counts in totals.items()]
+    return list(totals.items())
+
+
+def rebuild():
+    """Replace every rollup row with a fresh count; a GROUP BY query per source table and a bulk insert."""
+    rows = [
+        QuarterlyRollup(department_id=department_id, role=role, quarter=quarter, **counts)
+        for (department_id, role, quarter), counts in grouped(*source_models())
+    ]
+    with transaction.atomic():
+        QuarterlyRollup.objects.all().delete()
+        QuarterlyRollup.objects.bulk_create(rows, batch_size=5000)
+    return len(rows)
+
+
+def report(rollup_rows, by_role=False):
+    """
+    Rows for the quarterly report, newest quarter first, per department (and
+    role): sums over the rollup table only, with the average rating and the
+    plan approval rate worked out from them.
+    """
+    group = ['quarter', 'department__department'] + (['role'] if by_role else [])
+    rows = (rollup_rows.values(*group)
+            .annotate(**{field: Sum(field) for field in COUNT_FIELDS})
+            .order_by('-quarter', *group[1:]))
+    for row in rows:
+        # the same 2025-Q3 form the quarter filter takes
+        row['label'] = f"{row['quarter'].year}-Q{(row['quarter'].month - 1) // 3 + 1}"
+        row['average_rating'] = (row['rating_sum'] / row['graded_count']).quantize(Decimal('0.01')) if row['graded_count'] else None
+        row['approval_rate'] = round(100 * row['approved_count'] / row['plan_count'], 1) if row['plan_count'] else None
+        yield row
@@ -0,0 +1,183 @@
+from django.db import connection
+from django.db.models import F, IntegerField, Q
+from django.db.models.expressions import RawSQL
+
+# FTS5 virtual table keyed by Employee.id (rowid), tokenized into trigrams so
+# substring matches are served from the index instead of LIKE '%x%' scans.
+# ``prefixes`` holds every name/email word with a leading '^', which makes
+# "starts with" an indexed phrase lookup too.
+SEARCH_TABLE = 'app_employee_search'
+MIN_TRIGRAM_LENGTH = 3
+# upper bound on rows bm25 has to score, so common terms cost the same as rare ones
+RANK_CANDIDATES = 1000
+
+
+def is_indexed():
+    return connection.vendor == 'sqlite'
+
+
+def _quote(term):
+    return '"%s"' % term.replace('"', '""')
+
+
+def _substring_query(value):
+    return '{name email} : %s' % _quote(value)
+
+
+def _prefix_query(value):
+    return 'prefixes : %s' % _quote('^' + value)
+
+
+def _fuzzy_query(value):
+    value = value.lower()
+    grams = {value[i:i + 3] for i in range(len(value) - 2)}
+    return '{name email} : (%s)' % ' OR '.join(_quote(gram) for gram in sorted(grams))
+
+
+def _prefixes(name, email):
+    return ' '.join('^' + word for word in name.split() + [email] if word)
+
+
+def filter_employees(queryset, value):
+    value = value.strip()
+    if not value:
+        return queryset
+    if not is_indexed() or len(value) < MIN_TRIGRAM_LENGTH:
+        # too short for a trigram, or no FTS5; postgres gets pg_trgm GIN indexes for these
+        return queryset.filter(
+            Q(user__first_name__icontains = value) |
+            Q(user__last_name__icontains = value) |
+            Q(user__email__icontains = value))
+    return queryset.filter(pk__in=_matching(_substring_query(value)))
+
+
+def _matching(query):
+    return RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [query])
+
+
+def _position(queryset, query, prefix_query=None):
+    # each row's place among every match in the index, prefix hits first, then by bm25.
+    # SQLite ranks the matches once per statement; the gaps other filters leave in the
+    # numbering don't matter to keyset pagination
+    pk = '%s.%s' % (connection.ops.quote_name(queryset.model._meta.db_table),
+                    connection.ops.quote_name(queryset.model._meta.pk.column))
+    prefix, params = '0', []
+    if prefix_query:
+        prefix, params = f'rowid IN (SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s)', [prefix_query]
+    return RawSQL(
+        f'SELECT position FROM (SELECT rowid, row_number() OVER (ORDER BY prefix DESC, score, rowid) AS position '
+        f'FROM (SELECT rowid, {prefix} AS prefix, bm25({SEARCH_TABLE}) AS score '
+        f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s)) WHERE rowid = {pk}',
+        params + [query], output_field=IntegerField())
+
+
+def rank_employees(queryset, value):
+    """
+    The employees in ``queryset`` matching ``value``, annotated with
+    ``search_rank``, a unique key in relevance order (lower is better), so a
+    listing can order and page by it. The ranking is search_employee_ids'
+    without its limit: names or emails starting with the term first, then
+    other substring hits by bm25, or the fuzzy matches if none of
+    ``queryset`` contains the term.
+    """
+    value = value.strip()
+    if not is_indexed() or len(value) < MIN_TRIGRAM_LENGTH:
+        # nothing to rank with; matches keep the id order of the unranked filter
+        return filter_employees(queryset, value).annotate(search_rank=F('pk'))
+
+    query = _substring_query(value)
+    matches = queryset.filter(pk__in=_matching(query))
+    if matches.exists():
+        return matches.annotate(search_rank=_position(queryset, query, _prefix_query(value)))
+    query = _fuzzy_query(value)
+    return queryset.filter(pk__in=_matching(query)).annotate(search_rank=_position(queryset, query))
+
+
+def search_employee_ids(value, limit=20):
+    """
+    Ranked employee ids for ``value``: names or emails starting with it first,
+    then other substring hits by bm25. If nothing contains the term, fall back
+    to a fuzzy pass that ranks rows by the trigrams they share with it.
+    """
+    value = value.strip()
+    if not is_indexed() or len(value) < MIN_TRIGRAM_LENGTH:
+        from .models import Employee
+        return list(filter_employees(Employee.objects.all(), value)
+                    .order_by('user__first_name', 'user__last_name')
+                    .values_list('pk', flat=True)[:limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s LIMIT %s',
+            [_prefix_query(value), limit])
+        ids = [row[0] for row in cursor.fetchall()]
+        if len(ids) < limit:
+            seen = set(ids)
+            ids += [pk for pk in _ranked(cursor, _substring_query(value), limit + len(ids)) if pk not in seen]
+        if ids:
+            return ids[:limit]
+        return _ranked(cursor, _fuzzy_query(value), limit)
+
+
+def _ranked(cursor, query, limit):
+    cursor.execute(
+        f'SELECT rowid FROM (SELECT rowid, bm25({SEARCH_TABLE}) AS score FROM {SEARCH_TABLE} '
+        f'WHERE {SEARCH_TABLE} MATCH %s LIMIT %s) ORDER BY score LIMIT %s',
+        [query, RANK_CANDIDATES, limit])
+    return [row[0] for row in cursor.fetchall()]
+
+
+def index_employee(employee):
+    if not is_indexed():
+        return
+    name, email = employee.user.get_full_name(), employee.user.email
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, name, email, prefixes) VALUES (%s, %s, %s, %s)',
+            [employee.pk, name, email, _prefixes(name, email)])
+
+
+def unindex_employee(employee_id):
+    if not is_indexed():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [employee_id])
+
+
+def rebuild_index(using=None, batch_size=5000):
+    conn = connection if using is None else using
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            'SELECT e.id, u.first_name, u.last_name, u.email '
+            'FROM app_employee e JOIN auth_user u ON u.id = e.user_id')
+        with conn.cursor() as writer:
+            while rows := cursor.fetchmany(batch_size):
+                _write_rows(writer, rows)
+
+
+def index_employee_ids(employee_ids, batch_size=500):
+    """Bulk (re)index after writes that skip signals, such as bulk_create."""
+    if not is_indexed():
+        return
+    employee_ids = list(employee_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(employee_ids), batch_size):
+            chunk = employee_ids[start:start + batch_size]
+            cursor.execute(
+                'SELECT e.id, u.first_name, u.last_name, u.email '
+                'FROM app_employee e JOIN auth_user u ON u.id = e.user_id '
+                f'WHERE e.id IN ({", ".join(["%s"] * len(chunk))})', chunk)
+            _write_rows(cursor, cursor.fetchall())
+
+
+def _write_rows(cursor, rows):
+    batch = []
+    for pk, first_name, last_name, email in rows:
+        name = f'{first_name} {last_name}'.strip()
+        batch.append((pk, name, email, _prefixes(name, email)))
+    cursor.executemany(
+        f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, name, email, prefixes) VALUES (%s, %s, %s, %s)',
+        batch)
@@ -1,73 +1,125 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
-from django.core.mail import send_mail
-from django.db import transaction
-from .models import PerformanceReview, Employee, LearningPlan
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.contrib.auth.models import User
+from .models import PerformanceReview, Employee, LearningPlan, ReportingPath, ArchivedLearningPlan, ArchivedPerformanceReview, Department
+from . import outbox, principal, rollups, search
 
-@receiver(post_save,sender=Employee)
-def send_welcome_email(sender,instance,created, **kwargs):
-    if created and instance.user.email:
-        transaction.on_commit(lambda:send_mail('Happy Onboarding',
-            f''' 
-                Welcome {instance.user.get_full_name()},
+def welcome_message(employee):
+    return f''' 
+                Welcome {employee.user.get_full_name()},
 
                 You are now a part of Enkefalos
 
                 We are glad to have you
 
                 Your Details:
-                Employee ID: ENK00{instance.user.id}
-                Role: {instance.role}
-                Department: {instance.department}
+                Employee ID: ENK00{employee.user.id}
+                Role: {employee.role}
+                Department: {employee.department}
 
                 Best Regards,
-                HR Team''',
-                'hr@enkefalos.com',
-                [instance.user.email],
-                fail_silently=True
-                        ))
-        
-def performance_grade_email(performance):
-    try:
-        if not performance.employee:
-            return
-            
-        if not performance.employee.user:
-            return
-            
-        if not performance.employee.user.email:
-            return
-            
+                HR Team'''
+
+@receiver(post_save,sender=Employee)
+def send_welcome_email(sender,instance,created, **kwargs):
+    # queued in the creating transaction; manage.py send_outbox delivers it
+    if created and instance.user.email:
+        outbox.enqueue('Happy Onboarding', welcome_message(instance), instance.user.email,
+                       dedup_key=f'welcome:{instance.pk}')
         
-        subject = 'Your Performance Review is Ready'
-        action = 'view'
+def grade_message(performance):
+    if performance.graded != 'GRADED':
+        return None
+    if not performance.employee.user.email:
+        return None
+
+    subject = 'Your Performance Review is Ready'
+    action = 'view'
 
-        message = f'''
+    message = f'''
         Hello, {performance.employee.user.get_full_name()},
         
         Your performance review has been graded.
         
-        Overall Score: { performance.average_score} / 5.0
+        Overall Score: { performance.overall_score} / 5.0
         
         Login to {action} your grades.
         
         Best Regards,
         {performance.commented_by.user.get_full_name() if performance.commented_by else 'HR'}'''
-        send_mail(
-            subject = subject,
-            message=message,
-            from_email='hr@enkefalos.com',
-            recipient_list=[performance.employee.user.email],
-            fail_silently=False
-        )
-        print(" Email sent successfully!")
-        
-    except Exception as e:
-        print(e)
-        import traceback
-        traceback.print_exc()
+    # one mail per distinct grade: re-saving the same ratings does not queue another
+    return dict(subject=subject, body=message, recipient=performance.employee.user.email,
+                dedup_key=f'grade:{performance.pk}:{performance.overall_score}')
+
+def performance_grade_email(performance):
+    message = grade_message(performance)
+    if message:
+        outbox.enqueue(**message)
 
 @receiver(post_save, sender=PerformanceReview)
 def send_performance_email(sender, instance, created, **kwargs):
     if not created:
-        transaction.on_commit(lambda: performance_grade_email(instance))
\ No newline at end of file
+        performance_grade_email(instance)
+
+@receiver(post_save, sender=Employee)
+def index_employee_search(sender, instance, **kwargs):
+    search.index_employee(instance)
+
+@receiver(post_save, sender=User)
+def reindex_user_search(sender, instance, created, update_fields=None, **kwargs):
+    # new users get indexed with their Employee row; login only touches last_login
+    if created or (update_fields and not {'first_name', 'last_name', 'email'} & set(update_fields)):
+        return
+    employee = Employee.objects.filter(user=instance).first()
+    if employee:
+        search.index_employee(employee)
+
+@receiver(post_delete, sender=Employee)
+def unindex_employee_search(sender, instance, **kwargs):
+    search.unindex_employee(instance.pk)
+
+@receiver(pre_delete, sender=Employee)
+def detach_direct_reports(sender, instance, **kwargs):
+    # reporting_to is SET_NULL by a queryset update, so Employee.save() never sees it
+    for report in Employee.objects.filter(reporting_to=instance):
+        ReportingPath.objects.detach(report)
+
+@receiver(pre_save, sender=PerformanceReview)
+@receiver(pre_save, sender=LearningPlan)
+def remember_rollup_contribution(sender, instance, **kwargs):
+    rollups.remember(instance)
+
+@receiver(post_save, sender=PerformanceReview)
+@receiver(post_save, sender=LearningPlan)
+def update_rollup(sender, instance, **kwargs):
+    rollups.record(instance)
+
+# archived rows too: they count until their employee is deleted
+@receiver(post_delete, sender=PerformanceReview)
+@receiver(post_delete, sender=LearningPlan)
+@receiver(post_delete, sender=ArchivedPerformanceReview)
+@receiver(post_delete, sender=ArchivedLearningPlan)
+def remove_from_rollup(sender, instance, **kwargs):
+    rollups.record(instance, deleted=True)
+
+@receiver(post_save, sender=Employee)
+def move_employee_rollups(sender, instance, **kwargs):
+    rollups.move_employee(instance)
+
+# the signed-in Employee cached by app.principal
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def forget_cached_principal(sender, instance, **kwargs):
+    principal.forget(instance.user_id)
+
+@receiver(post_save, sender=User)
+def forget_cached_principal_user(sender, instance, update_fields=None, **kwargs):
+    # login only touches last_login
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    principal.forget(instance.pk)
+
+@receiver(post_save, sender=Department)
+def forget_cached_principals(sender, instance, created, **kwargs):
+    if not created:
+        principal.forget_all()
@@ -0,0 +1,34 @@
+// Type-ahead for AutocompleteInput: the visible box searches, the hidden input carries the chosen id
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('input[data-autocomplete-url]').forEach((input) => {
+        const hidden = document.getElementById(input.dataset.autocompleteTarget);
+        const options = document.getElementById(input.getAttribute('list'));
+        // label -> id for the suggestions on offer, starting with the current selection
+        let ids = new Map(input.value ? [[input.value, hidden.value]] : []);
+        let timer = null;
+        let pending = null;
+
+        const suggest = async () => {
+            if (pending) pending.abort();
+            pending = new AbortController();
+            const url = `${input.dataset.autocompleteUrl}?q=${encodeURIComponent(input.value.trim())}`;
+            try {
+                const response = await fetch(url, { signal: pending.signal, headers: { Accept: 'application/json' } });
+                if (!response.ok) return;
+                const { results } = await response.json();
+                ids = new Map(results.map((result) => [result.label, String(result.id)]));
+                options.replaceChildren(...results.map((result) => new Option(result.label, result.label)));
+                hidden.value = ids.get(input.value) || '';
+            } catch (error) {
+                if (error.name !== 'AbortError') throw error;
+            }
+        };
+
+        input.addEventListener('input', () => {
+            hidden.value = ids.get(input.value) || '';
+            clearTimeout(timer);
+            // picking a suggestion fires input too; no need to search again
+            if (!hidden.value && input.value.trim()) timer = setTimeout(suggest, 150);
+        });
+    });
+});
@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
+
+from django.db.models import Avg, Count, Q
+
+from .concurrency import gather_queries
+from .models import PerformanceReview
+
+
+@dataclass(frozen=True)
+class DashboardStats:
+    """Numbers behind the dashboard stat cards, each computed by the database."""
+    headcount: Optional[int] = None
+    managers: Optional[int] = None
+    departments: Optional[int] = None
+    pending_reviews: int = 0
+    avg_rating: Optional[Decimal] = None
+
+
+def directory_counts(directory):
+    """Headcount, distinct managers and departments of an employee queryset, in one aggregate query."""
+    return directory.order_by().aggregate(
+        headcount=Count('pk'),
+        managers=Count('reporting_to', distinct=True),
+        departments=Count('department', distinct=True),
+    )
+
+
+def review_counts(employee):
+    return PerformanceReview.objects.filter(employee=employee).aggregate(
+        pending_reviews=Count('pk', filter=Q(graded='PENDING')),
+        avg_rating=Avg('overall_score'),
+    )
+
+
+def plan_status_counts(plans):
+    """How many of ``plans`` are pending, approved and sent back for review, in one query."""
+    return plans.order_by().aggregate(
+        pending_count=Count('pk', filter=Q(status='PENDING')),
+        approved_count=Count('pk', filter=Q(status='APPROVED')),
+        review_count=Count('pk', filter=Q(status='REVIEW')),
+    )
+
+
+def dashboard_stats(employee, directory=None):
+    """
+    ``directory`` is the (filtered) employee queryset shown to CEO/HR; its three
+    counts come back from one aggregate query. The employee's own review counts
+    are a second one.
+    """
+    counts = directory_counts(directory) if directory is not None else {}
+    return DashboardStats(**counts, **review_counts(employee))
+
+
+async def adashboard_stats(employee, directory=None):
+    """``dashboard_stats`` with its two queries running at the same time."""
+    queries = [lambda: review_counts(employee)]
+    if directory is not None:
+        queries.append(lambda: directory_counts(directory))
+    reviews, *counts = await gather_queries(*queries)
+    return DashboardStats(**(counts[0] if counts else {}), **reviews)
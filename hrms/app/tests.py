@@ -1,3 +1,1553 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+from decimal import Decimal
+from unittest import skipUnless
+from asgiref.sync import async_to_sync
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, connections, transaction, IntegrityError
+from django.core.exceptions import ValidationError
+from django.core import mail
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+from django.utils.http import http_date
+from . import archive, meetings, rollups
+from .pagination import KeysetPaginator
+from .models import (Department, Employee, LearningPlan, PerformanceReview, ReportingPath, OutboxEmail, QuarterlyRollup,
+                     ArchivedLearningPlan, ArchivedPerformanceReview)
 
-# Create your tests here.
+
+def make_employee(username, department, role='DEVELOPER', reporting_to=None):
+    user = User.objects.create(username=username, first_name=username, last_name='Test', email=f'{username}@example.com')
+    return Employee.objects.create(user=user, department=department, role=role, reporting_to=reporting_to)
+
+
+class ListViewQueryBudgetTests(TestCase):
+    """Every list view must render in a fixed number of queries, whatever the row count."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.ceo = make_employee('ceo', cls.department, role='CEO')
+        cls.manager = make_employee('manager', cls.department, role='MANAGER', reporting_to=cls.ceo)
+
+    def add_reports(self, count):
+        for i in range(count):
+            employee = make_employee(f'dev{Employee.objects.count()}', self.department, reporting_to=self.manager)
+            LearningPlan.objects.create(employee=employee, completed_learning='x', planned_learning='y')
+            PerformanceReview.objects.create(
+                employee=employee, responsibilities='r', responsibility_self_review='r',
+                communication='c', communication_self_review='c', quality='q',
+                quality_self_review='q', accountability='a', accountability_self_review='a')
+
+    def assertConstantQueries(self, user, url_name, budget):
+        self.client.force_login(user)
+        for count in (2, 10):
+            self.add_reports(count)
+            with self.assertNumQueries(budget):
+                response = self.client.get(reverse(url_name))
+            self.assertEqual(response.status_code, 200)
+
+    def test_dashboard(self):
+        self.assertConstantQueries(self.ceo.user, 'app:dashboard', 10)
+
+    def test_learning_plans(self):
+        self.assertConstantQueries(self.ceo.user, 'app:learnplan', 7)
+
+    def test_all_learning_plans(self):
+        self.assertConstantQueries(self.ceo.user, 'app:allPlans', 6)
+
+    def test_subordinates(self):
+        self.assertConstantQueries(self.manager.user, 'app:subordinates', 7)
+
+    def test_performance_list(self):
+        self.assertConstantQueries(self.manager.user, 'app:perflist', 7)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.ceo = make_employee('ceo', cls.department, role='CEO')
+        for i in range(30):
+            make_employee(f'dev{i}', cls.department, role='TESTER' if i % 2 else 'DEVELOPER', reporting_to=cls.ceo)
+
+    def setUp(self):
+        self.client.force_login(self.ceo.user)
+
+    def test_walks_forward_and_back(self):
+        first = self.client.get(reverse('app:dashboard'))
+        self.assertEqual(len(first.context['object_list']), 25)
+        self.assertEqual(first.context['paginator'].count, 31)
+        self.assertFalse(first.context['page_obj'].has_previous())
+
+        second = self.client.get(reverse('app:dashboard'), {'after': first.context['page_obj'].next_cursor})
+        self.assertEqual(len(second.context['object_list']), 6)
+        self.assertFalse(second.context['page_obj'].has_next())
+
+        back = self.client.get(reverse('app:dashboard'), {'before': second.context['page_obj'].previous_cursor})
+        self.assertEqual(list(back.context['object_list']), list(first.context['object_list']))
+
+    def test_respects_filter(self):
+        response = self.client.get(reverse('app:dashboard'), {'role': 'TESTER'})
+        self.assertEqual(response.context['paginator'].count, 15)
+        self.assertTrue(all(e.role == 'TESTER' for e in response.context['object_list']))
+
+    def test_deep_page_uses_cursor_not_offset(self):
+        first = self.client.get(reverse('app:dashboard'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('app:dashboard'), {'after': first.context['page_obj'].next_cursor})
+        self.assertFalse(any('OFFSET' in q['sql'] for q in queries.captured_queries))
+
+    def test_malformed_cursors_fall_back_to_the_first_page(self):
+        first = list(self.client.get(reverse('app:dashboard')).context['object_list'])
+        for value in ['\u00b2', '-5', 'abc', '']:
+            response = self.client.get(reverse('app:dashboard'), {'after': value})
+            self.assertEqual(list(response.context['object_list']), first)
+
+
+class EmployeeSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.jonathan = make_employee('jonathan', cls.department)
+        cls.ajon = make_employee('ajon', cls.department)
+        cls.other = make_employee('mary', cls.department)
+
+    def test_filter_uses_index_and_matches_substrings(self):
+        from .filters import employee_filter
+        qs = employee_filter({'search': 'jon'}, queryset=Employee.objects.all()).qs
+        self.assertEqual(set(qs), {self.jonathan, self.ajon})
+        self.assertIn('app_employee_search', str(qs.query))
+
+    def test_prefix_hits_rank_first(self):
+        from .search import search_employee_ids
+        self.assertEqual(search_employee_ids('jon')[:2], [self.jonathan.pk, self.ajon.pk])
+
+    def test_fuzzy_fallback(self):
+        from .search import search_employee_ids
+        self.assertEqual(search_employee_ids('jonathna')[0], self.jonathan.pk)
+
+    def test_dashboard_ranks_search_results(self):
+        ceo = make_employee('ceo', self.department, role='CEO')
+        self.client.force_login(ceo.user)
+        response = self.client.get(reverse('app:dashboard'), {'search': 'jon'})
+        self.assertEqual(list(response.context['object_list']), [self.jonathan, self.ajon])
+        response = self.client.get(reverse('app:dashboard'), {'search': 'jonathna'})
+        self.assertEqual(list(response.context['object_list'])[0], self.jonathan)
+        # paging continues from the rank, not the id
+        response = self.client.get(reverse('app:dashboard'), {'search': 'jon', 'after': 1})
+        self.assertEqual(list(response.context['object_list']), [self.ajon])
+
+    def test_dashboard_ranks_within_the_other_filters(self):
+        ceo = make_employee('ceo', self.department, role='CEO')
+        sales = Department.objects.create(department='Sales')
+        # more name-alikes than any top-N cut would keep
+        for i in range(250):
+            make_employee(f'jon{i}', self.department)
+        salesjon = make_employee('xjon', sales)
+        self.client.force_login(ceo.user)
+        response = self.client.get(reverse('app:dashboard'), {'search': 'jon', 'department': sales.pk})
+        self.assertEqual(list(response.context['object_list']), [salesjon])
+        response = self.client.get(reverse('app:dashboard'), {'search': 'jon'})
+        self.assertEqual(response.context['stats'].headcount, 253)
+        # a typo falls back to fuzzy matches inside the filter too
+        response = self.client.get(reverse('app:dashboard'), {'search': 'xjoon', 'department': sales.pk})
+        self.assertEqual(list(response.context['object_list']), [salesjon])
+
+    def test_index_follows_user_and_employee_changes(self):
+        from .search import search_employee_ids
+        user = self.other.user
+        user.first_name = 'Rosalind'
+        user.save()
+        self.assertEqual(search_employee_ids('rosalind'), [self.other.pk])
+        self.other.delete()
+        self.assertEqual(search_employee_ids('rosalind'), [])
+
+
+class ReportingPathTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.ceo = make_employee('ceo', cls.department, role='CEO')
+        cls.vp = make_employee('vp', cls.department, role='MANAGER', reporting_to=cls.ceo)
+        cls.lead = make_employee('lead', cls.department, role='TEAM LEAD', reporting_to=cls.vp)
+        cls.dev = make_employee('dev', cls.department, reporting_to=cls.lead)
+        cls.other = make_employee('other', cls.department, role='MANAGER', reporting_to=cls.ceo)
+
+    def assertPathsMatchRebuild(self):
+        live = set(ReportingPath.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+        ReportingPath.objects.rebuild()
+        self.assertEqual(live, set(ReportingPath.objects.values_list('ancestor_id', 'descendant_id', 'depth')))
+
+    def test_subordinates_at_any_depth(self):
+        self.assertEqual(set(Employee.objects.subordinates_of(self.vp)), {self.lead, self.dev})
+        self.assertEqual(set(Employee.objects.subordinates_of(self.ceo, max_depth=1)), {self.vp, self.other})
+        self.assertEqual(set(Employee.objects.managers_of(self.dev)), {self.lead, self.vp, self.ceo})
+        self.assertPathsMatchRebuild()
+
+    def test_reparent_moves_whole_subtree(self):
+        self.lead.reporting_to = self.other
+        self.lead.save()
+        self.assertEqual(set(Employee.objects.subordinates_of(self.vp)), set())
+        self.assertEqual(set(Employee.objects.subordinates_of(self.other)), {self.lead, self.dev})
+        self.assertEqual(ReportingPath.objects.get(ancestor=self.ceo, descendant=self.dev).depth, 3)
+        self.assertPathsMatchRebuild()
+
+    def test_cycles_are_rejected(self):
+        self.vp.reporting_to = self.dev
+        with self.assertRaises(ValidationError):
+            self.vp.save()
+
+    def test_deleting_a_manager_orphans_the_subtree(self):
+        self.vp.delete()
+        self.assertEqual(set(Employee.objects.subordinates_of(self.ceo)), {self.other})
+        self.assertEqual(set(Employee.objects.subordinates_of(self.lead)), {self.dev})
+        self.assertPathsMatchRebuild()
+
+    def test_all_levels_scope(self):
+        LearningPlan.objects.create(employee=self.dev, completed_learning='x', planned_learning='y')
+        self.client.force_login(self.vp.user)
+        direct = self.client.get(reverse('app:subordinates'))
+        self.assertEqual(len(direct.context['plans']), 0)
+        everyone = self.client.get(reverse('app:subordinates'), {'scope': 'all'})
+        self.assertEqual(len(everyone.context['plans']), 1)
+        self.assertEqual(everyone.context['subordinate_count'], 2)
+
+
+
+class DashboardStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.development = Department.objects.create(department='Development')
+        cls.testing = Department.objects.create(department='Testing')
+        cls.ceo = make_employee('ceo', cls.development, role='CEO')
+        cls.manager = make_employee('manager', cls.testing, role='MANAGER', reporting_to=cls.ceo)
+        make_employee('dev', cls.testing, reporting_to=cls.manager)
+        review = dict(responsibilities='r', responsibility_self_review='r', communication='c',
+                      communication_self_review='c', quality='q', quality_self_review='q',
+                      accountability='a', accountability_self_review='a')
+        PerformanceReview.objects.create(employee=cls.ceo, **review)
+        PerformanceReview.objects.create(employee=cls.ceo, responsibility_rating=4, communication_rating=4,
+                                         quality_rating=4, accountability_rating=2, **review)
+
+    def test_counts_and_average_come_from_two_queries(self):
+        from .stats import dashboard_stats
+        with self.assertNumQueries(2):
+            stats = dashboard_stats(self.ceo, Employee.objects.all())
+        self.assertEqual((stats.headcount, stats.managers, stats.departments), (3, 2, 2))
+        self.assertEqual(stats.pending_reviews, 1)
+        # accountability counts, communication is not counted twice
+        self.assertEqual(stats.avg_rating, Decimal('3.5'))
+
+    def test_dashboard_context(self):
+        self.client.force_login(self.ceo.user)
+        response = self.client.get(reverse('app:dashboard'), {'department': self.testing.pk})
+        self.assertEqual(response.context['stats'].headcount, 2)
+        self.assertEqual(response.context['stats'].departments, 1)
+
+
+class OverallScoreTests(TestCase):
+    review = dict(responsibilities='r', responsibility_self_review='r', communication='c',
+                  communication_self_review='c', quality='q', quality_self_review='q',
+                  accountability='a', accountability_self_review='a')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.manager = make_employee('manager', cls.department, role='MANAGER')
+        cls.reviews = []
+        for i, rating in enumerate(['4.5', '2.0', '3.5']):
+            employee = make_employee(f'dev{i}', cls.department, reporting_to=cls.manager)
+            cls.reviews.append(PerformanceReview.objects.create(
+                employee=employee, responsibility_rating=Decimal(rating), communication_rating=Decimal(rating),
+                quality_rating=Decimal(rating), accountability_rating=Decimal('4.0'), **cls.review))
+        cls.pending = PerformanceReview.objects.create(employee=employee, **cls.review)
+
+    def test_save_stores_score(self):
+        review = PerformanceReview.objects.get(pk=self.reviews[0].pk)
+        self.assertEqual(review.overall_score, Decimal('4.375'))
+        self.assertIsNone(PerformanceReview.objects.get(pk=self.pending.pk).overall_score)
+
+    def test_update_fields_and_bulk_paths_keep_score_in_sync(self):
+        review = self.reviews[1]
+        review.responsibility_rating = Decimal('4.0')
+        review.save(update_fields=['responsibility_rating'])
+        self.assertEqual(PerformanceReview.objects.get(pk=review.pk).overall_score, Decimal('3.0'))
+
+        for field in ['responsibility_rating', 'communication_rating', 'quality_rating', 'accountability_rating']:
+            setattr(self.pending, field, Decimal('1.0'))
+        PerformanceReview.objects.bulk_update([self.pending], ['responsibility_rating', 'communication_rating', 'quality_rating', 'accountability_rating'])
+        pending = PerformanceReview.objects.get(pk=self.pending.pk)
+        self.assertEqual((pending.graded, pending.overall_score), ('GRADED', Decimal('1.0')))
+
+        PerformanceReview.objects.filter(pk=self.pending.pk).update(quality_rating=Decimal('5.0'))
+        PerformanceReview.objects.filter(pk=self.pending.pk).refresh_scores()
+        self.assertEqual(PerformanceReview.objects.get(pk=self.pending.pk).overall_score, Decimal('2.0'))
+
+    def test_range_and_top_n_queries(self):
+        self.assertEqual(list(PerformanceReview.objects.top_scored(2)), [self.reviews[0], self.reviews[2]])
+        self.assertEqual(set(PerformanceReview.objects.score_between(3, 4)), {self.reviews[2]})
+
+    def test_performance_list_sorts_and_filters_by_score(self):
+        self.client.force_login(self.manager.user)
+        response = self.client.get(reverse('app:perflist'), {'sort': 'score', 'min_score': '3'})
+        self.assertEqual(list(response.context['performances']), [self.reviews[0], self.reviews[2]])
+        # unusable bounds are ignored rather than reaching the query
+        for value in ['NaN', 'Infinity', '-inf', 'abc']:
+            response = self.client.get(reverse('app:perflist'), {'min_score': value})
+            self.assertEqual(len(response.context['performances']), 4)
+
+    def test_grading_forms_keep_ratings_within_five(self):
+        from .forms import PerformanceReviewAdminForm
+        ratings = {'responsibility_rating': '12', 'communication_rating': '4', 'quality_rating': '4',
+                   'accountability_rating': '-1', 'comments': ''}
+        form = PerformanceReviewAdminForm(ratings, instance=self.pending)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(set(form.errors), {'responsibility_rating', 'accountability_rating'})
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError('smtp down')
+
+
+class UnreachableBackend(BaseEmailBackend):
+    def open(self):
+        raise ConnectionRefusedError('smtp unreachable')
+
+    def send_messages(self, messages):
+        raise AssertionError('never connected')
+
+
+class CrashingBackend(BaseEmailBackend):
+    """Delivers the first message, then the worker dies."""
+    def send_messages(self, messages):
+        if mail.outbox:
+            raise KeyboardInterrupt
+        mail.outbox.extend(messages)
+        return len(messages)
+
+
+class OutboxTests(TestCase):
+    review = OverallScoreTests.review
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.manager = make_employee('manager', cls.department, role='MANAGER')
+        cls.dev = make_employee('dev', cls.department, reporting_to=cls.manager)
+
+    def test_signals_only_enqueue(self):
+        self.assertEqual(OutboxEmail.objects.filter(dedup_key__startswith='welcome:').count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_grade_email_is_queued_once_per_grade(self):
+        review = PerformanceReview.objects.create(employee=self.dev, **self.review)
+        review.comments = 'self review edited'
+        review.save()
+        self.assertFalse(OutboxEmail.objects.filter(dedup_key__startswith='grade:').exists())
+        for field in ['responsibility_rating', 'communication_rating', 'quality_rating', 'accountability_rating']:
+            setattr(review, field, Decimal('4.0'))
+        review.save()
+        review.save()
+        self.assertEqual(OutboxEmail.objects.filter(dedup_key__startswith='grade:').count(), 1)
+
+    def test_drain_sends_batch_over_one_connection(self):
+        from . import outbox
+        self.assertEqual(outbox.drain(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.SENT).count(), 2)
+        self.assertEqual(outbox.drain(), 0)
+
+    def test_failures_back_off_then_give_up(self):
+        from . import outbox
+        self.assertEqual(outbox.drain(connection=FailingBackend()), 2)
+        email = OutboxEmail.objects.first()
+        self.assertEqual((email.status, email.attempts), (OutboxEmail.PENDING, 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(outbox.drain(connection=FailingBackend()), 0)
+
+        for attempt in range(outbox.MAX_ATTEMPTS - 1):
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            outbox.drain(connection=FailingBackend())
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.FAILED).count(), 2)
+
+    def test_unreachable_server_reschedules_the_batch(self):
+        from . import outbox
+        self.assertEqual(outbox.drain(connection=UnreachableBackend()), 2)
+        for email in OutboxEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), (OutboxEmail.PENDING, 1))
+            self.assertIn('smtp unreachable', email.last_error)
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+    def test_rows_are_settled_as_they_are_sent(self):
+        from . import outbox
+        with self.assertRaises(KeyboardInterrupt):
+            outbox.drain(connection=CrashingBackend())
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.SENT).count(), 1)
+
+
+class EmployeeImportTests(TestCase):
+    header = 'username,email,first_name,last_name,department,role,reporting_to,password\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.hr = make_employee('hr', cls.department, role='HR')
+
+    def run_import(self, text, filename='people.csv'):
+        from .importer import import_file
+        return import_file(io.BytesIO(text.encode()), filename, chunk_size=2, workers=1)
+
+    def test_csv_import_resolves_managers_in_a_second_pass(self):
+        result = self.run_import(self.header +
+            'dev1,dev1@example.com,Dev,One,Development,developer,lead,\n'
+            'lead,lead@example.com,Team,Lead,development,TEAM LEAD,boss,secret-pass\n'
+            'boss,boss@example.com,Big,Boss,Development,CEO,,\n')
+        self.assertEqual((result.created, result.errors), (3, []))
+        dev = Employee.objects.get(user__username='dev1')
+        self.assertEqual(dev.reporting_to.user.username, 'lead')
+        self.assertEqual(set(Employee.objects.managers_of(dev).values_list('user__username', flat=True)), {'lead', 'boss'})
+        self.assertTrue(User.objects.get(username='lead').check_password('secret-pass'))
+        self.assertFalse(User.objects.get(username='dev1').has_usable_password())
+        self.assertTrue(OutboxEmail.objects.filter(dedup_key=f'welcome:{dev.pk}').exists())
+        from .search import search_employee_ids
+        self.assertEqual(search_employee_ids('boss'), [Employee.objects.get(user__username='boss').pk])
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        make_employee('ceo', self.department, role='CEO')
+        result = self.run_import(
+            '{"username": "hr", "email": "x@example.com", "first_name": "A", "last_name": "B", "department": "Development", "role": "HR"}\n'
+            '{"username": "ceo2", "email": "c@example.com", "first_name": "A", "last_name": "B", "department": "Development", "role": "CEO"}\n'
+            '{"username": "nodept", "email": "n@example.com", "first_name": "A", "last_name": "B", "department": "Sales", "role": "HR"}\n'
+            '{"username": "a", "email": "a@example.com", "first_name": "A", "last_name": "B", "department": "Development", "role": "TESTER", "reporting_to": "b"}\n'
+            '{"username": "b", "email": "b@example.com", "first_name": "A", "last_name": "B", "department": "Development", "role": "TESTER", "reporting_to": "a"}\n',
+            filename='people.jsonl')
+        self.assertEqual(result.created, 2)
+        self.assertEqual(sorted(line for line, _ in result.errors), [1, 2, 3, 4, 5])
+        self.assertFalse(Employee.objects.filter(user__username__in=['a', 'b']).exclude(reporting_to=None).exists())
+
+    def test_json_arrays_and_unparseable_rows(self):
+        row = '{"username": "%s", "email": "%s@example.com", "first_name": "A", "last_name": "B", "department": "Development", "role": "TESTER", "reporting_to": "hr"}'
+        result = self.run_import(f'[{row % ("arr1", "arr1")}, 7, {row % ("arr2", "arr2")}]', filename='people.json')
+        self.assertEqual((result.created, result.errors), (2, [(2, 'expected a JSON object')]))
+        result = self.run_import(f'{row % ("line1", "line1")}\n{{"username": \n[1]\n', filename='people.jsonl')
+        self.assertEqual(result.created, 1)
+        self.assertEqual([line for line, _ in result.errors], [2, 3])
+        self.assertIn('invalid JSON', result.errors[0][1])
+        self.assertEqual(self.run_import('{"not": "a list"}', filename='people.json').errors,
+                         [(1, 'expected a JSON array of objects')])
+        self.assertEqual(self.run_import('[{"username": ', filename='people.json').created, 0)
+
+    def test_only_new_employees_get_reporting_paths(self):
+        lead = make_employee('lead', self.department, role='TEAM LEAD', reporting_to=self.hr)
+        with CaptureQueriesContext(connection) as queries:
+            self.run_import(self.header +
+                'dev,dev@example.com,Dev,One,Development,developer,mid,\n'
+                'mid,mid@example.com,Mid,Level,Development,TEAM LEAD,lead,\n')
+        self.assertFalse([query for query in queries if query['sql'].startswith('DELETE')])
+        dev = Employee.objects.get(user__username='dev')
+        self.assertEqual(list(Employee.objects.managers_of(dev).order_by('pk')),
+                         [self.hr, lead, Employee.objects.get(user__username='mid')])
+        self.assertEqual(ReportingPath.objects.get(ancestor=self.hr, descendant=dev).depth, 3)
+
+    def test_upload_endpoint_is_hr_only(self):
+        upload = SimpleUploadedFile('people.csv', (self.header + 'new,new@example.com,New,Hire,Development,INTERN,hr,\n').encode())
+        self.client.force_login(self.hr.user)
+        response = self.client.post(reverse('app:importemp'), {'file': upload})
+        self.assertEqual(response.context['result'].created, 1)
+        self.assertEqual(Employee.objects.get(user__username='new').reporting_to, self.hr)
+
+        self.client.force_login(Employee.objects.get(user__username='new').user)
+        self.assertEqual(self.client.get(reverse('app:importemp')).status_code, 403)
+
+
+class ExportTests(TestCase):
+    review = OverallScoreTests.review
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dev_dept = Department.objects.create(department='Development')
+        cls.ops_dept = Department.objects.create(department='Operations')
+        cls.hr = make_employee('hr', cls.dev_dept, role='HR')
+        cls.manager = make_employee('manager', cls.dev_dept, role='MANAGER')
+        cls.dev = make_employee('dev', cls.dev_dept, reporting_to=cls.manager)
+        cls.ops = make_employee('ops', cls.ops_dept)
+        LearningPlan.objects.create(employee=cls.dev, completed_learning='x', planned_learning='y',
+                                    status='APPROVED', quarter_date=datetime.date(2025, 8, 1))
+        LearningPlan.objects.create(employee=cls.ops, completed_learning='x', planned_learning='y',
+                                    quarter_date=datetime.date(2025, 2, 1))
+        PerformanceReview.objects.create(employee=cls.dev, responsibility_rating=4, communication_rating=4,
+                                         quality_rating=4, accountability_rating=2, **cls.review)
+        PerformanceReview.objects.create(employee=cls.ops, **cls.review)
+
+    def export(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_streams_joined_columns_in_one_query(self):
+        self.client.force_login(self.hr.user)
+        with self.assertNumQueries(4):  # session, user, employee, export
+            rows = list(csv.DictReader(io.StringIO(self.export('app:exportlp'))))
+        self.assertEqual([row['username'] for row in rows], ['dev', 'ops'])
+        self.assertEqual(rows[0]['department'], 'Development')
+        self.assertEqual(rows[0]['quarter_date'], '2025-08-01')
+
+    def test_filters_match_the_list_views(self):
+        self.client.force_login(self.hr.user)
+        text = self.export('app:exportlp', quarter='2025-Q3', status='APPROVED')
+        self.assertEqual(text.count('\n'), 2)
+        for quarter in ['0-Q1', '9999-Q4', '\u00b2-Q1']:
+            self.assertEqual(self.export('app:exportlp', quarter=quarter).count('\n'), 1)
+        self.assertIn('dev', text)
+        rows = [json.loads(line) for line in self.export('app:exportperf', format='jsonl', graded='GRADED').splitlines()]
+        self.assertEqual([(row['username'], row['overall_score']) for row in rows], [('dev', '3.500')])
+        rows = self.export('app:exportperf', format='jsonl', department=self.ops_dept.pk).splitlines()
+        self.assertEqual([json.loads(row)['username'] for row in rows], ['ops'])
+        PerformanceReview.objects.filter(employee=self.ops).update(quarter_date=datetime.date(2025, 2, 1))
+        rows = self.export('app:exportperf', format='jsonl', quarter='2025-Q1').splitlines()
+        self.assertEqual([json.loads(row)['username'] for row in rows], ['ops'])
+        self.assertEqual(self.client.get(reverse('app:exportlp'), {'format': 'xml'}).status_code, 400)
+
+    def test_managers_only_export_their_reports(self):
+        self.client.force_login(self.manager.user)
+        rows = list(csv.DictReader(io.StringIO(self.export('app:exportperf'))))
+        self.assertEqual([row['username'] for row in rows], ['dev'])
+
+    def test_users_without_an_employee_export_nothing(self):
+        # manager and ops report to nobody, like the subordinates of a missing employee
+        self.client.force_login(User.objects.create(username='outsider'))
+        for name in ['app:exportlp', 'app:exportperf']:
+            self.assertEqual(list(csv.DictReader(io.StringIO(self.export(name, archived='include')))), [])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'reads SQLite EXPLAIN QUERY PLAN output')
+class QueryPlanTests(TestCase):
+    """The main query behind each list view is answered from an index, never a full table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.ceo = make_employee('ceo', cls.department, role='CEO')
+        cls.manager = make_employee('manager', cls.department, role='MANAGER', reporting_to=cls.ceo)
+        for i in range(20):
+            employee = make_employee(f'dev{i}', cls.department, reporting_to=cls.manager)
+            LearningPlan.objects.create(employee=employee, completed_learning='x', planned_learning='y')
+            PerformanceReview.objects.create(employee=employee, **OverallScoreTests.review)
+        cls.dev = employee
+
+    def plan_for(self, employee, url_name, table, **params):
+        self.client.force_login(employee.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse(url_name), params)
+        # skip request.user.employee, which every view loads by its unique user_id
+        main = [query['sql'] for query in queries
+                if query['sql'].startswith(f'SELECT "{table}"."id", ') and 'WHERE "app_employee"."user_id" = ' not in query['sql']]
+        self.assertTrue(main, f'no {table} query in {url_name}')
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + main[0])
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexed(self, plan, table, index=None):
+        steps = [step for step in plan if step.split()[1:2] == [table]]
+        self.assertTrue(steps, plan)
+        for step in steps:
+            self.assertTrue(step.startswith(f'SEARCH {table} USING'), plan)
+        if index:
+            self.assertTrue(any(index in step for step in steps), plan)
+
+    def test_dashboard_role_filter(self):
+        plan = self.plan_for(self.ceo, 'app:dashboard', 'app_employee', role='MANAGER')
+        self.assertIndexed(plan, 'app_employee', 'employee_role')
+
+    def test_own_learning_plans(self):
+        plan = self.plan_for(self.dev, 'app:learnplan', 'app_learningplan')
+        self.assertIndexed(plan, 'app_learningplan', 'learningplan_employee_status')
+
+    def test_subordinate_learning_plans(self):
+        plan = self.plan_for(self.manager, 'app:subordinates', 'app_learningplan')
+        self.assertIndexed(plan, 'app_learningplan', 'learningplan_employee_status')
+        self.assertIndexed(plan, 'U0', 'reporting_to')
+
+    def test_subordinate_reviews(self):
+        plan = self.plan_for(self.manager, 'app:perflist', 'app_performancereview')
+        self.assertIndexed(plan, 'app_performancereview', 'review_employee_graded')
+
+    def test_all_learning_plans_page(self):
+        plan = self.plan_for(self.ceo, 'app:allPlans', 'app_learningplan', after=10)
+        self.assertIndexed(plan, 'app_learningplan', 'PRIMARY KEY')
+        self.assertFalse([step for step in plan if 'TEMP B-TREE' in step], plan)
+
+    def test_meeting_lookup_uses_partial_index(self):
+        for queryset in (LearningPlan.objects.filter(schedule_meeting__gte=datetime.date(2025, 1, 1)),
+                         meetings.upcoming(self.manager, include_reports=True, today=datetime.date(2025, 1, 1))):
+            with connection.cursor() as cursor:
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = [row[-1] for row in cursor.fetchall()]
+            self.assertIndexed(plan, 'app_learningplan', 'learningplan_meeting')
+
+
+class SingleCEOConstraintTests(TestCase):
+    def test_database_rejects_a_second_ceo(self):
+        department = Department.objects.create(department='Development')
+        make_employee('ceo', department, role='CEO')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            make_employee('ceo2', department, role='CEO')
+        make_employee('hr', department, role='HR')
+        self.assertEqual(Employee.objects.filter(role='CEO').count(), 1)
+
+    def test_model_validation_reports_the_constraint(self):
+        department = Department.objects.create(department='Development')
+        make_employee('ceo', department, role='CEO')
+        candidate = Employee(department=department, role='CEO')
+        with self.assertRaisesMessage(ValidationError, 'There can only be one CEO in the system.'):
+            candidate.validate_constraints()
+
+
+class PrincipalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.ceo = make_employee('ceo', cls.department, role='CEO')
+        cls.manager = make_employee('manager', cls.department, role='MANAGER', reporting_to=cls.ceo)
+        cls.lead = make_employee('lead', cls.department, role='TEAM LEAD', reporting_to=cls.manager)
+        cls.dev = make_employee('dev', cls.department, reporting_to=cls.lead)
+        cls.review = PerformanceReview.objects.create(employee=cls.dev, **OverallScoreTests.review)
+
+    def principal(self, employee):
+        from .principal import Principal
+        return Principal(User.objects.get(pk=employee.user_id))
+
+    def test_employee_is_loaded_once_and_shared_with_request_user(self):
+        principal = self.principal(self.manager)
+        with self.assertNumQueries(1):
+            employee = principal.employee
+            self.assertIs(principal.user.employee, employee)
+            self.assertIs(employee.user, principal.user)
+            self.assertEqual(employee.department.department, 'Development')
+            self.assertFalse(principal.is_ceo_or_hr)
+
+    def test_report_ids_are_computed_lazily_once(self):
+        principal = self.principal(self.manager)
+        principal.employee
+        with self.assertNumQueries(2):
+            self.assertEqual(principal.direct_report_ids, {self.lead.pk})
+            self.assertEqual(principal.subordinate_ids, {self.lead.pk, self.dev.pk})
+            self.assertTrue(principal.manages(self.dev.pk, all_levels=True))
+            self.assertFalse(principal.manages(self.dev.pk))
+            self.assertTrue(principal.is_manager)
+
+    def test_permission_checks_use_the_principal(self):
+        self.client.force_login(self.manager.user)
+        self.assertEqual(self.client.get(reverse('app:detailperf', args=[self.review.pk])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('app:gradeperf', args=[self.review.pk])).status_code, 403)
+        self.client.force_login(self.lead.user)
+        self.assertEqual(self.client.get(reverse('app:gradeperf', args=[self.review.pk])).status_code, 200)
+        self.client.force_login(self.dev.user)
+        self.assertEqual(self.client.get(reverse('app:editperf', args=[self.review.pk])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('app:gradeperf', args=[self.review.pk])).status_code, 403)
+
+
+class OrgGeneratorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from .orggen import generate_org
+        cls.org = generate_org(60, fanout=4, quarters=2, seed=7)
+
+    def test_builds_a_reporting_tree_with_quarterly_records(self):
+        org = self.org
+        self.assertEqual(Employee.objects.count(), 60)
+        self.assertEqual(Employee.objects.filter(role='CEO').get().pk, org.ceo)
+        self.assertEqual(org.levels, [1, 4, 16, 38])
+        self.assertEqual(Employee.objects.get(pk=org.developer).reporting_to_id, org.lead)
+        self.assertIn(org.manager, set(Employee.objects.managers_of(Employee(pk=org.developer)).values_list('pk', flat=True)))
+        self.assertEqual(Employee.objects.subordinates_of(Employee(pk=org.ceo)).count(), 59)
+        self.assertEqual(LearningPlan.objects.count(), 59 * 2)
+        self.assertEqual(LearningPlan.objects.values('quarter_date').distinct().count(), 2)
+        self.assertEqual(PerformanceReview.objects.count(), 59)
+        self.assertFalse(PerformanceReview.objects.filter(graded='GRADED', overall_score=None).exists())
+        self.assertEqual(PerformanceReview.objects.get(pk=org.review).graded, 'GRADED')
+
+    def test_a_second_seed_reports_to_the_existing_ceo(self):
+        from .orggen import generate_org
+        org = generate_org(20, fanout=4, quarters=1, seed=8)
+        self.assertEqual(org.ceo, self.org.ceo)
+        self.assertEqual(Employee.objects.count(), 80)
+        self.assertEqual(Employee.objects.filter(role='CEO').count(), 1)
+        self.assertEqual(Employee.objects.subordinates_of(Employee(pk=org.ceo)).count(), 79)
+        self.assertEqual(PerformanceReview.objects.count(), 59 + 20)
+        self.assertIn(org.manager, set(Employee.objects.managers_of(Employee(pk=org.developer)).values_list('pk', flat=True)))
+
+    def test_route_benchmark_records_latency_and_queries(self):
+        from .benchmark import ROUTES, compare, run_routes
+        routes = [route for route in ROUTES if route.label in ('perflist', 'detailperf')]
+        results = run_routes(self.org, routes, iterations=3, warmup=0)
+        self.assertEqual(set(results), {'perflist', 'detailperf'})
+        for result in results.values():
+            self.assertEqual(result['status'], 200)
+            self.assertGreater(result['queries']['max'], 0)
+            self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['max'])
+        current = json.loads(json.dumps({'runs': [{'employees': 60, 'routes': results}]}))
+        previous = json.loads(json.dumps(current))
+        previous['runs'][0]['routes']['perflist']['queries']['max'] -= 1
+        regressed = {label for _, label, _, _, flagged in compare(previous, current) if flagged}
+        self.assertEqual(regressed, {'perflist'})
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.ceo = make_employee('ceo', cls.department, role='CEO')
+
+    def setUp(self):
+        self.client.force_login(self.ceo.user)
+
+    def timings(self, response):
+        entries = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            entries[name] = dict(param.split('=', 1) for param in params)
+        return entries
+
+    def test_server_timing_reports_queries_and_render_time(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('app:dashboard'))
+        timings = self.timings(response)
+        self.assertEqual(timings['sql']['desc'], f'"{len(queries)} queries"')
+        self.assertGreater(float(timings['tpl']['dur']), 0)
+        self.assertGreaterEqual(float(timings['total']['dur']), float(timings['tpl']['dur']))
+
+    def test_duplicate_queries_are_counted(self):
+        from .middleware import RequestMetrics
+        metrics = RequestMetrics()
+        with connection.execute_wrapper(metrics):
+            for employee in Employee.objects.all():
+                Department.objects.get(pk=employee.department_id)
+            Department.objects.get(pk=self.department.pk)
+        self.assertEqual((metrics.queries, metrics.duplicates), (3, 1))
+        self.assertEqual(metrics.most_repeated()[1], 2)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+    def test_sampled_requests_are_logged_by_url_name(self):
+        with self.assertLogs('app.requests', 'INFO') as logs:
+            self.client.get(reverse('app:perflist'))
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['url_name'], 'app:perflist')
+        self.assertEqual(line['status'], 200)
+        self.assertGreater(line['queries'], 0)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0, REQUEST_METRICS_SLOW_MS=10_000)
+    def test_unsampled_fast_requests_are_not_logged(self):
+        with self.assertNoLogs('app.requests', 'INFO'):
+            self.client.get(reverse('app:perflist'))
+
+
+class DatabaseProfileTests(TestCase):
+    def test_sqlite_profile_tunes_each_new_connection(self):
+        from django.db.utils import load_backend
+        from hrms import dbprofiles
+        with tempfile.TemporaryDirectory() as scratch:
+            settings = dbprofiles.database('sqlite', Path(scratch))
+            settings = connections.configure_settings({'default': settings})['default']
+            wrapper = load_backend(settings['ENGINE']).DatabaseWrapper(settings, 'profile_test')
+            try:
+                with wrapper.cursor() as cursor:
+                    pragmas = {}
+                    for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size'):
+                        cursor.execute(f'PRAGMA {pragma}')
+                        pragmas[pragma] = cursor.fetchone()[0]
+            finally:
+                wrapper.close()
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'cache_size': -65536})
+        self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+        self.assertIsNone(settings['CONN_MAX_AGE'])
+
+    def test_postgres_profile_pools_connections(self):
+        from hrms import dbprofiles
+        settings = dbprofiles.database('postgres', Path('.'), env={'POSTGRES_DB': 'hr', 'POSTGRES_POOL_MAX': '5'})
+        self.assertEqual((settings['NAME'], settings['CONN_MAX_AGE']), ('hr', 0))
+        self.assertEqual(settings['OPTIONS']['pool']['max_size'], 5)
+        with self.assertRaises(ValueError):
+            dbprofiles.database('mysql', Path('.'))
+
+
+class AsyncListViewTests(TransactionTestCase):
+    """The async list pages run their queries on worker connections, so the rows must be committed."""
+
+    def setUp(self):
+        self.department = Department.objects.create(department='Development')
+        self.ceo = make_employee('ceo', self.department, role='CEO')
+        self.manager = make_employee('manager', self.department, role='MANAGER', reporting_to=self.ceo)
+        for i, status in enumerate(['PENDING', 'APPROVED', 'APPROVED', 'REVIEW']):
+            employee = make_employee(f'dev{i}', self.department, reporting_to=self.manager)
+            LearningPlan.objects.create(employee=employee, completed_learning='x', planned_learning='y', status=status)
+            PerformanceReview.objects.create(employee=employee, **OverallScoreTests.review)
+
+    def get_both(self, user, url_name, params=None):
+        self.client.force_login(user)
+        self.async_client.force_login(user)
+        sync = self.client.get(reverse(f'app:{url_name}'), params)
+        asynchronous = async_to_sync(self.async_client.get)(reverse(f'app:{url_name}_async'), params)
+        self.assertEqual((sync.status_code, asynchronous.status_code), (200, 200))
+        return sync.context, asynchronous.context
+
+    def assertSameContext(self, sync, asynchronous, *keys):
+        for key in keys:
+            self.assertEqual(sync[key], asynchronous[key], key)
+
+    def test_dashboard_matches_sync_view(self):
+        sync, asynchronous = self.get_both(self.ceo.user, 'dashboard', {'role': 'DEVELOPER'})
+        self.assertSameContext(sync, asynchronous, 'stats', 'meeting', 'is_ceo_or_hr', 'is_paginated')
+        self.assertEqual(list(sync['object_list']), asynchronous['object_list'])
+        self.assertEqual(list(sync['departments']), asynchronous['departments'])
+        self.assertEqual(asynchronous['stats'].headcount, 4)
+
+    def test_dashboard_search_matches_sync_view(self):
+        sync, asynchronous = self.get_both(self.ceo.user, 'dashboard', {'search': 'dev', 'role': 'DEVELOPER'})
+        self.assertSameContext(sync, asynchronous, 'stats', 'is_paginated')
+        self.assertEqual(list(sync['object_list']), asynchronous['object_list'])
+        self.assertEqual(len(asynchronous['object_list']), 4)
+
+    def test_subordinates_match_sync_view(self):
+        sync, asynchronous = self.get_both(self.manager.user, 'subordinates')
+        self.assertSameContext(sync, asynchronous, 'pending_count', 'approved_count', 'review_count',
+                               'subordinate_count', 'scope_all')
+        self.assertEqual(list(sync['plans']), asynchronous['plans'])
+        self.assertEqual(asynchronous['approved_count'], 2)
+
+    def test_performance_list_matches_sync_view(self):
+        sync, asynchronous = self.get_both(self.manager.user, 'perflist', {'sort': 'score'})
+        self.assertSameContext(sync, asynchronous, 'pending_grading', 'subordinate_count', 'sort')
+        self.assertEqual(list(sync['performances']), asynchronous['performances'])
+
+    def test_all_learning_plans_match_sync_view(self):
+        sync, asynchronous = self.get_both(self.ceo.user, 'allPlans')
+        self.assertEqual(list(sync['plans']), asynchronous['plans'])
+        self.assertEqual(len(asynchronous['plans']), 4)
+
+    def test_archived_rows_match_sync_view(self):
+        LearningPlan.objects.filter(status='APPROVED').update(quarter_date=datetime.date(2023, 2, 1))
+        list(archive.archive(datetime.date(2025, 1, 1)))
+        for user, url_name, key in ((self.manager.user, 'subordinates', 'plans'), (self.ceo.user, 'allPlans', 'plans'),
+                                    (self.manager.user, 'perflist', 'performances')):
+            sync, asynchronous = self.get_both(user, url_name, {'archived': 'include'})
+            self.assertSameContext(sync, asynchronous, 'include_archived')
+            self.assertEqual(list(sync[key]), asynchronous[key], url_name)
+        self.assertEqual(len(asynchronous['performances']), 4)
+        sync, asynchronous = self.get_both(self.ceo.user, 'allPlans', {'archived': 'include'})
+        self.assertEqual(len(asynchronous['plans']), 4)
+        self.assertEqual(len(self.get_both(self.ceo.user, 'allPlans')[1]['plans']), 2)
+
+    def test_anonymous_is_sent_to_login(self):
+        response = async_to_sync(self.async_client.get)(reverse('app:perflist_async'))
+        self.assertRedirects(response, f"{reverse('app:login')}?next={reverse('app:perflist_async')}",
+                             fetch_redirect_response=False)
+
+    def test_server_timing_counts_worker_queries(self):
+        self.async_client.force_login(self.manager.user)
+        response = async_to_sync(self.async_client.get)(reverse('app:subordinates_async'))
+        queries = int(response['Server-Timing'].split('desc="')[1].split(' ')[0])
+        # session, user, employee and report ids on the request thread, plans, counts and nav on workers
+        self.assertEqual(queries, 7)
+
+
+class CollectionAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.ceo = make_employee('ceo', cls.department, role='CEO')
+        cls.manager = make_employee('manager', cls.department, role='MANAGER', reporting_to=cls.ceo)
+        cls.lead = make_employee('lead', cls.department, role='TEAM LEAD', reporting_to=cls.manager)
+        cls.dev = make_employee('dev', cls.department, reporting_to=cls.lead)
+        cls.plans = {employee.pk: LearningPlan.objects.create(employee=employee, completed_learning='x', planned_learning='y')
+                     for employee in (cls.manager, cls.lead, cls.dev)}
+        cls.review = PerformanceReview.objects.create(employee=cls.dev, **OverallScoreTests.review)
+
+    def get(self, user, url_name, params=None, **headers):
+        self.client.force_login(user)
+        return self.client.get(reverse(f'app:{url_name}'), params, headers=headers)
+
+    def ids(self, response):
+        return {row['id'] for row in response.json()['results']}
+
+    def test_visibility_follows_the_reporting_line(self):
+        self.assertEqual(self.ids(self.get(self.ceo.user, 'api_employees')),
+                         {self.ceo.pk, self.manager.pk, self.lead.pk, self.dev.pk})
+        self.assertEqual(self.ids(self.get(self.lead.user, 'api_employees')), {self.lead.pk, self.dev.pk})
+        self.assertEqual(self.ids(self.get(self.manager.user, 'api_learningplans')),
+                         {self.plans[self.manager.pk].pk, self.plans[self.lead.pk].pk})
+        self.assertEqual(self.ids(self.get(self.manager.user, 'api_learningplans', {'scope': 'all'})),
+                         {plan.pk for plan in self.plans.values()})
+        self.assertEqual(self.ids(self.get(self.dev.user, 'api_reviews')), {self.review.pk})
+        self.assertEqual(self.ids(self.get(self.lead.user, 'api_reviews', {'graded': 'GRADED'})), set())
+
+    def test_pages_by_id(self):
+        first = self.get(self.ceo.user, 'api_employees', {'limit': 3}).json()
+        self.assertEqual((first['count'], len(first['results'])), (4, 3))
+        rest = self.get(self.ceo.user, 'api_employees', {'limit': 3, 'after': first['next']}).json()
+        self.assertEqual([row['id'] for row in rest['results']], [self.dev.pk])
+        self.assertIsNone(rest['next'])
+        for value in ['\u00b2', '-1', 'x']:
+            response = self.get(self.ceo.user, 'api_employees', {'after': value, 'limit': value})
+            self.assertEqual(len(response.json()['results']), 4)
+
+    def test_unchanged_collection_is_a_cheap_304(self):
+        etag = self.get(self.lead.user, 'api_learningplans')['ETag']
+        # session, user, employee and the count/max-updated aggregate; no rows
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('app:api_learningplans'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        plan = self.plans[self.dev.pk]
+        plan.status = 'APPROVED'
+        plan.save()
+        response = self.client.get(reverse('app:api_learningplans'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_deleting_a_row_moves_the_etag(self):
+        response = self.get(self.ceo.user, 'api_learningplans')
+        self.assertNotIn('Last-Modified', response)
+        # the oldest row: the newest updated_at stays where it was
+        self.plans[self.manager.pk].delete()
+        headers = {'if-none-match': response['ETag'], 'if-modified-since': http_date(time.time())}
+        again = self.client.get(reverse('app:api_learningplans'), headers=headers)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['count'], 2)
+        stale = self.client.get(reverse('app:api_learningplans'), headers={'if-modified-since': headers['if-modified-since']})
+        self.assertEqual(stale.status_code, 200)
+
+    def test_bulk_writes_move_the_etag(self):
+        etag = self.get(self.ceo.user, 'api_reviews')['ETag']
+        self.review.responsibility_rating = Decimal('4')
+        PerformanceReview.objects.bulk_update([self.review], ['responsibility_rating'])
+        etag_after_bulk = self.client.get(reverse('app:api_reviews'))['ETag']
+        self.assertNotEqual(etag_after_bulk, etag)
+        PerformanceReview.objects.filter(pk=self.review.pk).update(comments='Late')
+        self.assertNotEqual(self.client.get(reverse('app:api_reviews'))['ETag'], etag_after_bulk)
+
+    def test_anonymous_and_bad_filters(self):
+        self.assertEqual(self.client.get(reverse('app:api_reviews')).status_code, 401)
+        response = self.get(self.ceo.user, 'api_learningplans', {'status': 'NOPE'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.json()['errors'])
+
+
+class RollupAssertions:
+    def table(self):
+        return {(row.department_id, row.role, row.quarter): (row.review_count, row.graded_count, row.rating_sum,
+                                                             row.plan_count, row.approved_count, row.rejected_count)
+                for row in QuarterlyRollup.objects.all() if row.review_count or row.plan_count}
+
+    def assertMatchesRebuild(self):
+        incremental = self.table()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.table())
+
+
+class QuarterlyRollupTests(RollupAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.testing = Department.objects.create(department='Testing')
+        cls.ceo = make_employee('ceo', cls.department, role='CEO')
+        cls.dev = make_employee('dev', cls.department, reporting_to=cls.ceo)
+        cls.tester = make_employee('tester', cls.testing, role='TESTER', reporting_to=cls.ceo)
+        for employee in (cls.dev, cls.tester):
+            for quarter_date, status in ((datetime.date(2025, 2, 10), 'APPROVED'), (datetime.date(2025, 8, 1), 'SUBMITTED')):
+                LearningPlan.objects.create(employee=employee, completed_learning='x', planned_learning='y',
+                                            status=status, quarter_date=quarter_date)
+        cls.review = PerformanceReview.objects.create(employee=cls.dev, quarter_date=datetime.date(2025, 8, 1),
+                                                      **OverallScoreTests.review)
+
+    def test_saves_and_deletes_keep_the_table_exact(self):
+        q3 = (self.department.pk, 'DEVELOPER', datetime.date(2025, 7, 1))
+        self.assertEqual(self.table()[q3], (1, 0, 0, 1, 0, 0))
+
+        review = PerformanceReview.objects.get(pk=self.review.pk)
+        for field in ('responsibility_rating', 'communication_rating', 'quality_rating', 'accountability_rating'):
+            setattr(review, field, Decimal('4'))
+        review.save()
+        plan = LearningPlan.objects.get(employee=self.dev, quarter_date=datetime.date(2025, 8, 1))
+        plan.status = 'REJECTED'
+        plan.save()
+        self.assertEqual(self.table()[q3], (1, 1, Decimal('4'), 1, 0, 1))
+
+        # moving a plan to another quarter takes it out of the old row
+        plan.quarter_date = datetime.date(2025, 11, 3)
+        plan.save()
+        LearningPlan.objects.filter(employee=self.tester).delete()
+        self.assertMatchesRebuild()
+
+    def test_employee_changing_department_carries_their_counts(self):
+        employee = Employee.objects.get(pk=self.dev.pk)
+        employee.department, employee.role = self.testing, 'TESTER'
+        employee.save()
+        self.assertNotIn((self.department.pk, 'DEVELOPER', datetime.date(2025, 1, 1)), self.table())
+        self.assertEqual(self.table()[(self.testing.pk, 'TESTER', datetime.date(2025, 1, 1))][3:5], (2, 2))
+        self.assertMatchesRebuild()
+
+    def test_report_reads_only_the_rollups(self):
+        self.client.force_login(self.ceo.user)
+        # session, user, employee, report, departments, and the nav's reports and review
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse('app:quarterly_report'), {'quarter': '2025-Q1'})
+        rows = response.context['rows']
+        self.assertEqual([(row['department__department'], row['approval_rate']) for row in rows],
+                         [('Development', 100.0), ('Testing', 100.0)])
+        by_role = self.client.get(reverse('app:quarterly_report'), {'by': 'role', 'department': self.department.pk})
+        self.assertEqual({(row['label'], row['role']) for row in by_role.context['rows']},
+                         {('2025-Q3', 'DEVELOPER'), ('2025-Q1', 'DEVELOPER')})
+        # malformed narrowing is ignored, not a 500
+        for params in [{'quarter': '0-Q1'}, {'department': '\u00b2'}]:
+            self.assertEqual(self.client.get(reverse('app:quarterly_report'), params).status_code, 200)
+
+    def test_report_is_for_ceo_and_hr(self):
+        self.client.force_login(self.dev.user)
+        response = self.client.get(reverse('app:quarterly_report'))
+        self.assertNotIn('rows', response.context)
+        self.assertContains(response, 'Only CEO and HR')
+
+
+class BulkGradeTests(RollupAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.manager = make_employee('manager', cls.department, role='MANAGER')
+        cls.other = make_employee('other', cls.department, role='MANAGER')
+        cls.reviews = [
+            PerformanceReview.objects.create(employee=make_employee(f'dev{i}', cls.department, reporting_to=cls.manager),
+                                             **OverallScoreTests.review)
+            for i in range(4)
+        ]
+        cls.foreign = PerformanceReview.objects.create(employee=make_employee('stranger', cls.department, reporting_to=cls.other),
+                                                       **OverallScoreTests.review)
+
+    def setUp(self):
+        self.client.force_login(self.manager.user)
+
+    def post(self, rows):
+        data = {'form-TOTAL_FORMS': len(rows), 'form-INITIAL_FORMS': len(rows)}
+        for i, (review, rating) in enumerate(rows):
+            data[f'form-{i}-review'] = review.pk
+            for field in ('responsibility_rating', 'communication_rating', 'quality_rating', 'accountability_rating'):
+                data[f'form-{i}-{field}'] = rating
+        return self.client.post(reverse('app:bulkgrade'), data)
+
+    def test_lists_only_pending_reviews_of_direct_reports(self):
+        response = self.client.get(reverse('app:bulkgrade'))
+        self.assertEqual([performance for _, performance in response.context['rows']], self.reviews)
+
+    def test_grades_in_one_write_with_mails_and_rollups(self):
+        with CaptureQueriesContext(connection) as two:
+            self.post([(review, '4') for review in self.reviews[:2]])
+        with CaptureQueriesContext(connection) as four:
+            self.post([(review, '3') if i < 2 else (review, '') for i, review in enumerate(self.reviews)])
+        self.post([(review, '3') for review in self.reviews[2:]])
+        # rows left blank are skipped, and the count doesn't grow with the rows
+        self.assertEqual(len(two), len(four))
+
+        graded = PerformanceReview.objects.filter(pk__in=[review.pk for review in self.reviews])
+        self.assertEqual(sorted(graded.values_list('graded', 'overall_score', 'commented_by')),
+                         [('GRADED', Decimal('3.0'), self.manager.pk)] * 2 + [('GRADED', Decimal('4.0'), self.manager.pk)] * 2)
+        self.assertEqual(OutboxEmail.objects.filter(dedup_key__startswith='grade:').count(), 4)
+        self.assertMatchesRebuild()
+
+    def test_whole_formset_is_validated_before_writing(self):
+        response = self.post([(self.reviews[0], '4'), (self.foreign, '4')])
+        self.assertEqual(response.status_code, 200)
+        response = self.post([(self.reviews[0], '4'), (self.reviews[1], '9')])
+        self.assertEqual(response.status_code, 200)
+        data = {'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1, 'form-0-review': self.reviews[0].pk,
+                'form-0-responsibility_rating': '4'}
+        self.assertFormError(self.client.post(reverse('app:bulkgrade'), data).context['form'].forms[0], None,
+                             'Give all four ratings, or leave the row blank to grade it later.')
+        self.assertFalse(PerformanceReview.objects.filter(graded='GRADED').exists())
+        self.assertFalse(OutboxEmail.objects.filter(dedup_key__startswith='grade:').exists())
+
+    def test_extra_rows_are_skipped_or_checked(self):
+        # nothing pending, so the extra row has no initial review either and validates empty
+        self.client.force_login(self.reviews[0].employee.user)
+        response = self.client.post(reverse('app:bulkgrade'), {'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 0})
+        self.assertRedirects(response, reverse('app:bulkgrade'))
+        self.client.force_login(self.manager.user)
+        data = {'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 0, 'form-0-review': self.foreign.pk,
+                **{f'form-0-{field}': '4' for field in ('responsibility_rating', 'communication_rating',
+                                                        'quality_rating', 'accountability_rating')}}
+        self.assertEqual(self.client.post(reverse('app:bulkgrade'), data).status_code, 200)
+        self.assertFalse(PerformanceReview.objects.filter(graded='GRADED').exists())
+
+
+class BulkLearningReviewTests(RollupAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.manager = make_employee('manager', cls.department, role='MANAGER')
+        cls.lead = make_employee('lead', cls.department, role='MANAGER', reporting_to=cls.manager)
+        cls.plans = [
+            LearningPlan.objects.create(employee=make_employee(f'dev{i}', cls.department, reporting_to=cls.manager),
+                                        completed_learning='x', planned_learning='y')
+            for i in range(4)
+        ]
+        # a grand-report's plan: visible under ?scope=all, but reviewed by the lead
+        cls.indirect = LearningPlan.objects.create(employee=make_employee('junior', cls.department, reporting_to=cls.lead),
+                                                   completed_learning='x', planned_learning='y')
+
+    def setUp(self):
+        self.client.force_login(self.manager.user)
+
+    def post(self, plans, status='APPROVED'):
+        return self.client.post(reverse('app:bulkreviewlp'), {
+            'plans': [plan.pk for plan in plans], 'status': status,
+            'review_note': 'Looks good', 'schedule_meeting': '2025-09-01'})
+
+    def test_applies_status_note_and_meeting_in_one_write(self):
+        with CaptureQueriesContext(connection) as two:
+            self.post(self.plans[:2])
+        with CaptureQueriesContext(connection) as four:
+            self.post(self.plans[2:], status='REJECTED')
+        self.assertEqual(len(two), len(four))
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "app_learningplan"') for query in four), 1)
+
+        rows = LearningPlan.objects.filter(pk__in=[plan.pk for plan in self.plans]).order_by('pk')
+        self.assertEqual([(plan.status, plan.approved_by_id) for plan in rows],
+                         [('APPROVED', self.manager.pk)] * 2 + [('REJECTED', None)] * 2)
+        self.assertEqual({(plan.review_note, plan.schedule_meeting) for plan in rows},
+                         {('Looks good', datetime.date(2025, 9, 1))})
+        self.assertMatchesRebuild()
+
+    def test_plans_outside_direct_reports_reject_the_whole_batch(self):
+        response = self.post([self.plans[0], self.indirect])
+        self.assertRedirects(response, reverse('app:subordinates'))
+        self.assertFalse(LearningPlan.objects.filter(status='APPROVED').exists())
+
+    def test_user_without_employee_cannot_review_unmanaged_plans(self):
+        # the top of the tree reports to nobody, like everyone a manager-less user could match
+        top = LearningPlan.objects.create(employee=self.manager, completed_learning='x', planned_learning='y')
+        self.client.force_login(User.objects.create(username='outsider'))
+        self.assertRedirects(self.post([top]), reverse('app:subordinates'))
+        top.refresh_from_db()
+        self.assertEqual(top.status, 'SUBMITTED')
+
+
+class ArchiveTests(RollupAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.hr = make_employee('hr', cls.department, role='HR')
+        cls.manager = make_employee('manager', cls.department, role='MANAGER')
+        cls.dev = make_employee('dev', cls.department, reporting_to=cls.manager)
+        old, recent = datetime.date(2023, 2, 1), datetime.date(2025, 8, 1)
+        cls.old_plans = [LearningPlan.objects.create(employee=cls.dev, completed_learning='x', planned_learning='y',
+                                                     status=status, quarter_date=old)
+                         for status in ('APPROVED', 'REJECTED', 'SUBMITTED')]
+        cls.recent_plan = LearningPlan.objects.create(employee=cls.dev, completed_learning='x', planned_learning='y',
+                                                      status='APPROVED', quarter_date=recent)
+        cls.old_review = PerformanceReview.objects.create(employee=cls.dev, quarter_date=old, responsibility_rating=4,
+                                                          communication_rating=4, quality_rating=4,
+                                                          accountability_rating=2, **OverallScoreTests.review)
+        cls.pending_review = PerformanceReview.objects.create(employee=cls.dev, quarter_date=old, **OverallScoreTests.review)
+
+    def test_cutoff_keeps_whole_quarters(self):
+        self.assertEqual(archive.cutoff(4, today=datetime.date(2025, 8, 15)), datetime.date(2024, 7, 1))
+        self.assertEqual(archive.cutoff(1, today=datetime.date(2025, 2, 1)), datetime.date(2024, 10, 1))
+
+    def test_moves_closed_rows_in_chunks_and_rollups_still_count_them(self):
+        before = self.table()
+        moved = list(archive.archive(datetime.date(2025, 1, 1), chunk_size=1))
+        self.assertEqual(moved, [(LearningPlan, 1), (LearningPlan, 1), (PerformanceReview, 1)])
+
+        # open and pending rows stay hot however old; archived ones keep their ids
+        self.assertEqual(set(LearningPlan.objects.all()), {self.old_plans[2], self.recent_plan})
+        self.assertEqual(list(PerformanceReview.objects.all()), [self.pending_review])
+        self.assertEqual(set(ArchivedLearningPlan.objects.values_list('pk', flat=True)),
+                         {plan.pk for plan in self.old_plans[:2]})
+        self.assertEqual(ArchivedPerformanceReview.objects.get().overall_score, Decimal('3.5'))
+
+        self.assertEqual(self.table(), before)
+        self.assertMatchesRebuild()
+        Employee.objects.get(pk=self.dev.pk).delete()
+        self.assertMatchesRebuild()
+
+    def archive_old_quarters(self):
+        list(archive.archive(datetime.date(2025, 1, 1)))
+        live_plans = {self.old_plans[2].pk, self.recent_plan.pk}
+        return live_plans, live_plans | {plan.pk for plan in self.old_plans[:2]}
+
+    def listed(self, user, url_name, key, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse(f'app:{url_name}'), params)
+        self.assertEqual(response.context['include_archived'], params.get('archived') == 'include')
+        return [row.pk for row in response.context[key]]
+
+    def test_lists_include_archived_rows_on_request(self):
+        live, everything = self.archive_old_quarters()
+        for user, url_name in ((self.dev.user, 'learnplan'), (self.manager.user, 'subordinates'),
+                               (self.hr.user, 'allPlans')):
+            key = 'data' if url_name == 'learnplan' else 'plans'
+            self.assertEqual(set(self.listed(user, url_name, key)), live, url_name)
+            self.assertEqual(set(self.listed(user, url_name, key, archived='include')), everything, url_name)
+            # only the one spelling turns it on
+            self.assertEqual(set(self.listed(user, url_name, key, archived='1')), live, url_name)
+
+        self.assertEqual(self.listed(self.manager.user, 'perflist', 'performances'), [self.pending_review.pk])
+        self.assertEqual(self.listed(self.manager.user, 'perflist', 'performances', archived='include', sort='score'),
+                         [self.old_review.pk, self.pending_review.pk])
+        self.assertEqual(self.listed(self.manager.user, 'perflist', 'performances', archived='include', min_score='3'),
+                         [self.old_review.pk])
+
+        response = self.client.get(reverse('app:subordinates'), {'archived': 'include'})
+        self.assertEqual(response.context['approved_count'], 2)
+
+    def test_keyset_pages_walk_both_tables(self):
+        _, everything = self.archive_old_quarters()
+        paginator = KeysetPaginator(archive.WithArchived(LearningPlan.objects.all(), ArchivedLearningPlan.objects.all()),
+                                    3, ordering='-pk')
+        first = paginator.page()
+        rest = paginator.page(after=first.next_cursor)
+        self.assertEqual([plan.pk for plan in [*first, *rest]], sorted(everything, reverse=True))
+        self.assertEqual(paginator.page(before=rest.previous_cursor).object_list, first.object_list)
+        self.assertEqual(paginator.count, 4)
+
+    def test_exports_and_api_include_archived_rows_on_request(self):
+        live, everything = self.archive_old_quarters()
+        self.client.force_login(self.hr.user)
+        export = lambda url_name, **params: list(csv.DictReader(io.StringIO(b''.join(
+            self.client.get(reverse(f'app:{url_name}'), params).streaming_content).decode())))
+        self.assertEqual(len(export('exportlp')), 2)
+        self.assertEqual([row['status'] for row in export('exportlp', archived='include', status='APPROVED')],
+                         ['APPROVED', 'APPROVED'])
+        self.assertEqual(len(export('exportlp', archived='include')), 4)
+        self.assertEqual(len(export('exportperf')), 1)
+        self.assertEqual(len(export('exportperf', archived='include')), 2)
+
+        ids = lambda url_name, **params: [row['id'] for row in
+                                          self.client.get(reverse(f'app:{url_name}'), params).json()['results']]
+        self.assertEqual(set(ids('api_learningplans')), live)
+        self.assertEqual(ids('api_learningplans', archived='include'), sorted(everything))
+        self.assertEqual(ids('api_learningplans', archived='include', limit=2), sorted(everything)[:2])
+        self.assertEqual(ids('api_reviews', archived='include'), [self.old_review.pk, self.pending_review.pk])
+
+    def test_detail_pages_find_archived_rows(self):
+        self.archive_old_quarters()
+        plan = self.old_plans[0]
+        for user in (self.dev.user, self.manager.user, self.hr.user):
+            self.client.force_login(user)
+            response = self.client.get(reverse('app:learnplandeep', args=[plan.pk]))
+            self.assertEqual(response.status_code, 200)
+            self.assertNotContains(response, reverse('app:reviewlp', args=[plan.pk]))
+
+        self.client.force_login(self.manager.user)
+        response = self.client.get(reverse('app:detailperf', args=[self.old_review.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['can_grade'])
+        # someone else's archived review is refused like a live one
+        self.client.force_login(make_employee('other', self.department).user)
+        self.assertEqual(self.client.get(reverse('app:detailperf', args=[self.old_review.pk])).status_code, 403)
+        self.assertEqual(self.client.get(reverse('app:detailperf', args=[10 ** 6])).status_code, 404)
+
+    def test_archive_manager_has_no_write_side_hooks(self):
+        self.archive_old_quarters()
+        reviews = list(ArchivedPerformanceReview.objects.all())
+        for review in reviews:
+            review.comments = 'Noted'
+        ArchivedPerformanceReview.objects.bulk_update(reviews, ['comments'])
+        self.assertEqual(ArchivedPerformanceReview.objects.get().comments, 'Noted')
+
+
+class MeetingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.manager = make_employee('manager', cls.department, role='MANAGER')
+        cls.dev = make_employee('dev', cls.department, reporting_to=cls.manager)
+        cls.other = make_employee('other', cls.department)
+        today = timezone.localdate()
+        cls.plans = {}
+        for name, employee, days in (('past', cls.dev, -3), ('soon', cls.dev, 2), ('own', cls.manager, 5),
+                                     ('far', cls.dev, meetings.MEETING_WINDOW_DAYS + 1), ('stranger', cls.other, 1)):
+            cls.plans[name] = LearningPlan.objects.create(
+                employee=employee, completed_learning='x', planned_learning='y', review_note='Bring notes; slides, too',
+                schedule_meeting=today + datetime.timedelta(days=days))
+
+    def test_upcoming_is_the_next_window_for_the_user_or_their_reports(self):
+        self.assertEqual(list(meetings.upcoming(self.manager, include_reports=True)), [self.plans['soon'], self.plans['own']])
+        self.assertEqual(list(meetings.upcoming(self.dev)), [self.plans['soon']])
+
+        self.client.force_login(self.manager.user)
+        response = self.client.get(reverse('app:meetings'))
+        self.assertEqual(list(response.context['meetings']), [self.plans['soon'], self.plans['own']])
+        self.assertEqual(self.client.get(reverse('app:dashboard')).context['meeting'], self.plans['own'])
+
+    def test_feed_streams_events_and_answers_conditional_gets(self):
+        url = reverse('app:meetings_feed', args=[meetings.feed_token(self.manager)])
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn(f'UID:learningplan-{self.plans["soon"].pk}@testserver', body)
+        self.assertIn('Plan status: SUBMITTED\\nBring notes\\; slides\\, too', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+        # a poll with the validators costs one aggregate query and no rows
+        with self.assertNumQueries(1):
+            response = self.client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        plan = self.plans['soon']
+        plan.schedule_meeting += datetime.timedelta(days=1)
+        plan.save()
+        self.assertEqual(self.client.get(url, headers={'if-none-match': response['ETag']}).status_code, 200)
+
+    def test_cancelled_meeting_is_not_a_304(self):
+        url = reverse('app:meetings_feed', args=[meetings.feed_token(self.manager)])
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        # the earlier of the two: the newest updated_at doesn't move
+        self.plans['soon'].delete()
+        headers = {'if-none-match': response['ETag'], 'if-modified-since': http_date(time.time())}
+        response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content).decode().count('BEGIN:VEVENT'), 1)
+        self.assertEqual(self.client.get(url, headers={'if-modified-since': headers['if-modified-since']}).status_code, 200)
+
+    def test_feed_needs_a_valid_token(self):
+        token = meetings.feed_token(self.manager)
+        self.assertEqual(self.client.get(reverse('app:meetings_feed', args=[token[:-2] + 'xx'])).status_code, 404)
+
+
+@override_settings(PRINCIPAL_CACHE_TIMEOUT=60)
+class AuthProfileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.dev = make_employee('dev', cls.department)
+
+    def setUp(self):
+        caches['principal'].clear()
+        self.client.force_login(self.dev.user)
+
+    def page_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('app:learnplan')).status_code, 200)
+        return [query['sql'] for query in queries]
+
+    def test_employee_is_cached_in_process_until_it_changes(self):
+        employee_lookup = lambda queries: [sql for sql in queries if 'WHERE "app_employee"."user_id" = ' in sql]
+        self.assertEqual(len(employee_lookup(self.page_queries())), 1)
+        self.assertEqual(employee_lookup(self.page_queries()), [])
+
+        employee = Employee.objects.get(pk=self.dev.pk)
+        employee.role = 'TESTER'
+        employee.save()
+        self.assertEqual(len(employee_lookup(self.page_queries())), 1)
+        self.assertEqual(self.client.get(reverse('app:learnplan')).wsgi_request.principal.role, 'TESTER')
+
+    def test_profile_edits_dont_write_back_the_cached_employee(self):
+        old, new = make_employee('old', self.department), make_employee('new', self.department)
+        Employee.objects.filter(pk=self.dev.pk).update(reporting_to=old)
+        self.page_queries()
+        # another process moves dev; its signals never reach this process's cache
+        Employee.objects.filter(pk=self.dev.pk).update(reporting_to=new)
+        self.client.post(reverse('app:empupdate1'), {'department': self.department.pk})
+        self.assertEqual(Employee.objects.get(pk=self.dev.pk).reporting_to, new)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_cookie_sessions_keep_the_session_table_off_the_request_path(self):
+        user = self.dev.user
+        user.set_password('burst-password')
+        user.save()
+        self.client = self.client_class()
+        with CaptureQueriesContext(connection) as login:
+            self.client.post(reverse('app:login'), {'username': 'dev', 'password': 'burst-password'})
+        self.assertFalse([query for query in login if 'django_session' in query['sql']])
+        self.assertFalse([sql for sql in self.page_queries() if 'django_session' in sql])
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_hash_work_factor_is_tunable_and_old_hashes_upgrade(self):
+        from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+        self.assertTrue(make_password('secret').startswith('pbkdf2_sha256$1000$'))
+        stored = PBKDF2PasswordHasher().encode('secret', 'somesalt', iterations=2000)
+        upgraded = []
+        self.assertTrue(check_password('secret', stored, setter=upgraded.append))
+        self.assertEqual(upgraded, ['secret'])
+
+    def test_profiles(self):
+        from hrms import authprofiles
+        self.assertEqual(authprofiles.session_engine('cached'), 'django.contrib.sessions.backends.cached_db')
+        self.assertEqual(authprofiles.principal_cache_timeout('db', env={}), 0)
+        self.assertEqual(authprofiles.caches(env={'REDIS_URL': 'redis://cache:6379'})['default']['LOCATION'], 'redis://cache:6379')
+        with self.assertRaises(ValueError):
+            authprofiles.session_engine('memcached')
+
+
+class StaticAssetTests(TestCase):
+    def collect(self):
+        from django.core.management import call_command
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        call_command('collectstatic', interactive=False, verbosity=0)
+        return staticfiles_storage
+
+    def test_collected_assets_are_hashed_precompressed_and_immutable(self):
+        import gzip
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root, DEBUG=False):
+            storage = self.collect()
+            hashed = storage.stored_name('app/style.css')
+            self.assertRegex(hashed, r'^app/style\.[0-9a-f]{12}\.css$')
+            self.assertTrue(Path(root, hashed + '.gz').exists())
+            source = Path(root, hashed).read_bytes()
+            client = self.client_class()
+            url = storage.url('app/style.css')
+
+            response = client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+            self.assertTrue(response['Content-Type'].startswith('text/css'))
+            self.assertEqual(gzip.decompress(response.content), source)
+
+            plain = client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+            self.assertFalse(plain.has_header('Content-Encoding'))
+            self.assertEqual(plain.content, source)
+            self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=plain['ETag']).status_code, 304)
+            # the unhashed name still answers, but must be revalidated
+            self.assertEqual(client.get('/static/app/style.css')['Cache-Control'], 'public, no-cache')
+
+            with self.assertNumQueries(0):
+                client.get(url)
+            self.assertIn(f'href="{url}"', client.get(reverse('app:login')).content.decode())
+
+    def test_source_names_before_collectstatic(self):
+        from django.templatetags.static import static
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root, DEBUG=False):
+            self.assertEqual(static('app/style.css'), '/static/app/style.css')
+
+
+class ScopedLookupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.ceo = make_employee('ceo', cls.department, role='CEO')
+        cls.hr = make_employee('hr', cls.department, role='HR', reporting_to=cls.ceo)
+        cls.manager = make_employee('manager', cls.department, role='MANAGER', reporting_to=cls.ceo)
+        cls.lead = make_employee('lead', cls.department, role='TEAM LEAD', reporting_to=cls.manager)
+        cls.dev = make_employee('dev', cls.department, reporting_to=cls.lead)
+        cls.other = make_employee('other', cls.department, reporting_to=cls.ceo)
+        cls.review = PerformanceReview.objects.create(employee=cls.dev, **OverallScoreTests.review)
+        cls.plan = LearningPlan.objects.create(employee=cls.dev, completed_learning='Django', planned_learning='SQL')
+
+    def test_visible_to_and_gradable_by(self):
+        visible = lambda employee: set(PerformanceReview.objects.visible_to(employee))
+        self.assertEqual(visible(self.dev), {self.review})
+        self.assertEqual(visible(self.lead), {self.review})
+        self.assertEqual(visible(self.manager), {self.review})
+        self.assertEqual(visible(self.hr), {self.review})
+        self.assertEqual(visible(self.other), set())
+        self.assertEqual(visible(None), set())
+        self.assertEqual(list(LearningPlan.objects.gradable_by(self.lead)), [self.plan])
+        self.assertFalse(LearningPlan.objects.gradable_by(self.manager).exists())
+        self.assertFalse(PerformanceReview.objects.gradable_by(self.dev).exists())
+
+    def lookups(self, user, name, pk):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name, args=[pk]))
+        table = PerformanceReview._meta.db_table if 'perf' in name else LearningPlan._meta.db_table
+        # the nav's own per-user lookups aside
+        return response, [query['sql'] for query in queries if f'"{table}"."id" = {pk}' in query['sql']]
+
+    def test_each_view_fetches_and_authorizes_in_one_query(self):
+        cases = [(self.lead, 'app:reviewlp', self.plan.pk), (self.lead, 'app:gradeperf', self.review.pk),
+                 (self.dev, 'app:editperf', self.review.pk), (self.manager, 'app:detailperf', self.review.pk)]
+        for employee, name, pk in cases:
+            with self.subTest(name):
+                response, lookups = self.lookups(employee.user, name, pk)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(lookups), 1)
+
+    def test_detail_page_preloads_its_users(self):
+        self.review.responsibility_rating = self.review.communication_rating = 4
+        self.review.quality_rating = self.review.accountability_rating = 4
+        self.review.commented_by = self.lead
+        self.review.save()
+        self.client.force_login(self.manager.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('app:detailperf', args=[self.review.pk]))
+        self.assertContains(response, 'lead Test')
+        self.assertFalse(response.context['can_grade'])
+        user_lookups = [query['sql'] for query in queries if query['sql'].startswith('SELECT') and 'FROM "auth_user"' in query['sql']]
+        # the session's own user, nothing per related row
+        self.assertEqual(len(user_lookups), 1)
+        self.assertFalse([query['sql'] for query in queries if 'reportingpath' in query['sql'] and 'perf' not in query['sql']])
+
+    def test_outsiders_get_403_and_missing_rows_404(self):
+        response, lookups = self.lookups(self.other.user, 'app:detailperf', self.review.pk)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.lookups(self.manager.user, 'app:gradeperf', self.review.pk)[0].status_code, 403)
+        self.assertEqual(self.lookups(self.lead.user, 'app:updategrade', self.review.pk)[0].status_code, 403)
+        self.assertEqual(self.lookups(self.hr.user, 'app:detailperf', self.review.pk + 100)[0].status_code, 404)
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(department='Development')
+        cls.design = Department.objects.create(department='Design')
+        cls.ceo = make_employee('ceo', cls.department, role='CEO')
+        cls.hr = make_employee('hr', cls.department, role='HR', reporting_to=cls.ceo)
+        cls.manager = make_employee('manager', cls.department, role='MANAGER', reporting_to=cls.ceo)
+        cls.dev = make_employee('dev', cls.department, reporting_to=cls.manager)
+        for i in range(20):
+            make_employee(f'staff{i}', cls.department, reporting_to=cls.manager)
+
+    def test_employee_endpoint_matches_name_prefixes(self):
+        self.client.force_login(self.hr.user)
+        response = self.client.get(reverse('app:autocomplete_employees'), {'q': 'manag'})
+        self.assertEqual(response.json()['results'][0], {'id': self.manager.pk, 'label': 'manager Test (manager@example.com)'})
+        self.assertEqual(len(self.client.get(reverse('app:autocomplete_employees'), {'q': 'staff'}).json()['results']), 10)
+        results = self.client.get(reverse('app:autocomplete_departments'), {'q': 'des'}).json()['results']
+        self.assertEqual(results, [{'id': self.design.pk, 'label': 'Design'}])
+
+    def test_only_ceo_and_hr_can_search(self):
+        self.assertEqual(self.client.get(reverse('app:autocomplete_employees'), {'q': 'ceo'}).status_code, 401)
+        self.client.force_login(self.dev.user)
+        self.assertEqual(self.client.get(reverse('app:autocomplete_employees'), {'q': 'ceo'}).status_code, 403)
+
+    def test_rendering_does_not_load_the_choices(self):
+        from .forms import EmployeeAdminUpdateForm, EmployeeCreateForm
+        with self.assertNumQueries(0):
+            html = str(EmployeeCreateForm()['reporting_to'])
+        self.assertIn('data-autocomplete-url="/api/autocomplete/employees/"', html)
+        self.assertNotIn('<option', html)
+        # an edit form looks up the one selected row for its label
+        with self.assertNumQueries(1):
+            html = str(EmployeeAdminUpdateForm(instance=self.dev)['reporting_to'])
+        self.assertIn(f'value="{self.manager.pk}"', html)
+        self.assertIn('value="manager Test (manager@example.com)"', html)
+
+    def test_validation_resolves_only_the_submitted_id(self):
+        from .forms import EmployeeAdminUpdateForm
+        field = EmployeeAdminUpdateForm().fields['reporting_to']
+        with self.assertNumQueries(1):
+            self.assertEqual(field.clean(str(self.hr.pk)), self.hr)
+        with self.assertRaises(ValidationError):
+            field.clean('999999')
+        form = EmployeeAdminUpdateForm({'department': self.design.pk, 'role': 'DEVELOPER', 'reporting_to': self.hr.pk},
+                                       instance=self.dev)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.dev.refresh_from_db()
+        self.assertEqual((self.dev.department, self.dev.reporting_to), (self.design, self.hr))
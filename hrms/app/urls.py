@@ -1,9 +1,12 @@
 from django.urls import path
 from .views import *
+from .api import DepartmentAutocompleteAPI, EmployeeAPI, EmployeeAutocompleteAPI, LearningPlanAPI, PerformanceReviewAPI
+from .async_views import AsyncAllLearningView, AsyncDashboardView, AsyncPerformanceList, AsyncSubordinateView
 
 app_name = 'app'
 urlpatterns = [
     path('create/',CreateEmp.as_view(),name='create'),
+    path('create/import/',ImportEmployeesView.as_view(),name='importemp'),
     path('dashboard/',DashboardView.as_view(),name='dashboard'),
     path('',loginUser,name='login'),
     path('employee/update',EmpUpdateEmpView.as_view(),name='empupdate1'),
@@ -12,14 +15,31 @@ urlpatterns = [
     path('create/learnings/',LearningCreateView.as_view(),name='createlp'),
     path('learnings/<int:pk>/update',LearningUpdateByEmp.as_view(),name='updatelp'),
     path('learnings/<int:pk>/review',LearningReView.as_view(),name='reviewlp'),
+    path('learnings/review/bulk/',BulkLearningReview.as_view(),name='bulkreviewlp'),
     path('subordinates/',SubordinateView.as_view(),name='subordinates'),
+    path('meetings/',MeetingsView.as_view(),name='meetings'),
+    path('meetings/<str:token>/calendar.ics',MeetingFeed.as_view(),name='meetings_feed'),
     path('learnings/',AllLearningView.as_view(),name='allPlans'),
+    path('learnings/export/',LearningPlanExport.as_view(),name='exportlp'),
     path('learnings/<int:pk>/employee/',LearnPlanDetailView.as_view(),name='learnplandeep'),
     path('logout/',logoutUser,name='logout'),
     path('performance/create/', CreatePerformance.as_view(), name='createpr'),
     path('performance/list/', PerformanceList.as_view(), name='perflist'),
+    path('performance/export/', PerformanceExport.as_view(), name='exportperf'),
+    path('performance/grade/bulk/', BulkGradePerformance.as_view(), name='bulkgrade'),
     path('performance/<int:pk>/grade/', GradePerformance.as_view(), name='gradeperf'),
     path('performance/<int:pk>/edit/', EmpUpdatePerformance.as_view(), name='editperf'),
     path('performance/<int:pk>/', DetailedPerformance.as_view(), name='detailperf'),
     path('performance/<int:pk>/update-grade/', UpdateGradePerformance.as_view(), name='updategrade'),
+    path('reports/quarterly/', QuarterlyReportView.as_view(), name='quarterly_report'),
+    path('api/employees/', EmployeeAPI.as_view(), name='api_employees'),
+    path('api/learningplans/', LearningPlanAPI.as_view(), name='api_learningplans'),
+    path('api/reviews/', PerformanceReviewAPI.as_view(), name='api_reviews'),
+    path('api/autocomplete/employees/', EmployeeAutocompleteAPI.as_view(), name='autocomplete_employees'),
+    path('api/autocomplete/departments/', DepartmentAutocompleteAPI.as_view(), name='autocomplete_departments'),
+    # the same list pages served from the event loop, for ASGI deployments
+    path('async/dashboard/', AsyncDashboardView.as_view(), name='dashboard_async'),
+    path('async/subordinates/', AsyncSubordinateView.as_view(), name='subordinates_async'),
+    path('async/learnings/', AsyncAllLearningView.as_view(), name='allPlans_async'),
+    path('async/performance/list/', AsyncPerformanceList.as_view(), name='perflist_async'),
 ]
\ No newline at end of file
@@ -1,16 +1,28 @@
 from django.shortcuts import render,get_object_or_404,redirect
 from django.views.generic import *
-from .models import Employee,LearningPlan,PerformanceReview, Department
-from .forms import LearningForm, EmployeeCreateForm,EmployeeAdminUpdateForm,LearningReviewForm,LearningUpdateForm,EmployeeUpdateForm,PerformanceReviewAdminForm,PerformanceReviewForm,PerformanceReviewUpdateForm,PerformanceReviewAdminUpdateForm
+from .models import Employee,LearningPlan,PerformanceReview, Department, QuarterlyRollup, RATING_FIELDS
+from .forms import LearningForm, EmployeeCreateForm,EmployeeImportForm,EmployeeAdminUpdateForm,LearningReviewForm,LearningUpdateForm,EmployeeUpdateForm,PerformanceReviewAdminForm,PerformanceReviewForm,PerformanceReviewUpdateForm,PerformanceReviewAdminUpdateForm,BulkGradeFormSet,BulkLearningReviewForm
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate,login,logout
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib.messages.views import SuccessMessageMixin
 from django.contrib import messages
 from django.core.mail import send_mail
-from .filters import employee_filter
+import hashlib
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.db import transaction
+from django.db.models import Count, F, Max
+from decimal import Decimal
+from .filters import learning_plan_filter, performance_filter, quarter_range, ranked_employee_filter
+from .pagination import KeysetPaginationMixin
+from .stats import dashboard_stats, plan_status_counts
+from .importer import import_file
+from . import archive, exports, meetings, outbox, rollups
+from .signals import grade_message
 
 
 class CreateEmp(LoginRequiredMixin,SuccessMessageMixin,CreateView):
@@ -24,6 +36,21 @@ class CreateEmp(LoginRequiredMixin,SuccessMessageMixin,CreateView):
         return f'{cleaned_data.get("first_name")} {cleaned_data.get("last_name")} added as an Employee'
 
     
+class ImportEmployeesView(LoginRequiredMixin,FormView):
+    form_class = EmployeeImportForm
+    template_name = 'app/import.html'
+    login_url = reverse_lazy('app:login')
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not request.principal.is_ceo_or_hr:
+            raise PermissionDenied('Only CEO and HR can import employees')
+        return super().dispatch(request, *args, **kwargs)
+
+    def form_valid(self, form):
+        upload = form.cleaned_data['file']
+        result = import_file(upload.file, upload.name)
+        messages.success(self.request, f'{result.created} employees imported')
+        return self.render_to_response(self.get_context_data(form=self.form_class(), result=result))
 
 def loginUser(request):
     if request.method == 'POST':
@@ -42,73 +69,98 @@ def logoutUser(request):
     messages.success(request,'You are Logged Out')
     return redirect('app:login')
 
-class DashboardView(LoginRequiredMixin,ListView):
+class DashboardView(LoginRequiredMixin,KeysetPaginationMixin,ListView):
     model = Employee
     template_name = 'app/dashboard.html'
     login_url = reverse_lazy('app:login')
+    paginate_by = 25
 
     def get_queryset(self):
-        employee = self.request.user.employee
-        if employee.role in ['CEO','HR']:
-            self.filter = employee_filter(self.request.GET, queryset = super().get_queryset())
-            return Employee.objects.all() and self.filter.qs
+        if self.request.principal.is_ceo_or_hr:
+            self.filter = ranked_employee_filter(self.request.GET, queryset = Employee.objects.with_related())
+            queryset = self.filter.qs
+            if 'search_rank' in queryset.query.annotations:
+                # a search pages through its ranking instead of by id
+                self.paginate_ordering = 'search_rank'
+            return queryset
         else:
-            return Employee.objects.filter(user = self.request.user)
+            return Employee.objects.with_related().filter(user = self.request.user)
         
         
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # ceo or hr filter
-        context['is_ceo_or_hr'] = self.request.user.employee.role in ['CEO','HR']
-        user = self.request.user.employee
-        # pending count
-        context['pending'] = PerformanceReview.objects.filter(graded = 'PENDING', employee = user).count()
-        # managers count
-        employees = context['object_list']
-        manager_ids = {emp.reporting_to_id for emp in employees if emp.reporting_to_id}
-        context['managers'] = len(manager_ids)
-        # print(f'Debug: Manager Count = {len(manager_ids)}')
-        # department count
-        depts = {emp.department for emp in employees}
-        context['depts'] = len(depts)
+        context['is_ceo_or_hr'] = self.request.principal.is_ceo_or_hr
+        user = self.request.principal.employee
+        # stat cards: directory counts over every filtered employee, not just this page
+        context['stats'] = dashboard_stats(user, self.object_list if context['is_ceo_or_hr'] else None)
         # have meeting or not 
-        meetings = LearningPlan.objects.filter(schedule_meeting__isnull=False, employee=user)
-        if meetings.exists():
-            context['meeting'] = meetings
-        else:
-            context['meeting'] = None
-        # avg rating 
-        context['performance'] = PerformanceReview.objects.filter(employee = self.request.user.employee)
-        performance = context['performance']
-        for item in performance:
-            if (item.responsibility_rating and item.communication_rating and item.quality_rating and item.communication_rating):
-                context['avg_rating'] = (item.responsibility_rating + item.communication_rating + item.quality_rating + item.communication_rating) / 4
+        context['meeting'] = self.get_meeting(user)
 
         # Filter Context 
-        if self.request.user.employee.role in ['CEO','HR']:
+        if context['is_ceo_or_hr']:
             context['filter'] = self.filter
             context['departments'] = Department.objects.all()
             context['role_choices'] = Employee.ROLE_CHOICES
         return context
 
+    def get_meeting(self, employee):
+        return meetings.upcoming(employee).first()
+
+
+class ArchivedRowsMixin:
+    """
+    ``?archived=include`` merges the rows archived from old quarters into a
+    list of plans or reviews. The view builds the query for either table
+    with ``rows(model)``.
+    """
+
+    def include_archived(self):
+        return self.request.GET.get('archived') == 'include' and self.model in archive.ARCHIVES
+
+    def get_queryset(self):
+        rows = self.rows(self.model)
+        if self.include_archived():
+            return archive.WithArchived(rows, self.rows(archive.ARCHIVES[self.model]))
+        return rows
 
-class LearningPlanView(LoginRequiredMixin,ListView):
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['include_archived'] = self.include_archived()
+        return context
+
+
+class ArchivedObjectMixin:
+    """
+    Detail pages for plans and reviews: an archived row keeps its id, so a
+    miss in the hot table looks in the archive, through the same
+    ``get_queryset(model)`` and so the same permission check.
+    """
+
+    def get_object(self, queryset=None):
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            return super().get_object(self.get_queryset(archive.ARCHIVES[self.model]))
+
+
+class LearningPlanView(LoginRequiredMixin,ArchivedRowsMixin,ListView):
     model = LearningPlan
     context_object_name = 'data'
     login_url = reverse_lazy('app:login')
     template_name = 'app/learnview.html'
 
-    def get_queryset(self):
-        if self.request.user.employee.role in ['CEO','HR']:
-            return LearningPlan.objects.all()
+    def rows(self, model):
+        if self.request.principal.is_ceo_or_hr:
+            return model.objects.with_employee()
         else:
-            return LearningPlan.objects.filter(employee = self.request.user.employee )
+            return model.objects.with_employee().filter(employee = self.request.principal.employee )
         
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        data = LearningPlan.objects.filter(employee = self.request.user.employee)
-        context['is_ceo_or_hr'] = self.request.user.employee.role in ['CEO','HR']
+        data = LearningPlan.objects.filter(employee = self.request.principal.employee)
+        context['is_ceo_or_hr'] = self.request.principal.is_ceo_or_hr
         context['active_plans'] = data.filter(status = 'APPROVED').count()
         return context
 
@@ -144,20 +196,20 @@ class EmpUpdateEmpView(LoginRequiredMixin,SuccessMessageMixin,UpdateView):
     success_message = 'Employee Profile Updated'
 
     def get_form_class(self):
-        employee = self.request.user.employee
-        if employee.role in ['CEO','HR']:
+        if self.request.principal.is_ceo_or_hr:
             return EmployeeAdminUpdateForm
         else:
             return EmployeeUpdateForm
     
     def get_object(self):
-        if self.request.user.employee.role in ['CEO','HR']:
+        if self.request.principal.is_ceo_or_hr:
             return get_object_or_404(Employee, pk = self.kwargs['pk'])
         else:
-            return self.request.user.employee
+            # a fresh row: the principal's copy may be cached from before another process changed it
+            return get_object_or_404(Employee, pk = self.request.principal.pk)
         
     def get_queryset(self):
-        if self.request.user.employee.role in ['CEO','HR']:
+        if self.request.principal.is_ceo_or_hr:
             return Employee.objects.all()
         else:
             return Employee.objects.filter(user = self.request.user)
@@ -168,7 +220,7 @@ class EmpUpdateEmpView(LoginRequiredMixin,SuccessMessageMixin,UpdateView):
         new_role = form.cleaned_data.get('role')
         
         if fresh_employee.role == 'CEO' and new_role != 'CEO':
-            if fresh_employee.user == self.request.user:
+            if fresh_employee.pk == self.request.principal.pk:
                 form.add_error('role', 'You cannot demote yourself from CEO')
                 return self.form_invalid(form)
         
@@ -188,7 +240,7 @@ class LearningCreateView(LoginRequiredMixin,SuccessMessageMixin,CreateView):
     success_message = 'Learning Plan Created'
 
     def form_valid(self, form):
-        form.instance.employee = self.request.user.employee
+        form.instance.employee = self.request.principal.employee
         return super().form_valid(form)
 
 class LearningUpdateByEmp(LoginRequiredMixin,SuccessMessageMixin,UpdateView,):
@@ -203,77 +255,148 @@ class LearningUpdateByEmp(LoginRequiredMixin,SuccessMessageMixin,UpdateView,):
         return LearningPlan.objects.filter(employee__user = self.request.user)
 
 
-class LearningReView(LoginRequiredMixin, SuccessMessageMixin,UpdateView,):
+class ScopedObjectMixin:
+    """
+    get_object() through a get_queryset() that already carries the permission
+    check, so one query fetches and authorizes the row. Only a miss costs a
+    second query, to answer 403 for someone else's row and 404 for no row.
+    """
+
+    def get_object(self, queryset=None):
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            model = self.model if queryset is None else queryset.model
+            if model._default_manager.filter(pk=self.kwargs['pk']).exists():
+                raise PermissionDenied(self.get_permission_denied_message())
+            raise
+
+class LearningReView(LoginRequiredMixin,ScopedObjectMixin, SuccessMessageMixin,UpdateView,):
     model = LearningPlan
     form_class = LearningReviewForm
     login_url = reverse_lazy('app:login')
     success_url = reverse_lazy('app:subordinates')
     template_name = 'app/reviewlp.html'
     success_message = 'Learning Plan Approved'
+    permission_denied_message = "You can only review your subordinate's plans"
     
-    def get_object(self):
-        learning_plan = get_object_or_404(LearningPlan, pk=self.kwargs['pk'])
-        reviewer = self.request.user.employee
-        
-        if learning_plan.employee.reporting_to != reviewer:
-            raise PermissionDenied("You can only review your subordinate's plans")
-        return learning_plan
+    def get_queryset(self):
+        return LearningPlan.objects.gradable_by(self.request.principal.employee).with_employee()
     
     def form_valid(self, form):
         if form.instance.status == 'APPROVED':
-            form.instance.approved_by = self.request.user.employee
+            form.instance.approved_by = self.request.principal.employee
         return super().form_valid(form)
     
-class SubordinateView(LoginRequiredMixin,ListView):
+class BulkLearningReview(LoginRequiredMixin,FormView):
+    """
+    The subordinates page's bulk action: the chosen status, note and meeting
+    date go on every selected plan, written with one bulk_update. Like
+    LearningReView, only plans of direct reports still awaiting review can be
+    changed, and approving records the manager in approved_by.
+    """
+    form_class = BulkLearningReviewForm
+    login_url = reverse_lazy('app:login')
+    success_url = reverse_lazy('app:subordinates')
+    http_method_names = ['post']
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['manager'] = self.request.principal.employee
+        return kwargs
+
+    def form_invalid(self, form):
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(self.request, error)
+        return redirect(self.success_url)
+
+    def form_valid(self, form):
+        plans = list(form.cleaned_data['plans'])
+        status = form.cleaned_data['status']
+        for plan in plans:
+            plan.status = status
+            plan.review_note = form.cleaned_data['review_note']
+            plan.schedule_meeting = form.cleaned_data['schedule_meeting']
+            if status == 'APPROVED':
+                plan.approved_by = self.request.principal.employee
+        # bulk_update sends no signals: move the rollups here
+        with transaction.atomic():
+            LearningPlan.objects.bulk_update(plans, ['status', 'review_note', 'schedule_meeting', 'approved_by'])
+            rollups.record_many(plans)
+        messages.success(self.request, f'{len(plans)} learning plan{"s" if len(plans) != 1 else ""} set to {status}')
+        return super().form_valid(form)
+
+class SubordinateScopeMixin:
+    """Direct reports by default; ``?scope=all`` widens to the whole reporting subtree."""
+
+    def show_all_levels(self):
+        return self.request.GET.get('scope') == 'all'
+
+    def get_subordinates(self):
+        manager = self.request.principal.employee
+        if self.show_all_levels():
+            return Employee.objects.subordinates_of(manager)
+        return Employee.objects.filter(reporting_to = manager)
+
+    def subordinate_ids(self):
+        # fetched once per request and shared with the nav's "has reports" check
+        return self.request.principal.report_ids(self.show_all_levels())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['scope_all'] = self.show_all_levels()
+        return context
+
+class SubordinateView(LoginRequiredMixin,SubordinateScopeMixin,ArchivedRowsMixin,ListView):
     model = LearningPlan
     template_name = 'app/subordinate.html'
     login_url = reverse_lazy('app:login')
     context_object_name = 'plans'
 
-    def get_queryset(self):
-        manager = self.request.user.employee
-        has_manager = Employee.objects.filter(reporting_to = manager).exists()
-        if not has_manager:
-            return LearningPlan.objects.none()
-        subordinate = Employee.objects.filter(reporting_to = manager)
-        return LearningPlan.objects.filter(employee__in=subordinate).order_by('status')
+    def rows(self, model):
+        if not self.subordinate_ids():
+            return model.objects.none()
+        return model.objects.with_employee().filter(employee__in=self.get_subordinates()).order_by('status')
     
     def get_context_data(self, **kwargs):
         context =  super().get_context_data(**kwargs)
-        plans =context['plans']
-        context['pending_count'] = plans.filter(status = 'PENDING')
-        context['approved_count'] = plans.filter(status='APPROVED')
-        context['review_count'] = plans.filter(status='REVIEW')
-        context['subordinate_count']=Employee.objects.filter(reporting_to=self.request.user.employee).count()
+        context.update(plan_status_counts(self.object_list))
+        context['subordinate_count']=len(self.subordinate_ids())
         return context
     
-class AllLearningView(LoginRequiredMixin,ListView):
+class AllLearningView(LoginRequiredMixin,KeysetPaginationMixin,ArchivedRowsMixin,ListView):
     model = LearningPlan
     template_name = 'app/all_learning_plans.html'
     login_url = reverse_lazy('app:login')
     context_object_name = 'plans'
-    def get_queryset(self):
-        employee = self.request.user.employee
-        if employee.role in ['CEO','HR']:
-            return LearningPlan.objects.all()
+    paginate_by = 25
+    paginate_ordering = '-pk'
+
+    def rows(self, model):
+        if self.request.principal.is_ceo_or_hr:
+            return model.objects.with_employee()
         else:
-            return LearningPlan.objects.none()
+            return model.objects.none()
         
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['is_ceo_or_hr'] = self.request.user.employee.role in ['CEO','HR']
+        context['is_ceo_or_hr'] = self.request.principal.is_ceo_or_hr
         return context
     
 def roles(request):
     ceo_hr = ['CEO','HR']
     return render(request,'app/nav.html',{'ceo_hr':ceo_hr})
 
-class LearnPlanDetailView(LoginRequiredMixin, DetailView):
+class LearnPlanDetailView(LoginRequiredMixin, ArchivedObjectMixin, DetailView):
     model = LearningPlan
     template_name = 'app/specific.html'
     login_url = reverse_lazy('app:login')
     context_object_name = 'plans'
 
+    def get_queryset(self, model=None):
+        return (model or self.model).objects.all()
+
 
 class CreatePerformance(LoginRequiredMixin,SuccessMessageMixin,CreateView):
     model = PerformanceReview
@@ -283,35 +406,175 @@ class CreatePerformance(LoginRequiredMixin,SuccessMessageMixin,CreateView):
     success_message = 'Performance Review Submitted'
     
     def get_form_class(self):
-        if not self.request.user.employee.role in['CEO']:
+        if not self.request.principal.is_ceo:
             return PerformanceReviewForm
         
     def form_valid(self, form):
-        form.instance.employee = self.request.user.employee
+        form.instance.employee = self.request.principal.employee
         return super().form_valid(form)
         
 # all subordinates review 
-class PerformanceList(LoginRequiredMixin,ListView):
+class PerformanceList(LoginRequiredMixin,SubordinateScopeMixin,ArchivedRowsMixin,ListView):
     model = PerformanceReview
     login_url = reverse_lazy('app:login')
     context_object_name = 'performances'
     template_name = 'app/perflist.html'
 
-    def get_queryset(self):
-        manager = self.request.user.employee
-        subordinate = Employee.objects.filter(reporting_to = manager)
-        if not subordinate.exists():
-            return PerformanceReview.objects.none()
-        return PerformanceReview.objects.filter(employee__in=subordinate)
+    def rows(self, model):
+        if not self.subordinate_ids():
+            return model.objects.none()
+        queryset = model.objects.with_employee().filter(employee__in=self.get_subordinates())
+        # score range and ordering run on the indexed overall_score column
+        low, high = self.score_param('min_score'), self.score_param('max_score')
+        if low is not None or high is not None:
+            queryset = queryset.score_between(low, high)
+        sort = self.request.GET.get('sort')
+        if sort == 'score':
+            queryset = queryset.order_by(F('overall_score').desc(nulls_last=True), 'pk')
+        elif sort == '-score':
+            queryset = queryset.order_by(F('overall_score').asc(nulls_last=True), 'pk')
+        return queryset
+
+    def pending_grading(self):
+        if not self.subordinate_ids():
+            return 0
+        return PerformanceReview.objects.filter(employee__in=self.get_subordinates(), graded = 'PENDING').count()
+
+    def score_param(self, name):
+        try:
+            value = Decimal(self.request.GET[name])
+        except (KeyError, ArithmeticError, ValueError):
+            return None
+        # NaN and Infinity parse, but the score column can't compare with them
+        return value if value.is_finite() else None
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        manager = self.request.user.employee
-        subordinate = Employee.objects.filter(reporting_to = manager)
-        data =  PerformanceReview.objects.filter(employee__in=subordinate)
-        context['subordinate_count'] = subordinate.count()
-        context['pending_grading'] = data.filter(graded = 'PENDING').count()
+        context['subordinate_count'] = len(self.subordinate_ids())
+        context['pending_grading'] = self.pending_grading()
+        context['sort'] = self.request.GET.get('sort', '')
         return context
     
+class QuarterlyReportView(LoginRequiredMixin,TemplateView):
+    """
+    Average rating and plan approval rate per department and quarter for
+    CEO/HR, read from QuarterlyRollup, so it costs the same at any number of
+    reviews. ``?by=role`` splits each department by role; ``?quarter=2025-Q3``
+    and ``?department=<id>`` narrow it down.
+    """
+    template_name = 'app/quarterly_report.html'
+    login_url = reverse_lazy('app:login')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['is_ceo_or_hr'] = self.request.principal.is_ceo_or_hr
+        if not context['is_ceo_or_hr']:
+            return context
+        rows = QuarterlyRollup.objects.all()
+        bounds = quarter_range(self.request.GET.get('quarter', ''))
+        if bounds:
+            rows = rows.filter(quarter__gte=bounds[0], quarter__lt=bounds[1])
+        try:
+            rows = rows.filter(department_id=int(self.request.GET['department']))
+        except (KeyError, ValueError):
+            # no department, or not an id: every department
+            pass
+        context['by_role'] = self.request.GET.get('by') == 'role'
+        context['rows'] = list(rollups.report(rows, by_role=context['by_role']))
+        context['departments'] = Department.objects.all()
+        return context
+
+class MeetingsView(LoginRequiredMixin,TemplateView):
+    """The next few weeks of learning plan meetings for the user and their direct reports."""
+    login_url = reverse_lazy('app:login')
+    template_name = 'app/meetings.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        employee = self.request.principal.employee
+        context['window_days'] = meetings.MEETING_WINDOW_DAYS
+        if employee is None:
+            return context
+        context['meetings'] = meetings.upcoming(employee, include_reports=True).select_related('employee__user')
+        context['feed_url'] = self.request.build_absolute_uri(reverse('app:meetings_feed', args=[meetings.feed_token(employee)]))
+        return context
+
+class MeetingFeed(View):
+    """
+    The same meetings as an iCalendar feed, for calendar clients to subscribe
+    to. The signed token in the URL stands in for the login. Every response
+    carries an ETag from one aggregate over the window, so a client polling
+    with it gets a 304 without the events being read; a changed feed is
+    streamed event by event. No Last-Modified, as in the API: a cancelled
+    meeting doesn't move the newest ``updated_at`` forward.
+    """
+
+    def get(self, request, token):
+        employee_id = meetings.feed_employee_id(token)
+        if employee_id is None:
+            raise Http404('Unknown calendar')
+        today = timezone.localdate()
+        queryset = meetings.upcoming(employee_id, include_reports=True, today=today)
+        state = queryset.order_by().aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+        # the window moves at midnight even when no plan changes
+        key = f'{employee_id}:{today}:{state["count"]}:{state["last_modified"]}'
+        etag = f'"{hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()}"'
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            rows = (queryset.values_list('pk', 'schedule_meeting', 'employee__user__first_name',
+                                         'employee__user__last_name', 'status', 'review_note', 'updated_at')
+                    .iterator(chunk_size=exports.CHUNK_SIZE))
+            response = StreamingHttpResponse(meetings.iter_calendar(rows, 'HRMS meetings', request.get_host()),
+                                             content_type='text/calendar; charset=utf-8')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+class ExportView(LoginRequiredMixin,SubordinateScopeMixin,ArchivedRowsMixin,View):
+    """
+    Streams the rows a list view would show as CSV (default) or ``?format=jsonl``.
+    CEO/HR export everything, managers their own reports; the list filters apply.
+    ``?archived=include`` adds the matching rows from the archive table.
+    """
+    login_url = reverse_lazy('app:login')
+    model = None
+    filterset_class = None
+    columns = None
+    filename = None
+
+    def rows(self, model):
+        if self.request.principal.is_ceo_or_hr:
+            return model.objects.all()
+        if self.request.principal.employee is None:
+            return model.objects.none()
+        return model.objects.filter(employee__in=self.get_subordinates())
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in exports.FORMATS:
+            return HttpResponseBadRequest(f'Unsupported export format: {fmt}')
+        filterset = self.filterset_class(request.GET, queryset=self.rows(self.model))
+        if not filterset.is_valid():
+            return HttpResponseBadRequest(filterset.errors.as_text())
+        archived = None
+        if self.include_archived():
+            # the archive tables have the same field names, so the same filters apply
+            archived = self.filterset_class(request.GET, queryset=self.rows(archive.ARCHIVES[self.model])).qs
+        return exports.export_response(filterset.qs, self.columns, self.filename, fmt, archived=archived)
+
+class LearningPlanExport(ExportView):
+    model = LearningPlan
+    filterset_class = learning_plan_filter
+    columns = exports.LEARNING_PLAN_COLUMNS
+    filename = 'learning_plans'
+
+class PerformanceExport(ExportView):
+    model = PerformanceReview
+    filterset_class = performance_filter
+    columns = exports.PERFORMANCE_COLUMNS
+    filename = 'performance_reviews'
+
 # Email 
 
 # def performance_grade_email(performance):
@@ -339,97 +602,155 @@ class PerformanceList(LoginRequiredMixin,ListView):
 #             recipient_list=[performance.employee.user.email]
 #         )
 
-class GradePerformance(LoginRequiredMixin,SuccessMessageMixin,UpdateView):
+class GradePerformance(LoginRequiredMixin,ScopedObjectMixin,SuccessMessageMixin,UpdateView):
     model = PerformanceReview
     form_class = PerformanceReviewAdminForm
     login_url = reverse_lazy('app:login')
     success_url = reverse_lazy('app:perflist')
     template_name = 'app/gradeperf.html'
     success_message = 'Performance Graded'
+    permission_denied_message = 'You can only grade your subordinates'
 
-    def get_object(self):
-        grade_performance = get_object_or_404(PerformanceReview, pk = self.kwargs['pk'])
-        grader = self.request.user.employee
-
-        if grade_performance.employee.reporting_to != grader:
-            raise PermissionDenied('You can only grade your subordinates')
-        return grade_performance
+    def get_queryset(self):
+        return (PerformanceReview.objects.gradable_by(self.request.principal.employee)
+                .with_employee().select_related('employee__reporting_to__user'))
     
     def form_valid(self, form):
-        form.instance.commented_by = self.request.user.employee
+        form.instance.commented_by = self.request.principal.employee
         # self.object = form.save()
         # performance_grade_email(self.object)
         
         return super().form_valid(form)
     
-class EmpUpdatePerformance(LoginRequiredMixin,SuccessMessageMixin, UpdateView,):
+class BulkGradePerformance(LoginRequiredMixin,FormView):
+    """
+    Every pending review of the manager's direct reports on one page. The
+    whole formset is validated before anything is written; the rated rows
+    are then saved with one bulk_update, their grade mails queued with one
+    insert and the rollups adjusted once per row touched, all in a single
+    transaction. Rows left blank stay pending.
+    """
+    form_class = BulkGradeFormSet
+    login_url = reverse_lazy('app:login')
+    success_url = reverse_lazy('app:perflist')
+    template_name = 'app/bulkgrade.html'
+
+    def get_reviews(self):
+        # the permission check: anything outside this one query can't be graded here
+        if not hasattr(self, '_reviews'):
+            manager = self.request.principal.employee
+            reviews = PerformanceReview.objects.with_employee().filter(employee__reporting_to=manager, graded='PENDING')
+            self._reviews = {review.pk: review for review in reviews.order_by('pk')} if manager else {}
+        return self._reviews
+
+    def get_initial(self):
+        return [{'review': pk} for pk in self.get_reviews()]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        reviews = self.get_reviews()
+        context['rows'] = [(form, reviews.get(self.review_id(form))) for form in context['form']]
+        return context
+
+    def review_id(self, form):
+        try:
+            return int(form['review'].value())
+        except (TypeError, ValueError):
+            return None
+
+    def form_valid(self, formset):
+        reviews = self.get_reviews()
+        grader = self.request.principal.employee
+        graded = []
+        for form in formset:
+            if 'review' not in form.cleaned_data:
+                # an extra row posted untouched validates as empty; there is nothing to grade
+                continue
+            review = reviews.get(form.cleaned_data['review'])
+            if review is None:
+                form.add_error(None, 'This review is not pending for one of your direct reports.')
+                return self.form_invalid(formset)
+            if not form.is_rated():
+                continue
+            for field in RATING_FIELDS:
+                setattr(review, field, form.cleaned_data[field])
+            review.comments = form.cleaned_data['comments']
+            review.commented_by = grader
+            graded.append(review)
+        if not graded:
+            messages.info(self.request, 'No reviews were rated')
+            return redirect('app:bulkgrade')
+
+        # bulk_update sends no signals: queue the mails and move the rollups here
+        with transaction.atomic():
+            PerformanceReview.objects.bulk_update(graded, [*RATING_FIELDS, 'comments', 'commented_by'])
+            outbox.enqueue_many(message for message in map(grade_message, graded) if message)
+            rollups.record_many(graded)
+        messages.success(self.request, f'{len(graded)} performance review{"s" if len(graded) != 1 else ""} graded')
+        return super().form_valid(formset)
+
+class EmpUpdatePerformance(LoginRequiredMixin,ScopedObjectMixin,SuccessMessageMixin, UpdateView,):
     model = PerformanceReview
     form_class = PerformanceReviewForm
     login_url = reverse_lazy('app:login')
     success_url = reverse_lazy('app:dashboard')
     template_name = 'app/updateperf.html'
     success_message = 'Performance Review Updated'
+    permission_denied_message = 'You can only edit your own performance review'
     
-    def get_object(self):
-        performance = get_object_or_404(PerformanceReview, pk=self.kwargs['pk'])
-        if performance.employee.user != self.request.user:
-            raise PermissionDenied('You can only edit your own performance review')
+    def get_queryset(self):
+        return PerformanceReview.objects.filter(employee_id=self.request.principal.pk)
+
+    def get_object(self, queryset=None):
+        performance = super().get_object(queryset)
         if (performance.responsibility_rating or performance.communication_rating or 
             performance.quality_rating or performance.accountability_rating):
             raise PermissionDenied('Cannot edit after supervisor has graded')
         return performance
 
 
-class DetailedPerformance(LoginRequiredMixin, DetailView):
+class DetailedPerformance(LoginRequiredMixin,ArchivedObjectMixin,ScopedObjectMixin, DetailView):
     model = PerformanceReview
     login_url = reverse_lazy('app:login')
     template_name = 'app/detailperf.html'
     context_object_name = 'performance'
+    permission_denied_message = 'You do not have access to view this'
 
-    def get_object(self):
-        performance = get_object_or_404(PerformanceReview, pk=self.kwargs['pk'])
-        currentuser = self.request.user.employee
-        if (performance.employee.user != self.request.user and 
-            performance.employee.reporting_to != currentuser and
-            currentuser.role not in ['CEO', 'HR']):
-            raise PermissionDenied('You do not have access to view this')
-        return performance
+    def get_queryset(self, model=None):
+        return ((model or self.model).objects.visible_to(self.request.principal.employee)
+                .with_employee().select_related('commented_by__user'))
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         performance = context['performance']
-        current_user = self.request.user.employee
-        context['can_edit'] = (performance.employee.user == self.request.user and 
+        principal = self.request.principal
+        context['can_edit'] = (performance.employee_id == principal.pk and
                               not performance.responsibility_rating)
-        context['can_grade'] = (performance.employee.reporting_to == current_user or
-                               current_user.role in ['CEO', 'HR'])
-        
-        if (performance.responsibility_rating and performance.communication_rating and 
-            performance.quality_rating and performance.accountability_rating):
-            total = (performance.responsibility_rating + performance.communication_rating + 
-                    performance.quality_rating + performance.accountability_rating)
-            context['overall_score'] = total / 4
-        else:
-            context['overall_score'] = None
-        
+        # the row is already scoped to the principal, so its employee is loaded
+        context['can_grade'] = (not performance.is_archived and
+                                (performance.employee.reporting_to_id == principal.pk or
+                                 principal.is_ceo_or_hr))
+        context['overall_score'] = performance.overall_score
         return context
 
     
-class UpdateGradePerformance(LoginRequiredMixin,SuccessMessageMixin, UpdateView):
+class UpdateGradePerformance(LoginRequiredMixin,ScopedObjectMixin,SuccessMessageMixin, UpdateView):
     model = PerformanceReview
     form_class = PerformanceReviewAdminUpdateForm
     login_url = reverse_lazy('app:login')
     success_url = reverse_lazy('app:perflist')
     template_name = 'app/updategrade.html'
     success_message = 'Performance Grade Updated'
+    permission_denied_message = 'You can only update grades for your subordinates'
     
-    def get_object(self):
-        performance = get_object_or_404(PerformanceReview, pk=self.kwargs['pk'])
-        grader = self.request.user.employee
-        if (performance.employee.reporting_to != grader and
-            grader.role not in ['CEO', 'HR']):
-            raise PermissionDenied('You can only update grades for your subordinates')
-        
+    def get_queryset(self):
+        principal = self.request.principal
+        reviews = PerformanceReview.objects
+        reviews = reviews.visible_to(principal.employee) if principal.is_ceo_or_hr else reviews.gradable_by(principal.employee)
+        return reviews.with_employee().select_related('commented_by__user')
+
+    def get_object(self, queryset=None):
+        performance = super().get_object(queryset)
         if not (performance.responsibility_rating and performance.communication_rating and
                 performance.quality_rating and performance.accountability_rating):
             raise PermissionDenied('This review has not been graded yet')
@@ -437,5 +758,5 @@ class UpdateGradePerformance(LoginRequiredMixin,SuccessMessageMixin, UpdateView)
     
     def form_valid(self, form):
         if form.instance.comments:
-            form.instance.commented_by = self.request.user.employee
+            form.instance.commented_by = self.request.principal.employee
         return super().form_valid(form)
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""
+Session and sign-in settings profiles, picked with the AUTH_PROFILE environment variable.
+
+``db``     the default: Django's database sessions. Every request reads its
+           session row, and the signed-in Employee is looked up on every request.
+``cached`` ``cached_db`` sessions: reads come from the cache and the table is
+           written only when a session changes (login, logout, a flash message).
+           The signed-in Employee is kept in process for PRINCIPAL_CACHE_TIMEOUT.
+``cookie`` signed-cookie sessions: no session table at all. The session is
+           signed (not encrypted) in the client's cookie, must stay under 4 KB,
+           and can't be revoked server-side before SESSION_COOKIE_AGE.
+
+The cache is Redis when REDIS_URL is set (``pip install redis``), shared by
+every worker; otherwise it is local memory, and a worker that misses reads the
+session table instead. The Employee cache is always local to the process.
+"""
+import os
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached': 'django.contrib.sessions.backends.cached_db',
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+def session_engine(profile):
+    try:
+        return SESSION_ENGINES[profile]
+    except KeyError:
+        raise ValueError(f'Unknown AUTH_PROFILE {profile!r}; use db, cached or cookie') from None
+
+
+def principal_cache_timeout(profile, env=os.environ):
+    """Seconds the signed-in Employee stays cached in process; 0 looks it up on every request."""
+    default = 0 if profile == 'db' else 60
+    return int(env.get('PRINCIPAL_CACHE_TIMEOUT', default))
+
+
+def caches(env=os.environ):
+    default = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    if env.get('REDIS_URL'):
+        default = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': env['REDIS_URL']}
+    return {
+        'default': default,
+        'principal': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'principal'},
+    }
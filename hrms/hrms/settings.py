@@ -11,9 +11,12 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
+from . import authprofiles, dbprofiles
+
 load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,10 +52,13 @@ MESSAGES_STORAGE = 'django.contrib.messages.storage.sessions.SessionStorage'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app.assets.StaticAssetMiddleware',
+    'app.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.middleware.PrincipalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -80,14 +86,39 @@ WSGI_APPLICATION = 'hrms.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DB_PROFILE selects sqlite (tuned, the default), postgres (pooled) or sqlite-plain;
+# see hrms/dbprofiles.py for what each one sets
+DB_PROFILE = os.getenv('DB_PROFILE', 'sqlite')
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': dbprofiles.database(DB_PROFILE, BASE_DIR),
 }
 
 
+# AUTH_PROFILE selects db sessions (the default), cached (cached_db sessions and the
+# signed-in Employee cached in process) or cookie (signed-cookie sessions);
+# see hrms/authprofiles.py
+AUTH_PROFILE = os.getenv('AUTH_PROFILE', 'db')
+
+SESSION_ENGINE = authprofiles.session_engine(AUTH_PROFILE)
+
+CACHES = authprofiles.caches()
+
+PRINCIPAL_CACHE_TIMEOUT = authprofiles.principal_cache_timeout(AUTH_PROFILE)
+
+# PBKDF2 rounds for new password hashes; unset keeps Django's default. Lower is
+# faster to sign in and cheaper to brute-force a leaked hash.
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', 0)) or None
+
+PASSWORD_HASHERS = [
+    'app.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -124,6 +155,16 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# `python manage.py collectstatic` writes content-hashed copies, a manifest and
+# gzip/brotli variants here; with DEBUG off, app.assets.StaticAssetMiddleware
+# serves them with a year of immutable caching
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'app.assets.CompressedManifestStaticFilesStorage'},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -132,3 +173,36 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 EMAIL_FILE_PATH = '/mails/'
+
+# Queued mail is delivered by `python manage.py send_outbox`
+OUTBOX_BATCH_SIZE = 100
+
+OUTBOX_MAX_ATTEMPTS = 5
+
+# Closed plans and graded reviews from quarters older than this move to the archive
+# tables when `python manage.py archive_quarters` runs
+ARCHIVE_AFTER_QUARTERS = 4
+
+ARCHIVE_CHUNK_SIZE = 1000
+
+# `manage.py test` keeps request logs out of the test output
+TESTING = sys.argv[1:2] == ['test']
+
+# Server-Timing on every response; a JSON log line for this share of requests and every slow one.
+# Sampling is off unless set explicitly, except while developing with DEBUG on.
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv(
+    'REQUEST_METRICS_SAMPLE_RATE', '0.1' if DEBUG and not TESTING else '0'))
+
+REQUEST_METRICS_SLOW_MS = 500
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+        'null': {'class': 'logging.NullHandler'},
+    },
+    'loggers': {
+        'app.requests': {'handlers': ['null' if TESTING else 'console'], 'level': 'INFO', 'propagate': False},
+    },
+}